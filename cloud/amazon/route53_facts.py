@@ -48,6 +48,21 @@ options:
     description:
       - Maximum number of items to return for various get/list requests
     required: false
+  all_pages:
+    description:
+      - "Return the items of all pages of list_command: record_sets, hosted_zone
+        list and health_check list in a single request instead of a single page.
+        The pages are fetched with a boto3 paginator; I(max_items) limits the
+        number of items returned and I(next_marker) is ignored."
+    required: false
+    default: false
+    version_added: "2.2"
+  record_name:
+    description:
+      - "Only return record sets with this name when listing all pages of
+        list_command: record_sets. Shell-style wildcards are allowed."
+    required: false
+    version_added: "2.2"
   next_marker:
     description:
       - "Some requests such as list_command: hosted_zones will return a maximum
@@ -66,7 +81,8 @@ options:
     required: false
   type:
     description:
-      - The type of DNS record
+      - The type of DNS record. When listing all pages of record_sets, only
+        record sets of this type are returned.
     required: false
     choices: [ 'A', 'CNAME', 'MX', 'AAAA', 'TXT', 'PTR', 'SRV', 'SPF', 'NS' ]
   dns_name:
@@ -138,6 +154,15 @@ EXAMPLES = '''
     max_items: 20
   register: record_sets
 
+- name: List all A records of www in a given hosted zone
+  route53_facts:
+    query: record_sets
+    hosted_zone_id: 'ZZZ1111112222'
+    all_pages: true
+    type: A
+    record_name: www.example.com
+  register: record_sets
+
 - name: List first 20 health checks
   route53_facts:
     query: health_check
@@ -172,6 +197,37 @@ try:
 except ImportError:
     HAS_BOTO3 = False
 
+import fnmatch
+
+
+def paginate(client, module, operation, key, params, match=None):
+    ''' return the items under key of all pages of operation. match is
+    called for each item as it is received: items are kept when it returns
+    True, skipped when it returns False and no more pages are fetched once
+    it returns None '''
+    max_items = module.params.get('max_items')
+    if max_items:
+        max_items = int(max_items)
+
+    items = []
+    truncated = False
+    paginator = client.get_paginator(operation)
+    for page in paginator.paginate(**params):
+        for item in page[key]:
+            if match is not None:
+                keep = match(item)
+                if keep is None:
+                    return {key: items, 'IsTruncated': False}
+                if not keep:
+                    continue
+            if max_items and len(items) >= max_items:
+                truncated = True
+                break
+            items.append(item)
+        if truncated:
+            break
+    return {key: items, 'IsTruncated': truncated}
+
 
 def get_hosted_zone(client, module):
     params = dict()
@@ -214,6 +270,11 @@ def list_hosted_zones(client, module):
     if module.params.get('delegation_set_id'):
         params['DelegationSetId'] = module.params.get('delegation_set_id')
 
+    if module.params.get('all_pages'):
+        params.pop('MaxItems', None)
+        params.pop('Marker', None)
+        return paginate(client, module, 'list_hosted_zones', 'HostedZones', params)
+
     results = client.list_hosted_zones(**params)
     return results
 
@@ -304,6 +365,9 @@ def list_health_checks(client, module):
     if module.params.get('next_marker'):
         params['Marker'] = module.params.get('next_marker')
 
+    if module.params.get('all_pages'):
+        return paginate(client, module, 'list_health_checks', 'HealthChecks', dict())
+
     results = client.list_health_checks(**params)
     return results
 
@@ -322,6 +386,9 @@ def record_sets_details(client, module):
     if module.params.get('start_record_name'):
         params['StartRecordName'] = module.params.get('start_record_name')
 
+    if module.params.get('all_pages'):
+        return all_record_sets(client, module, params)
+
     if module.params.get('type') and not module.params.get('start_record_name'):
         module.fail_json(msg="start_record_name must be specified if type is set")
     elif module.params.get('type'):
@@ -331,6 +398,40 @@ def record_sets_details(client, module):
     return results
 
 
+def normalize_record_name(name):
+    return name.rstrip('.').lower()
+
+
+def all_record_sets(client, module, params):
+    params.pop('MaxItems', None)
+    record_type = module.params.get('type')
+    pattern = module.params.get('record_name')
+    if pattern:
+        pattern = normalize_record_name(pattern)
+    exact = pattern and not [c for c in '*?[' if c in pattern]
+    stop_after_name = False
+    if exact and 'StartRecordName' not in params:
+        # the record sets of a name are listed together, start there and
+        # stop at the first record set of another name
+        params['StartRecordName'] = pattern
+        stop_after_name = True
+
+    def match(record_set):
+        if pattern:
+            name = normalize_record_name(record_set['Name'])
+            if exact and name != pattern:
+                if stop_after_name:
+                    return None
+                return False
+            if not exact and not fnmatch.fnmatch(name, pattern):
+                return False
+        if record_type and record_set['Type'] != record_type:
+            return False
+        return True
+
+    return paginate(client, module, 'list_resource_record_sets', 'ResourceRecordSets', params, match)
+
+
 def health_check_details(client, module):
     health_check_invocations = {
         'list': list_health_checks,
@@ -372,6 +473,8 @@ def main():
         change_id=dict(),
         hosted_zone_id=dict(),
         max_items=dict(type='str'),
+        all_pages=dict(type='bool', default=False),
+        record_name=dict(),
         next_marker=dict(),
         delegation_set_id=dict(),
         start_record_name=dict(),
@@ -209,6 +209,20 @@ options:
       - Poll async jobs until job has finished.
     required: false
     default: true
+  lookup_cache_dir:
+    description:
+      - Directory of an on-disk cache for resolving the names of the zone, service offering, template, ISO, disk offering and networks to their resources.
+      - Entries are kept per API endpoint, domain, account, project and zone, so consecutive tasks against the same cloud, e.g. a loop deploying many instances, do not repeat the same list API calls.
+      - The cache is disabled if not set.
+    required: false
+    default: null
+    version_added: "2.2"
+  lookup_cache_ttl:
+    description:
+      - Time in seconds an entry of the lookup cache is valid.
+    required: false
+    default: 300
+    version_added: "2.2"
 extends_documentation_fragment: cloudstack
 '''
 
@@ -265,6 +279,17 @@ EXAMPLES = '''
       - {'network': NetworkA, 'ip': '10.1.1.1'}
       - {'network': NetworkB, 'ip': '192.168.1.1'}
 
+# Deploy many instances, resolving zone, offering, template and networks only once
+- local_action:
+    module: cs_instance
+    name: "web-vm-{{ item }}"
+    template: Linux Debian 7 64-bit
+    service_offering: Tiny
+    networks: [ NetworkA ]
+    lookup_cache_dir: /tmp/cs_lookup_cache
+    lookup_cache_ttl: 600
+  with_sequence: start=1 end=300 format=%03d
+
 # Ensure an instance is stopped
 - local_action: cs_instance name=web-vm-1 state=stopped
 
@@ -395,11 +420,86 @@ instance_name:
 '''
 
 import base64
+import json
+import os
+import re
+import tempfile
+import time
+
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import sha as sha1
 
 # import cloudstack common
 from ansible.module_utils.cloudstack import *
 
 
+CS_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+
+
+class CloudStackLookupCache(object):
+    """On-disk cache of resolved resources, shared between tasks.
+
+    One JSON file per cache key, every entry carries its own expiry time.
+    The cache is best effort: unreadable or unwritable files are ignored.
+    """
+
+    def __init__(self, cache_dir, cache_key, ttl):
+        self.path = os.path.join(cache_dir, 'cs_instance_%s.json' % sha1(cache_key.encode('utf-8')).hexdigest())
+        self.ttl = ttl
+        self.dirty = False
+        self.entries = {}
+        try:
+            f = open(self.path)
+            try:
+                self.entries = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            pass
+
+        now = time.time()
+        for k in list(self.entries.keys()):
+            if self.entries[k].get('expires', 0) < now:
+                del self.entries[k]
+                self.dirty = True
+
+
+    def get(self, kind, name):
+        entry = self.entries.get('%s:%s' % (kind, name))
+        if entry:
+            return entry['resource']
+        return None
+
+
+    def set(self, kind, name, resource):
+        self.entries['%s:%s' % (kind, name)] = {
+            'expires': time.time() + self.ttl,
+            'resource': resource,
+        }
+        self.dirty = True
+
+
+    def save(self):
+        if not self.dirty:
+            return
+        cache_dir = os.path.dirname(self.path)
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            fd, tmp = tempfile.mkstemp(dir=cache_dir)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(self.entries, f)
+            finally:
+                f.close()
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            pass
+        self.dirty = False
+
+
 class AnsibleCloudStackInstance(AnsibleCloudStack):
 
     def __init__(self, module):
@@ -420,18 +520,86 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         self.template = None
         self.iso = None
 
+        self.lookup_cache = None
+        cache_dir = self.module.params.get('lookup_cache_dir')
+        if cache_dir:
+            cache_key = '|'.join([
+                str(getattr(self.cs, 'endpoint', self.module.params.get('api_url'))),
+                str(self.module.params.get('domain')),
+                str(self.module.params.get('account')),
+                str(self.module.params.get('project')),
+                str(self.module.params.get('zone')),
+                str(self.module.params.get('template_filter')),
+            ])
+            self.lookup_cache = CloudStackLookupCache(cache_dir, cache_key, self.module.params.get('lookup_cache_ttl'))
+
+
+    def save_lookup_cache(self):
+        if self.lookup_cache is not None:
+            self.lookup_cache.save()
+
+
+    def lookup_resource(self, kind, name, list_func, list_key, fields, args=None):
+        """Find a resource having name as the value of one of fields.
+
+        The lookup cache is asked first. Otherwise the API is queried with
+        an id or name filter, and only if that does not match, the complete
+        list is fetched. Results are indexed by fields, the first resource
+        listed wins as in a linear scan.
+        """
+        if self.lookup_cache is not None:
+            resource = self.lookup_cache.get(kind, name)
+            if resource:
+                return resource
+
+        if args is None:
+            args = {}
+        if CS_UUID_RE.match(name):
+            filters = [ {'id': name}, {} ]
+        else:
+            filters = [ {'name': name}, {} ]
+
+        for f in filters:
+            query = dict(args)
+            query.update(f)
+            res = list_func(**query)
+            if not res:
+                continue
+            index = {}
+            for r in res.get(list_key, []):
+                for field in fields:
+                    if field in r:
+                        index.setdefault(r[field], r)
+            resource = index.get(name)
+            if resource:
+                if self.lookup_cache is not None:
+                    self.lookup_cache.set(kind, name, resource)
+                return resource
+        return None
+
+
+    def get_zone(self, key=None):
+        if not self.zone and self.lookup_cache is not None:
+            zone = self.module.params.get('zone') or ''
+            self.zone = self.lookup_cache.get('zone', zone)
+            if not self.zone:
+                super(AnsibleCloudStackInstance, self).get_zone()
+                self.lookup_cache.set('zone', zone, self.zone)
+        return super(AnsibleCloudStackInstance, self).get_zone(key=key)
+
 
     def get_service_offering_id(self):
         service_offering = self.module.params.get('service_offering')
 
-        service_offerings = self.cs.listServiceOfferings()
-        if service_offerings:
-            if not service_offering:
+        if not service_offering:
+            service_offerings = self.cs.listServiceOfferings()
+            if service_offerings:
                 return service_offerings['serviceoffering'][0]['id']
-
-            for s in service_offerings['serviceoffering']:
-                if service_offering in [ s['name'], s['id'] ]:
-                    return s['id']
+        else:
+            s = self.lookup_resource('service_offering', service_offering, self.cs.listServiceOfferings,
+                                     'serviceoffering', [ 'name', 'id' ])
+            if s:
+                return s['id']
         self.module.fail_json(msg="Service offering '%s' not found" % service_offering)
 
 
@@ -454,24 +622,20 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                 return self._get_by_key(key, self.template)
 
             args['templatefilter'] = self.module.params.get('template_filter')
-            templates = self.cs.listTemplates(**args)
-            if templates:
-                for t in templates['template']:
-                    if template in [ t['displaytext'], t['name'], t['id'] ]:
-                        self.template = t
-                        return self._get_by_key(key, self.template)
+            self.template = self.lookup_resource('template', template, self.cs.listTemplates,
+                                                 'template', [ 'displaytext', 'name', 'id' ], args)
+            if self.template:
+                return self._get_by_key(key, self.template)
             self.module.fail_json(msg="Template '%s' not found" % template)
 
         elif iso:
             if self.iso:
                 return self._get_by_key(key, self.iso)
             args['isofilter'] = self.module.params.get('template_filter')
-            isos = self.cs.listIsos(**args)
-            if isos:
-                for i in isos['iso']:
-                    if iso in [ i['displaytext'], i['name'], i['id'] ]:
-                        self.iso = i
-                        return self._get_by_key(key, self.iso)
+            self.iso = self.lookup_resource('iso', iso, self.cs.listIsos,
+                                            'iso', [ 'displaytext', 'name', 'id' ], args)
+            if self.iso:
+                return self._get_by_key(key, self.iso)
             self.module.fail_json(msg="ISO '%s' not found" % iso)
 
 
@@ -481,11 +645,10 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         if not disk_offering:
             return None
 
-        disk_offerings = self.cs.listDiskOfferings()
-        if disk_offerings:
-            for d in disk_offerings['diskoffering']:
-                if disk_offering in [ d['displaytext'], d['name'], d['id'] ]:
-                    return d['id']
+        d = self.lookup_resource('disk_offering', disk_offering, self.cs.listDiskOfferings,
+                                 'diskoffering', [ 'displaytext', 'name', 'id' ])
+        if d:
+            return d['id']
         self.module.fail_json(msg="Disk offering '%s' not found" % disk_offering)
 
 
@@ -499,6 +662,11 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             args['domainid']    = self.get_domain(key='id')
             args['projectid']   = self.get_project(key='id')
             # Do not pass zoneid, as the instance name must be unique across zones.
+            # Let the API narrow down the list, keyword matches name and display name.
+            if CS_UUID_RE.match(instance_name):
+                args['id'] = instance_name
+            else:
+                args['keyword'] = instance_name
             instances = self.cs.listVirtualMachines(**args)
             if instances:
                 for v in instances['virtualmachine']:
@@ -552,24 +720,40 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         if not network_names:
             return None
 
-        args                = {}
-        args['account']     = self.get_account(key='name')
-        args['domainid']    = self.get_domain(key='id')
-        args['projectid']   = self.get_project(key='id')
-        args['zoneid']      = self.get_zone(key='id')
+        networks = {}
+        if self.lookup_cache is not None:
+            for network_name in network_names:
+                n = self.lookup_cache.get('network', network_name)
+                if n:
+                    networks[network_name] = n
 
-        networks = self.cs.listNetworks(**args)
-        if not networks:
-            self.module.fail_json(msg="No networks available")
+        if len(networks) != len(set(network_names)):
+            args                = {}
+            args['account']     = self.get_account(key='name')
+            args['domainid']    = self.get_domain(key='id')
+            args['projectid']   = self.get_project(key='id')
+            args['zoneid']      = self.get_zone(key='id')
+
+            res = self.cs.listNetworks(**args)
+            if not res:
+                self.module.fail_json(msg="No networks available")
+
+            index = {}
+            for n in res['network']:
+                for field in [ 'displaytext', 'name', 'id' ]:
+                    index.setdefault(n[field], n)
+            for network_name in network_names:
+                if network_name in index and network_name not in networks:
+                    networks[network_name] = index[network_name]
+                    if self.lookup_cache is not None:
+                        self.lookup_cache.set('network', network_name, index[network_name])
 
         network_ids = []
         network_displaytexts = []
         for network_name in network_names:
-            for n in networks['network']:
-                if network_name in [ n['displaytext'], n['name'], n['id'] ]:
-                    network_ids.append(n['id'])
-                    network_displaytexts.append(n['name'])
-                    break
+            if network_name in networks:
+                network_ids.append(networks[network_name]['id'])
+                network_displaytexts.append(networks[network_name]['name'])
 
         if len(network_ids) != len(network_names):
             self.module.fail_json(msg="Could not find all networks, networks list found: %s" % network_displaytexts)
@@ -937,6 +1121,8 @@ def main():
         force = dict(type='bool', default=False),
         tags = dict(type='list', aliases=[ 'tag' ], default=None),
         poll_async = dict(type='bool', default=True),
+        lookup_cache_dir = dict(type='path', default=None),
+        lookup_cache_ttl = dict(type='int', default=300),
     ))
 
     required_together = cs_required_together()
@@ -990,6 +1176,7 @@ def main():
             module.fail_json(msg="Instance named '%s' in error state." % module.params.get('name'))
 
         result = acs_instance.get_result(instance)
+        acs_instance.save_lookup_cache()
 
     except CloudStackException as e:
         module.fail_json(msg='CloudStackException: %s' % str(e))
@@ -31,7 +31,24 @@ options:
     name:
         description:
           - Name of a container.
-        required: true
+          - Required unless C(names) is given.
+        required: false
+    names:
+        description:
+          - List of existing containers to bring to C(state) in one task.
+            The state transitions of all containers are issued first and the
+            containers are then waited on in parallel.
+          - Only the C(started), C(stopped), C(restarted) and C(frozen) states
+            are supported, containers are not created in this mode.
+        required: false
+        default: null
+        version_added: "2.2"
+    timeout:
+        description:
+          - Time in seconds to wait for a container to reach its state.
+        required: false
+        default: 60
+        version_added: "2.2"
     backing_store:
         choices:
           - dir
@@ -150,10 +167,27 @@ options:
           - gzip
           - bzip2
           - none
+          - pigz
+          - pbzip2
+          - zstd
         description:
           - Type of compression to use when creating an archive of a running
             container.
+          - C(pigz), C(pbzip2) and C(zstd) compress on all available cores and
+            require the matching binary on the host. C(zstd) is run with
+            C(-T0).
         default: gzip
+    archive_streaming:
+        choices:
+          - true
+          - false
+        description:
+          - Archive the container directly from its directory, LVM snapshot or
+            overlayfs mount instead of first copying the container data into
+            a temporary directory with rsync. This avoids needing disk space
+            for a second copy of the container.
+        default: false
+        version_added: "2.2"
     state:
         choices:
           - started
@@ -194,6 +228,10 @@ notes:
     tarball of the running container. The "archive" option supports LVM backed
     containers and will create a snapshot of the running container when
     creating the archive.
+  - If "archive_streaming" is **true** the container rootfs is bind mounted,
+    or the LVM snapshot / overlayfs mounted, next to a copy of the container
+    configuration and archived in place. Only the configuration files are
+    copied.
   - If your distro does not have a package for "python2-lxc", which is a
     requirement for this module, it can be installed from source at
     "https://github.com/lxc/python2-lxc" or installed via pip using the package
@@ -307,6 +345,16 @@ EXAMPLES = """
           echo 'hello world.' | tee /opt/found-started
       fi
 
+# Stop many existing containers at once
+- name: Stop the web containers
+  lxc_container:
+    names:
+      - web1
+      - web2
+      - web3
+    state: stopped
+    timeout: 120
+
 # Create an archive of an existing container, save the archive to a defined
 # path and then destroy it.
 - name: Archive container
@@ -316,6 +364,18 @@ EXAMPLES = """
     archive: true
     archive_path: /opt/archives
 
+# Create an archive of a large LVM backed container straight from its
+# snapshot, compressing on all cores with zstd.
+- name: Stream a container archive
+  lxc_container:
+    name: test-container-lvm
+    backing_store: lvm
+    state: started
+    archive: true
+    archive_streaming: true
+    archive_path: /opt/archives
+    archive_compression: zstd
+
 # Create a container using overlayfs, create an archive of it, create a
 # snapshot clone of the container and and finally leave the container
 # in a frozen state. The container archive will be compressed using gzip.
@@ -417,14 +477,40 @@ lxc_container:
             returned: success, when archive is true
             type: string
             sample: "/tmp/test-container-config.tar"
+        archive_size:
+            description: size of the archive in bytes
+            returned: success, when archive is true
+            type: int
+            sample: 1073741824
+        archive_seconds:
+            description: time spent writing the archive
+            returned: success, when archive is true
+            type: float
+            sample: 12.5
+        archive_throughput:
+            description: bytes of archive written per second
+            returned: success, when archive is true
+            type: int
+            sample: 85899345
         clone:
             description: if the container was cloned
             returned: success, when clone_name is specified
             type: boolean
             sample: True
+lxc_containers:
+    description: per container result, when names is given
+    returned: success, when names is given
+    type: dict
+    sample: {"web1": {"state": "stopped", "changed": true, "seconds": 1.2}}
 """
 
 import re
+import subprocess
+try:
+    from multiprocessing.pool import ThreadPool
+    HAS_THREADPOOL = True
+except ImportError:
+    HAS_THREADPOOL = False
 
 try:
     import lxc
@@ -448,6 +534,21 @@ LXC_COMPRESSION_MAP = {
     'none': {
         'extension': 'tar',
         'argument': '-cf'
+    },
+    'pigz': {
+        'extension': 'tar.gz',
+        'argument': '-cf',
+        'program': ['pigz']
+    },
+    'pbzip2': {
+        'extension': 'tar.bz2',
+        'argument': '-cf',
+        'program': ['pbzip2']
+    },
+    'zstd': {
+        'extension': 'tar.zst',
+        'argument': '-cf',
+        'program': ['zstd', '-T0', '-q']
     }
 }
 
@@ -526,6 +627,16 @@ LXC_ANSIBLE_STATES = {
 }
 
 
+# LXC_WAIT_STATES is a map of the ansible states supported by the bulk mode
+# and the liblxc state waited on once the transition has been issued.
+LXC_WAIT_STATES = {
+    'started': 'RUNNING',
+    'stopped': 'STOPPED',
+    'restarted': 'RUNNING',
+    'frozen': 'FROZEN'
+}
+
+
 # This is used to attach to a running container and execute commands from
 # within the container on the host.  This will provide local access to a
 # container without using SSH.  The template will attempt to work within the
@@ -605,8 +716,10 @@ class LxcContainerManagement(object):
         self.lxc_vg = None
         self.lxc_path = self.module.params.get('lxc_path', None)
         self.container_name = self.module.params['name']
+        self.timeout = self.module.params.get('timeout') or 60
         self.container = self.get_container_bind()
         self.archive_info = None
+        self.archive_stats = None
         self.clone_info = None
 
     def get_container_bind(self):
@@ -964,22 +1077,58 @@ class LxcContainerManagement(object):
             self.container.attach_wait(create_script, container_command)
             self.state_change = True
 
-    def _container_startup(self, timeout=60):
+    def _wait_for_state(self, state, timeout=None):
+        """Wait for the container to reach a state.
+
+        This blocks in liblxc until the container changes state instead of
+        polling it.
+
+        :param state: liblxc state name, e.g. RUNNING, STOPPED or FROZEN.
+        :type state: ``str``
+        :param timeout: Time before the wait is abandoned.
+        :type timeout: ``int``
+        :returns: True or False if the state was reached.
+        :rtype: ``bol``
+        """
+
+        if timeout is None:
+            timeout = self.timeout
+        return self.container.wait(state, timeout)
+
+    def _ensure_created(self, method):
+        """Create the container if it does not exist yet.
+
+        :param method: name of the operation, used in the failure message.
+        :type method: ``str``
+        """
+
+        if self._container_exists(container_name=self.container_name, lxc_path=self.lxc_path):
+            return
+
+        self._create()
+        self.container = self.get_container_bind()
+        if not self._container_exists(container_name=self.container_name, lxc_path=self.lxc_path):
+            self.failure(
+                error='Failed to %s container' % method,
+                rc=1,
+                msg='The container [ %s ] failed to %s. Check to lxc is'
+                    ' available and that the container is in a functional'
+                    ' state.' % (self.container_name, method)
+            )
+
+    def _container_startup(self, timeout=None):
         """Ensure a container is started.
 
-        :param timeout: Time before the destroy operation is abandoned.
+        :param timeout: Time before the start operation is abandoned.
         :type timeout: ``int``
         """
 
         self.container = self.get_container_bind()
-        for _ in xrange(timeout):
-            if self._get_state() != 'running':
-                self.container.start()
-                self.state_change = True
-                # post startup sleep for 1 second.
-                time.sleep(1)
-            else:
-                return True
+        if self._get_state() != 'running':
+            self.container.start()
+            self.state_change = True
+        if self._wait_for_state('RUNNING', timeout):
+            return True
         else:
             self.failure(
                 lxc_container=self._container_data(),
@@ -1001,6 +1150,8 @@ class LxcContainerManagement(object):
             self.archive_info = {
                 'archive': self._container_create_tar()
             }
+            if self.archive_stats:
+                self.archive_info.update(self.archive_stats)
 
     def _check_clone(self):
         """Create a compressed archive of a container.
@@ -1056,148 +1207,118 @@ class LxcContainerManagement(object):
                     ' functional state.' % self.container_name
             )
 
-    def _frozen(self, count=0):
+    def _frozen(self):
         """Ensure a container is frozen.
 
         If the container does not exist the container will be created.
-
-        :param count: number of times this command has been called by itself.
-        :type count: ``int``
         """
 
-        self.check_count(count=count, method='frozen')
-        if self._container_exists(container_name=self.container_name, lxc_path=self.lxc_path):
-            self._execute_command()
+        self._ensure_created(method='frozen')
+        self._execute_command()
 
-            # Perform any configuration updates
-            self._config()
+        # Perform any configuration updates
+        self._config()
 
-            container_state = self._get_state()
-            if container_state == 'frozen':
-                pass
-            elif container_state == 'running':
-                self.container.freeze()
-                self.state_change = True
-            else:
-                self._container_startup()
-                self.container.freeze()
-                self.state_change = True
+        container_state = self._get_state()
+        if container_state == 'frozen':
+            pass
+        elif container_state == 'running':
+            self.container.freeze()
+            self.state_change = True
+        else:
+            self._container_startup()
+            self.container.freeze()
+            self.state_change = True
 
-            # Check if the container needs to have an archive created.
-            self._check_archive()
+        # Check if the container needs to have an archive created.
+        self._check_archive()
 
-            # Check if the container is to be cloned
-            self._check_clone()
-        else:
-            self._create()
-            count += 1
-            self._frozen(count)
+        # Check if the container is to be cloned
+        self._check_clone()
 
-    def _restarted(self, count=0):
+    def _restarted(self):
         """Ensure a container is restarted.
 
         If the container does not exist the container will be created.
-
-        :param count: number of times this command has been called by itself.
-        :type count: ``int``
         """
 
-        self.check_count(count=count, method='restart')
-        if self._container_exists(container_name=self.container_name, lxc_path=self.lxc_path):
-            self._execute_command()
+        self._ensure_created(method='restart')
+        self._execute_command()
 
-            # Perform any configuration updates
-            self._config()
+        # Perform any configuration updates
+        self._config()
 
-            if self._get_state() != 'stopped':
-                self.container.stop()
-                self.state_change = True
+        if self._get_state() != 'stopped':
+            self.container.stop()
+            self._wait_for_state('STOPPED')
+            self.state_change = True
 
-            # Run container startup
-            self._container_startup()
+        # Run container startup
+        self._container_startup()
 
-            # Check if the container needs to have an archive created.
-            self._check_archive()
+        # Check if the container needs to have an archive created.
+        self._check_archive()
 
-            # Check if the container is to be cloned
-            self._check_clone()
-        else:
-            self._create()
-            count += 1
-            self._restarted(count)
+        # Check if the container is to be cloned
+        self._check_clone()
 
-    def _stopped(self, count=0):
+    def _stopped(self):
         """Ensure a container is stopped.
 
         If the container does not exist the container will be created.
-
-        :param count: number of times this command has been called by itself.
-        :type count: ``int``
         """
 
-        self.check_count(count=count, method='stop')
-        if self._container_exists(container_name=self.container_name, lxc_path=self.lxc_path):
-            self._execute_command()
+        self._ensure_created(method='stop')
+        self._execute_command()
 
-            # Perform any configuration updates
-            self._config()
+        # Perform any configuration updates
+        self._config()
 
-            if self._get_state() != 'stopped':
-                self.container.stop()
-                self.state_change = True
+        if self._get_state() != 'stopped':
+            self.container.stop()
+            self._wait_for_state('STOPPED')
+            self.state_change = True
 
-            # Check if the container needs to have an archive created.
-            self._check_archive()
+        # Check if the container needs to have an archive created.
+        self._check_archive()
 
-            # Check if the container is to be cloned
-            self._check_clone()
-        else:
-            self._create()
-            count += 1
-            self._stopped(count)
+        # Check if the container is to be cloned
+        self._check_clone()
 
-    def _started(self, count=0):
+    def _started(self):
         """Ensure a container is started.
 
         If the container does not exist the container will be created.
-
-        :param count: number of times this command has been called by itself.
-        :type count: ``int``
         """
 
-        self.check_count(count=count, method='start')
-        if self._container_exists(container_name=self.container_name, lxc_path=self.lxc_path):
-            container_state = self._get_state()
-            if container_state == 'running':
-                pass
-            elif container_state == 'frozen':
-                self._unfreeze()
-            elif not self._container_startup():
-                self.failure(
-                    lxc_container=self._container_data(),
-                    error='Failed to start container'
-                          ' [ %s ]' % self.container_name,
-                    rc=1,
-                    msg='The container [ %s ] failed to start. Check to lxc is'
-                        ' available and that the container is in a functional'
-                        ' state.' % self.container_name
-                )
+        self._ensure_created(method='start')
+        container_state = self._get_state()
+        if container_state == 'running':
+            pass
+        elif container_state == 'frozen':
+            self._unfreeze()
+        elif not self._container_startup():
+            self.failure(
+                lxc_container=self._container_data(),
+                error='Failed to start container'
+                      ' [ %s ]' % self.container_name,
+                rc=1,
+                msg='The container [ %s ] failed to start. Check to lxc is'
+                    ' available and that the container is in a functional'
+                    ' state.' % self.container_name
+            )
 
-            # Return data
-            self._execute_command()
+        # Return data
+        self._execute_command()
 
-            # Perform any configuration updates
-            self._config()
+        # Perform any configuration updates
+        self._config()
 
-            # Check if the container needs to have an archive created.
-            self._check_archive()
+        # Check if the container needs to have an archive created.
+        self._check_archive()
 
-            # Check if the container is to be cloned
-            self._check_clone()
-        else:
-            self._create()
-            count += 1
-            self._started(count)
+        # Check if the container is to be cloned
+        self._check_clone()
 
     def _get_lxc_vg(self):
         """Return the name of the Volume Group used in LXC."""
@@ -1400,10 +1521,22 @@ class LxcContainerManagement(object):
             '.'
         ]
 
-        rc, stdout, err = self._run_command(
-            build_command=build_command,
-            unsafe_shell=True
-        )
+        start = time.time()
+        if 'program' in compression_type:
+            # tar writes to stdout and the parallel compressor writes the
+            # archive, the two run concurrently.
+            build_command[3] = '-'
+            rc, err = self._pipe_to_compressor(
+                build_command=build_command,
+                program=compression_type['program'],
+                archive_name=archive_name
+            )
+        else:
+            rc, stdout, err = self._run_command(
+                build_command=build_command,
+                unsafe_shell=True
+            )
+        elapsed = time.time() - start
 
         os.umask(old_umask)
 
@@ -1415,8 +1548,58 @@ class LxcContainerManagement(object):
                 command=' '.join(build_command)
             )
 
+        archive_size = os.path.getsize(archive_name)
+        self.archive_stats = {
+            'archive_size': archive_size,
+            'archive_seconds': round(elapsed, 3),
+            'archive_throughput': int(archive_size / max(elapsed, 0.001))
+        }
         return archive_name
 
+    def _pipe_to_compressor(self, build_command, program, archive_name):
+        """Run tar and pipe its output through an external compressor.
+
+        :param build_command: tar command writing the archive to stdout.
+        :type build_command: ``list``
+        :param program: compressor command reading from stdin.
+        :type program: ``list``
+        :param archive_name: path of the compressed archive to write.
+        :type archive_name: ``str``
+        :returns: return code and stderr of the first failing command.
+        :rtype: ``tuple``
+        """
+
+        program = [self.module.get_bin_path(program[0], True)] + program[1:]
+        archive = open(archive_name, 'wb')
+        # tar may print more warnings than a pipe holds while the
+        # compressor is read, keep them in a file so tar never blocks.
+        tar_log = tempfile.TemporaryFile()
+        try:
+            tar = subprocess.Popen(
+                build_command,
+                stdout=subprocess.PIPE,
+                stderr=tar_log
+            )
+            compressor = subprocess.Popen(
+                program,
+                stdin=tar.stdout,
+                stdout=archive,
+                stderr=subprocess.PIPE
+            )
+            # Let tar get a SIGPIPE if the compressor exits early.
+            tar.stdout.close()
+            compressor_err = compressor.communicate()[1]
+            tar.wait()
+            tar_log.seek(0)
+            tar_err = tar_log.read()
+        finally:
+            tar_log.close()
+            archive.close()
+
+        if tar.returncode != 0:
+            return tar.returncode, tar_err
+        return compressor.returncode, compressor_err
+
     def _lvm_lv_remove(self, lv_name):
         """Remove an LV.
 
@@ -1476,11 +1659,61 @@ class LxcContainerManagement(object):
                     command=' '.join(build_command)
                 )
 
-    def _unmount(self, mount_point):
+    def _copy_container_config(self, container_dir, work_dir):
+        """Copy everything but the rootfs of a container directory.
+
+        :param container_dir: path to the lxc directory of the container
+        :type container_dir: ``str``
+        :param work_dir: path to the temporary local working directory
+        :type work_dir: ``str``
+        """
+
+        if not os.path.isdir(work_dir):
+            os.makedirs(work_dir)
+
+        for entry in os.listdir(container_dir):
+            if entry == 'rootfs':
+                continue
+            source = os.path.join(container_dir, entry)
+            destination = os.path.join(work_dir, entry)
+            if os.path.isdir(source) and not os.path.islink(source):
+                shutil.copytree(source, destination, symlinks=True)
+            else:
+                shutil.copy2(source, destination)
+
+    def _bind_mount(self, source_dir, mount_point):
+        """Bind mount a directory.
+
+        :param source_dir: path of the directory to bind mount
+        :type source_dir: ``str``
+        :param mount_point: path on the file system that is mounted.
+        :type mount_point: ``str``
+        """
+
+        build_command = [
+            self.module.get_bin_path('mount', True),
+            '--bind',
+            source_dir,
+            mount_point,
+        ]
+        rc, stdout, err = self._run_command(build_command)
+        if rc != 0:
+            self.failure(
+                err=err,
+                rc=rc,
+                msg='failed to bind mount %s to %s' % (source_dir, mount_point),
+                command=' '.join(build_command)
+            )
+
+    def _unmount(self, mount_point, quiet=False):
         """Unmount a file system.
 
         :param mount_point: path on the file system that is mounted.
         :type mount_point: ``str``
+        :param quiet: return False instead of failing if umount fails.
+        :type quiet: ``bol``
+        :returns: True if the file system was unmounted.
+        :rtype: ``bol``
         """
 
         build_command = [
@@ -1489,12 +1722,15 @@ class LxcContainerManagement(object):
         ]
         rc, stdout, err = self._run_command(build_command)
         if rc != 0:
+            if quiet:
+                return False
             self.failure(
                 err=err,
                 rc=rc,
                 msg='failed to unmount [ %s ]' % mount_point,
                 command=' '.join(build_command)
             )
+        return True
 
     def _overlayfs_mount(self, lowerdir, upperdir, mount_point):
         """mount an lv.
@@ -1529,7 +1765,9 @@ class LxcContainerManagement(object):
         The process is as follows:
             * Stop or Freeze the container
             * Create temporary dir
-            * Copy container and config to temporary directory
+            * Copy container and config to temporary directory, when
+              streaming only the config is copied and a directory backed
+              rootfs is bind mounted to tmpdir/rootfs
             * If LVM backed:
                 * Create LVM snapshot of LV backing the container
                 * Mount the snapshot to tmpdir/rootfs
@@ -1538,6 +1776,8 @@ class LxcContainerManagement(object):
             * Clean up
         """
 
+        streaming = self.module.params.get('archive_streaming')
+
         # Create a temp dir
         temp_dir = tempfile.mkdtemp()
 
@@ -1559,6 +1799,7 @@ class LxcContainerManagement(object):
         snapshot_name = '%s_lxc_snapshot' % self.container_name
 
         container_state = self._get_state()
+        mounted = False
         try:
             # Ensure the original container is stopped or frozen
             if container_state not in ['stopped', 'frozen']:
@@ -1567,8 +1808,26 @@ class LxcContainerManagement(object):
                 else:
                     self.container.stop()
 
-            # Sync the container data from the container_path to work_dir
-            self._rsync_data(lxc_rootfs, temp_dir)
+            if streaming:
+                # Archive the rootfs in place, only the container
+                # configuration is copied into work_dir
+                self._copy_container_config(
+                    container_dir=os.path.dirname(
+                        self.container.config_file_name
+                    ),
+                    work_dir=work_dir
+                )
+                if not os.path.exists(mount_point):
+                    os.makedirs(mount_point)
+                if not (block_backed or overlayfs_backed):
+                    self._bind_mount(
+                        source_dir=lxc_rootfs,
+                        mount_point=mount_point
+                    )
+                    mounted = True
+            else:
+                # Sync the container data from the container_path to work_dir
+                self._rsync_data(lxc_rootfs, temp_dir)
 
             if block_backed:
                 if snapshot_name not in self._lvm_lv_list():
@@ -1590,6 +1849,7 @@ class LxcContainerManagement(object):
                         lv_name=snapshot_name,
                         mount_point=mount_point
                     )
+                    mounted = True
                 else:
                     self.failure(
                         err='snapshot [ %s ] already exists' % snapshot_name,
@@ -1605,16 +1865,20 @@ class LxcContainerManagement(object):
                     upperdir=upperdir,
                     mount_point=mount_point
                 )
+                mounted = True
 
             # Set the state as changed and set a new fact
             self.state_change = True
-            return self._create_tar(source_dir=work_dir)
+            archive_name = self._create_tar(source_dir=work_dir)
         finally:
-            if block_backed or overlayfs_backed:
+            # An error raised above has already been reported, do not fail
+            # again while cleaning up.
+            unmounted = True
+            if mounted:
                 # unmount snapshot
-                self._unmount(mount_point)
+                unmounted = self._unmount(mount_point, quiet=True)
 
-            if block_backed:
+            if block_backed and unmounted:
                 # Remove snapshot
                 self._lvm_lv_remove(snapshot_name)
 
@@ -1625,18 +1889,19 @@ class LxcContainerManagement(object):
                 else:
                     self.container.start()
 
-            # Remove tmpdir
-            shutil.rmtree(temp_dir)
+            # Remove tmpdir, unless it still holds the mounted rootfs
+            if unmounted:
+                shutil.rmtree(temp_dir)
 
-    def check_count(self, count, method):
-        if count > 1:
+        if not unmounted:
             self.failure(
-                error='Failed to %s container' % method,
+                err='failed to unmount [ %s ]' % mount_point,
                 rc=1,
-                msg='The container [ %s ] failed to %s. Check to lxc is'
-                    ' available and that the container is in a functional'
-                    ' state.' % (self.container_name, method)
+                msg='The archive [ %s ] was created but [ %s ] could not be'
+                    ' unmounted, unmount it and remove [ %s ].'
+                    % (archive_name, mount_point, temp_dir)
             )
+        return archive_name
 
     def failure(self, **kwargs):
         """Return a Failure when running an Ansible command.
@@ -1667,14 +1932,135 @@ class LxcContainerManagement(object):
         )
 
 
+class LxcContainerGroup(object):
+    def __init__(self, module):
+        """Bulk state management of existing LXC containers.
+
+        :param module: Processed Ansible Module.
+        :type module: ``object``
+        """
+        self.module = module
+        self.state = self.module.params.get('state')
+        self.lxc_path = self.module.params.get('lxc_path', None)
+        self.names = self.module.params['names']
+        self.timeout = self.module.params.get('timeout') or 60
+
+    def _transition(self, container):
+        """Issue the state transition of a container without waiting.
+
+        :returns: True if the container state was changed.
+        :rtype: ``bol``
+        """
+
+        state = str(container.state).lower()
+        if self.state == 'started':
+            if state == 'frozen':
+                return container.unfreeze()
+            elif state != 'running':
+                return container.start()
+        elif self.state == 'stopped':
+            if state != 'stopped':
+                return container.stop()
+        elif self.state == 'restarted':
+            if state != 'stopped':
+                container.stop()
+                container.wait('STOPPED', self.timeout)
+            return container.start()
+        elif self.state == 'frozen':
+            if state == 'stopped':
+                container.start()
+                container.wait('RUNNING', self.timeout)
+            if state != 'frozen':
+                return container.freeze()
+        return False
+
+    def _wait(self, item):
+        """Wait for a container to reach the requested state.
+
+        :param item: container name, container and transition start time.
+        :type item: ``tuple``
+        :returns: name, whether the state was reached and elapsed seconds.
+        :rtype: ``tuple``
+        """
+
+        name, container, start = item
+        reached = container.wait(LXC_WAIT_STATES[self.state], self.timeout)
+        return name, reached, time.time() - start
+
+    def run(self):
+        """Bring all containers to the requested state."""
+
+        if self.state not in LXC_WAIT_STATES:
+            self.module.fail_json(
+                msg='state %s is not supported with names' % self.state
+            )
+
+        existing = lxc.list_containers(config_path=self.lxc_path)
+        missing = [i for i in self.names if i not in existing]
+        if missing:
+            self.module.fail_json(
+                msg='containers not found: %s' % ', '.join(missing)
+            )
+
+        # Issue every transition first so all containers change state
+        # concurrently, then wait on all of them.
+        changed = dict()
+        items = []
+        for name in self.names:
+            container = lxc.Container(name=name, config_path=self.lxc_path)
+            start = time.time()
+            changed[name] = bool(self._transition(container))
+            items.append((name, container, start))
+
+        if HAS_THREADPOOL and len(items) > 1:
+            pool = ThreadPool(len(items))
+            try:
+                results = pool.map(self._wait, items)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = map(self._wait, items)
+
+        outcome = dict()
+        failed = []
+        for name, reached, seconds in results:
+            container = lxc.Container(name=name, config_path=self.lxc_path)
+            outcome[name] = {
+                'state': str(container.state).lower(),
+                'changed': changed[name],
+                'seconds': round(seconds, 3)
+            }
+            if not reached:
+                failed.append(name)
+
+        if failed:
+            self.module.fail_json(
+                msg='containers did not reach state %s within %s seconds: %s'
+                    % (self.state, self.timeout, ', '.join(failed)),
+                lxc_containers=outcome
+            )
+
+        self.module.exit_json(
+            changed=True in changed.values(),
+            lxc_containers=outcome
+        )
+
+
 def main():
     """Ansible Main module."""
 
     module = AnsibleModule(
         argument_spec=dict(
             name=dict(
-                type='str',
-                required=True
+                type='str'
+            ),
+            names=dict(
+                type='list'
+            ),
+            timeout=dict(
+                type='int',
+                default=60
             ),
             template=dict(
                 type='str',
@@ -1754,12 +2140,18 @@ def main():
             archive_compression=dict(
                 choices=LXC_COMPRESSION_MAP.keys(),
                 default='gzip'
+            ),
+            archive_streaming=dict(
+                type='bool',
+                default=False
             )
         ),
         supports_check_mode=False,
         required_if = ([
             ('archive', True, ['archive_path'])
         ]),
+        required_one_of=[['name', 'names']],
+        mutually_exclusive=[['name', 'names']],
     )
 
     if not HAS_LXC:
@@ -1767,6 +2159,9 @@ def main():
             msg='The `lxc` module is not importable. Check the requirements.'
         )
 
+    if module.params.get('names'):
+        LxcContainerGroup(module=module).run()
+
     lv_name = module.params.get('lv_name')
     if not lv_name:
         module.params['lv_name'] = module.params.get('name')
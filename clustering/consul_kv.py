@@ -51,13 +51,35 @@ options:
         default: present
     key:
         description:
-          - the key at which the value should be stored.
+          - the key at which the value should be stored. When C(values) is
+            given, the prefix under which the values are stored.
         required: true
     value:
         description:
           - the value should be associated with the given key, required if state
             is present
         required: true
+    values:
+        description:
+          - a dictionary of keys, relative to C(key), and their values to
+            manage at once. The existing keys under the prefix are read with
+            one recursive request, and only the keys to create, update or
+            delete are sent to the agent through the transaction API, in
+            transactions of at most 64 operations. Each transaction is
+            applied atomically and only if none of its keys were modified
+            since they were read.
+          - with state 'absent' the listed keys are removed.
+          - requires python-consul >= 0.7.0
+        required: false
+        default: None
+        version_added: "2.2"
+    tree:
+        description:
+          - only used with C(values). Manage the whole prefix, keys under
+            C(key) that are not listed in C(values) are removed.
+        required: false
+        default: false
+        version_added: "2.2"
     recurse:
         description:
           - if the key represents a prefix, each entry with the prefix can be
@@ -131,6 +153,15 @@ EXAMPLES = '''
       key: ansible/groups/dc1/somenode
       value: 'top_secret'
 
+  - name: sync the configuration tree of a service, removing unlisted keys
+    consul_kv:
+      key: config/myservice
+      tree: true
+      values:
+        db/host: db1.example.com
+        db/port: 5432
+        log_level: info
+
   - name: Register a key/value pair with an associated session
     consul_kv:
       key: stg/node/server_birthday
@@ -139,6 +170,7 @@ EXAMPLES = '''
       state: acquire
 '''
 
+import base64
 import sys
 
 try:
@@ -150,10 +182,15 @@ except ImportError, e:
 
 from requests.exceptions import ConnectionError
 
+# maximum number of operations consul accepts in a single transaction
+TXN_MAX_OPS = 64
+
 def execute(module):
 
     state = module.params.get('state')
 
+    if module.params.get('values') is not None:
+        sync_values(module)
     if state == 'acquire' or state == 'release':
         lock(module, state)
     if state == 'present':
@@ -240,6 +277,97 @@ def remove_value(module):
                      data=existing)
 
 
+def sync_values(module):
+    ''' set the given values under the key prefix, and with tree remove the
+     other keys under it. the prefix is read with one recursive get and the
+     differences are applied as transactions of at most TXN_MAX_OPS
+     operations '''
+    consul_api = get_consul_api(module)
+
+    state = module.params.get('state')
+    if state not in ('present', 'absent'):
+        module.fail_json(msg='values can only be used with state present or absent')
+    prefix = module.params.get('key')
+    if not prefix.endswith('/'):
+        prefix += '/'
+    flags = module.params.get('flags')
+    if flags is not None:
+        flags = int(flags)
+
+    wanted = {}
+    for key, value in module.params.get('values').items():
+        if value is None:
+            value = ''
+        elif isinstance(value, unicode):
+            value = value.encode('utf-8')
+        else:
+            value = str(value)
+        wanted[prefix + key.lstrip('/')] = value
+
+    index, existing = consul_api.kv.get(prefix, recurse=True)
+    current = {}
+    for entry in existing or []:
+        current[entry['Key']] = entry
+
+    added = []
+    updated = []
+    removed = []
+    ops = []
+    if state == 'present':
+        for key in sorted(wanted):
+            entry = current.get(key)
+            if entry is None:
+                added.append(key)
+                ops.append(txn_op('cas', key, wanted[key], 0, flags))
+            elif (entry['Value'] or '') != wanted[key] or \
+                    (flags is not None and entry.get('Flags', 0) != flags):
+                updated.append(key)
+                ops.append(txn_op('cas', key, wanted[key], entry['ModifyIndex'], flags))
+    if state == 'absent' or module.params.get('tree'):
+        for key in sorted(current):
+            if key == prefix:
+                continue
+            if (state == 'absent') == (key in wanted):
+                removed.append(key)
+                ops.append(txn_op('delete-cas', key, None, current[key]['ModifyIndex']))
+
+    if ops and not module.check_mode:
+        if not hasattr(consul_api, 'txn'):
+            module.fail_json(msg='python-consul >= 0.7.0 is required to use values')
+        for i in range(0, len(ops), TXN_MAX_OPS):
+            result = consul_api.txn.put(ops[i:i + TXN_MAX_OPS])
+            if result and result.get('Errors'):
+                errors = [e.get('What') for e in result['Errors']]
+                module.fail_json(msg='transaction failed: %s' % '; '.join(errors),
+                                 applied=i)
+
+    before = {}
+    after = {}
+    for key in updated + removed:
+        before[key] = current[key]['Value'] or ''
+    for key in added + updated:
+        after[key] = wanted[key]
+
+    module.exit_json(changed=bool(ops),
+                     index=index,
+                     key=prefix,
+                     added=added,
+                     updated=updated,
+                     removed=removed,
+                     diff=dict(before=before, after=after))
+
+
+def txn_op(verb, key, value=None, index=None, flags=None):
+    op = {'Verb': verb, 'Key': key}
+    if value is not None:
+        op['Value'] = base64.b64encode(value)
+    if index is not None:
+        op['Index'] = index
+    if flags is not None:
+        op['Flags'] = flags
+    return {'KV': op}
+
+
 def get_consul_api(module, token=None):
     return consul.Consul(host=module.params.get('host'),
                          port=module.params.get('port'),
@@ -267,10 +395,12 @@ def main():
         state=dict(default='present', choices=['present', 'absent', 'acquire', 'release']),
         token=dict(required=False, default='anonymous', no_log=True),
         value=dict(required=False),
+        values=dict(required=False, type='dict'),
+        tree=dict(required=False, default=False, type='bool'),
         session=dict(required=False)
     )
 
-    module = AnsibleModule(argument_spec, supports_check_mode=False)
+    module = AnsibleModule(argument_spec, supports_check_mode=True)
 
     test_dependencies(module)
         
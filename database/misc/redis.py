@@ -64,6 +64,24 @@ options:
         required: false
         default: slave
         choices: [ "master", "slave" ]
+    wait_for_sync:
+        version_added: "2.2"
+        description:
+            - Wait until the link to the master is up and the initial sync is
+              done. The instance is polled on one connection with the
+              replication section of INFO only, with a growing delay. The
+              initial sync time and the replication offset lag to the master
+              are returned. [slave command]
+        required: false
+        default: false
+        choices: [ "yes", "no" ]
+    sync_timeout:
+        version_added: "2.2"
+        description:
+            - Seconds to wait for the sync when wait_for_sync is set.
+              [slave command]
+        required: false
+        default: 300
     db:
         description:
             - The database to flush (used in db mode) [flush command]
@@ -76,6 +94,15 @@ options:
         required: false
         default: all
         choices: [ "all", "db" ]
+    flush_async:
+        version_added: "2.2"
+        description:
+            - Flush with FLUSHALL ASYNC / FLUSHDB ASYNC so the keys are freed
+              in the background and the instance is not blocked while
+              flushing. Requires redis >= 4.0. [flush command]
+        required: false
+        default: false
+        choices: [ "yes", "no" ]
     name:
         version_added: 1.6
         description:
@@ -88,6 +115,23 @@ options:
             - A redis config value.
         required: false
         default: null
+    config:
+        version_added: "2.2"
+        description:
+            - A dict of redis config keys and values to ensure at once.
+              All current values are read with a single CONFIG GET * and
+              only the differing ones are set, pipelined on one connection.
+              Can be combined with name/value. [config command]
+        required: false
+        default: null
+    config_rewrite:
+        version_added: "2.2"
+        description:
+            - Run CONFIG REWRITE after changing settings so they are persisted
+              to the redis.conf of the instance. [config command]
+        required: false
+        default: false
+        choices: [ "yes", "no" ]
 
 
 notes:
@@ -108,6 +152,10 @@ EXAMPLES = '''
 # Deactivate slave mode
 - redis: command=slave slave_mode=master
 
+# Set local redis instance to be slave of melee.island and wait for the
+# initial sync to finish
+- redis: command=slave master_host=melee.island master_port=6377 wait_for_sync=yes sync_timeout=600
+
 # Flush all the redis db
 - redis: command=flush flush_mode=all
 
@@ -119,6 +167,19 @@ EXAMPLES = '''
 
 # Configure local redis to have lua time limit of 100 ms
 - redis: command=config name=lua-time-limit value=100
+
+# Flush all the redis db without blocking the instance
+- redis: command=flush flush_mode=all flush_async=yes
+
+# Ensure several settings at once and persist them to redis.conf
+- redis:
+    command: config
+    config:
+      maxclients: 10000
+      maxmemory: 2gb
+      maxmemory-policy: allkeys-lru
+      appendonly: yes
+    config_rewrite: yes
 '''
 
 try:
@@ -140,6 +201,44 @@ def set_slave_mode(client, master_host, master_port):
         return False
 
 
+def wait_for_sync(client, timeout):
+    """Wait for the link to the master to be up and the sync to be done.
+
+    Polls the replication section of INFO on the given connection, doubling
+    the delay between polls up to 5 seconds. Returns whether the sync
+    finished, the seconds waited and the last replication info.
+    """
+    start = time.time()
+    delay = 0.1
+    while True:
+        info = client.info('replication')
+        elapsed = time.time() - start
+        if info.get('master_link_status') == 'up' and \
+                not info.get('master_sync_in_progress'):
+            return True, elapsed, info
+        if elapsed + delay > timeout:
+            return False, elapsed, info
+        time.sleep(delay)
+        delay = min(delay * 2, 5)
+
+
+def get_offset_lag(client, info):
+    """Return how many bytes of the master replication stream the slave
+    has not processed yet, or None if the master can not be queried.
+
+    The master is queried with the masterauth of the slave.
+    """
+    try:
+        password = client.config_get('masterauth').get('masterauth') or None
+        master = redis.StrictRedis(host=info['master_host'],
+                                   port=info['master_port'],
+                                   password=password)
+        master_offset = master.info('replication')['master_repl_offset']
+    except Exception:
+        return None
+    return max(master_offset - info.get('slave_repl_offset', 0), 0)
+
+
 def set_master_mode(client):
     try:
         return client.slaveof()
@@ -147,17 +246,87 @@ def set_master_mode(client):
         return False
 
 
-def flush(client, db=None):
+def flush(client, db=None, asynchronous=False):
     try:
         if type(db) != int:
+            if asynchronous:
+                return client.execute_command('FLUSHALL', 'ASYNC')
             return client.flushall()
         else:
             # The passed client has been connected to the database already
+            if asynchronous:
+                return client.execute_command('FLUSHDB', 'ASYNC')
             return client.flushdb()
     except Exception:
         return False
 
 
+# Memory units accepted by redis, see redis.conf
+MEMORY_UNITS = {
+    'k': 1000,
+    'kb': 1024,
+    'm': 1000 * 1000,
+    'mb': 1024 * 1024,
+    'g': 1000 * 1000 * 1000,
+    'gb': 1024 * 1024 * 1024,
+}
+
+
+def normalize_config_value(value):
+    """Return value the way CONFIG GET reports it."""
+    if type(value) == bool:
+        if value:
+            return 'yes'
+        return 'no'
+    value = str(value)
+    match = re.match(r'^(\d+)([kKmMgG][bB]?)$', value)
+    if match:
+        return str(int(match.group(1)) * MEMORY_UNITS[match.group(2).lower()])
+    return value
+
+
+def set_config(client, settings, rewrite=False, check_mode=False):
+    """Set the settings that differ from the current configuration.
+
+    The current values are read with one CONFIG GET * and the changes are
+    sent in a single pipeline. Returns a dict with the before and after
+    value of every changed setting.
+    """
+    current = client.config_get('*')
+    unknown = [name for name in settings if name not in current]
+    if unknown:
+        raise ValueError('unknown config keys: %s' % ', '.join(unknown))
+
+    changes = {}
+    for name, value in settings.items():
+        value = normalize_config_value(value)
+        if current[name] != value:
+            changes[name] = {'before': current[name], 'after': value}
+
+    if changes and not check_mode:
+        pipe = client.pipeline(transaction=False)
+        for name in changes:
+            pipe.config_set(name, changes[name]['after'])
+        if rewrite:
+            pipe.execute_command('CONFIG REWRITE')
+        pipe.execute()
+    return changes
+
+
+def sync_status(module, client, timeout):
+    try:
+        synced, elapsed, info = wait_for_sync(client, timeout)
+    except Exception, e:
+        module.fail_json(msg="unable to read replication info: %s" % e)
+    if not synced:
+        module.fail_json(msg="master link not up after %d seconds" % timeout,
+                         master_link_status=info.get('master_link_status'))
+    return {
+        'sync_seconds': round(elapsed, 3),
+        'offset_lag': get_offset_lag(client, info),
+    }
+
+
 # ===========================================
 # Module execution.
 #
@@ -172,10 +341,15 @@ def main():
             master_host=dict(default=None),
             master_port=dict(default=None, type='int'),
             slave_mode=dict(default='slave', choices=['master', 'slave']),
+            wait_for_sync=dict(default=False, type='bool'),
+            sync_timeout=dict(default=300, type='int'),
             db=dict(default=None, type='int'),
             flush_mode=dict(default='all', choices=['all', 'db']),
+            flush_async=dict(default=False, type='bool'),
             name=dict(default=None),
-            value=dict(default=None)
+            value=dict(default=None),
+            config=dict(default=None, type='dict'),
+            config_rewrite=dict(default=False, type='bool')
         ),
         supports_check_mode = True
     )
@@ -193,6 +367,8 @@ def main():
         master_host = module.params['master_host']
         master_port = module.params['master_port']
         mode = module.params['slave_mode']
+        sync = module.params['wait_for_sync']
+        sync_timeout = module.params['sync_timeout']
 
         #Check if we have all the data
         if mode == "slave":  # Only need data if we want to be slave
@@ -227,6 +403,8 @@ def main():
                 'master_host': master_host,
                 'master_port': master_port,
             }
+            if sync and not module.check_mode:
+                status.update(sync_status(module, r, sync_timeout))
             module.exit_json(changed=False, mode=status)
         else:
             # Do the stuff
@@ -235,12 +413,13 @@ def main():
             if mode == "slave":
                 if module.check_mode or\
                    set_slave_mode(r, master_host, master_port):
-                    info = r.info()
                     status = {
                         'status': mode,
                         'master_host': master_host,
                         'master_port': master_port,
                     }
+                    if sync and not module.check_mode:
+                        status.update(sync_status(module, r, sync_timeout))
                     module.exit_json(changed=True, mode=status)
                 else:
                     module.fail_json(msg='Unable to set slave mode')
@@ -255,6 +434,7 @@ def main():
     elif command == "flush":
         db = module.params['db']
         mode = module.params['flush_mode']
+        flush_async = module.params['flush_async']
 
         #Check if we have all the data
         if mode == "db":
@@ -276,43 +456,48 @@ def main():
         # (Check Check_mode before commands so the commands aren't evaluated
         # if not necessary)
         if mode == "all":
-            if module.check_mode or flush(r):
+            if module.check_mode or flush(r, asynchronous=flush_async):
                 module.exit_json(changed=True, flushed=True)
             else:  # Flush never fails :)
                 module.fail_json(msg="Unable to flush all databases")
 
         else:
-            if module.check_mode or flush(r, db):
+            if module.check_mode or flush(r, db, flush_async):
                 module.exit_json(changed=True, flushed=True, db=db)
             else:  # Flush never fails :)
                 module.fail_json(msg="Unable to flush '%d' database" % db)
     elif command == 'config':
         name = module.params['name']
         value = module.params['value']
+        config = module.params['config']
+
+        if not name and not config:
+            module.fail_json(msg='name or config must be provided')
+
+        settings = {}
+        if config:
+            settings.update(config)
+        if name:
+            settings[name] = value
 
         r = redis.StrictRedis(host=login_host,
                               port=login_port,
                               password=login_password)
 
+        # CONFIG GET * doubles as the connection check
         try:
-            r.ping()
-        except Exception, e:
+            changes = set_config(r, settings,
+                                 rewrite=module.params['config_rewrite'],
+                                 check_mode=module.check_mode)
+        except redis.ConnectionError, e:
             module.fail_json(msg="unable to connect to database: %s" % e)
-
-        
-        try:
-            old_value = r.config_get(name)[name]
         except Exception, e:
-            module.fail_json(msg="unable to read config: %s" % e)
-        changed = old_value != value
+            module.fail_json(msg="unable to write config: %s" % e)
 
-        if module.check_mode or not changed:
-            module.exit_json(changed=changed, name=name, value=value)
+        changed = len(changes) > 0
+        if config:
+            module.exit_json(changed=changed, config=changes)
         else:
-            try:
-                r.config_set(name, value)
-            except Exception, e:
-                module.fail_json(msg="unable to write config: %s" % e)
             module.exit_json(changed=changed, name=name, value=value)
     else:
         module.fail_json(msg='A valid command must be provided')
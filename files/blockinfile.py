@@ -100,6 +100,34 @@ options:
     description:
       - 'This flag indicates that filesystem links, if they exist, should be followed.'
     version_added: "2.1"
+  blocks:
+    required: false
+    default: null
+    description:
+      - A list of blocks to manage in one pass over C(dest). Each item is a
+        dictionary which may contain the keys C(marker), C(block) (or
+        C(content)), C(state), C(insertafter) and C(insertbefore); missing
+        keys default to the module options of the same name.
+      - The file is read and scanned for markers once, every block is
+        applied, C(validate) runs once and the file is written once.
+        Per-block results are returned in C(results).
+      - Every item must resolve to a distinct C(marker). Blocks that share
+        an insertion point are inserted in the order they are listed.
+      - Mutually exclusive with C(block).
+    version_added: "2.2"
+  streaming:
+    required: false
+    default: 'no'
+    choices: [ 'yes', 'no' ]
+    description:
+      - Process C(dest) line by line instead of loading it into memory.
+        Markers and the insertion anchor are located in one scan, the
+        result is written straight to a temporary file in the directory of
+        C(dest), and an unchanged file is detected by comparing checksums.
+        Meant for very large files.
+      - Lines are split the same way as without streaming, so CR and CRLF
+        line ends are rewritten as line feeds in both modes.
+    version_added: "2.2"
 """
 
 EXAMPLES = r"""
@@ -144,6 +172,31 @@ EXAMPLES = r"""
       - { name: host1, ip: 10.10.1.10 }
       - { name: host2, ip: 10.10.1.11 }
       - { name: host3, ip: 10.10.1.12 }
+
+- name: Manage several sshd_config blocks with one write and one validation
+  blockinfile:
+    dest: /etc/ssh/sshd_config
+    validate: "/usr/sbin/sshd -T -f %s"
+    blocks:
+      - marker: "# {mark} ANSIBLE MANAGED BLOCK ansible-agent"
+        block: |
+          Match User ansible-agent
+          PasswordAuthentication no
+      - marker: "# {mark} ANSIBLE MANAGED BLOCK backup"
+        block: |
+          Match User backup
+          ForceCommand internal-sftp
+      - marker: "# {mark} ANSIBLE MANAGED BLOCK legacy"
+        state: absent
+"""
+
+RETURN = """
+results:
+    description: Per-block outcome when C(blocks) is used.
+    returned: when C(blocks) is used
+    type: list
+    sample: [{"marker": "# {mark} ANSIBLE MANAGED BLOCK backup",
+              "state": "present", "changed": true, "msg": "Block inserted"}]
 """
 
 import re
@@ -158,6 +211,11 @@ def write_changes(module, contents, dest):
     f.write(contents)
     f.close()
 
+    install_changes(module, tmpfile, dest)
+
+
+def install_changes(module, tmpfile, dest):
+
     validate = module.params.get('validate', None)
     valid = not validate
     if validate:
@@ -166,12 +224,17 @@ def write_changes(module, contents, dest):
         (rc, out, err) = module.run_command(validate % tmpfile)
         valid = rc == 0
         if rc != 0:
+            os.remove(tmpfile)
             module.fail_json(msg='failed to validate: '
                                  'rc:%s error:%s' % (rc, err))
     if valid:
         module.atomic_move(tmpfile, dest)
 
 
+BLOCK_KEYS = ('marker', 'block', 'content', 'state',
+              'insertafter', 'insertbefore')
+
+
 def check_file_attrs(module, changed, message):
 
     file_args = module.load_file_common_arguments(module.params)
@@ -185,6 +248,296 @@ def check_file_attrs(module, changed, message):
     return message, changed
 
 
+def prepare_block(module, spec):
+    """Build the internal description of one block from its options."""
+
+    params = module.params
+    marker = spec.get('marker', None) or params['marker']
+    block = spec.get('block', spec.get('content', None))
+    if block is None:
+        block = params['block'] or ''
+    state = spec.get('state', None) or params['state']
+    if state not in ('absent', 'present'):
+        module.fail_json(msg='state of block %s must be one of: '
+                             'absent, present' % marker)
+
+    insertbefore = spec.get('insertbefore', None)
+    insertafter = spec.get('insertafter', None)
+    if insertbefore is not None and insertafter is not None:
+        module.fail_json(msg='insertbefore and insertafter are mutually '
+                             'exclusive for block %s' % marker)
+    if insertbefore is None and insertafter is None:
+        insertbefore = params['insertbefore']
+        insertafter = params['insertafter']
+    if insertbefore is None and insertafter is None:
+        insertafter = 'EOF'
+
+    if insertafter not in (None, 'EOF'):
+        insertre = insertafter
+    elif insertbefore not in (None, 'BOF'):
+        insertre = insertbefore
+    else:
+        insertre = None
+
+    marker0 = re.sub(r'{mark}', 'BEGIN', marker)
+    marker1 = re.sub(r'{mark}', 'END', marker)
+    present = state == 'present'
+    if present and block:
+        # Escape seqeuences like '\n' need to be handled in Ansible 1.x
+        if module.ansible_version.startswith('1.'):
+            block = re.sub('', block, '')
+        blocklines = [marker0] + block.splitlines() + [marker1]
+    else:
+        blocklines = []
+
+    return dict(marker=marker, state=state, marker0=marker0,
+                marker1=marker1, insertre=insertre,
+                insertafter=insertafter, insertbefore=insertbefore,
+                blocklines=blocklines, n0=None, n1=None)
+
+
+def scan_lines(module, lines, blocks):
+    """Locate markers and insertion anchors of all blocks in one pass.
+
+    Marker positions are stored on the block dictionaries; the last
+    matching line of every insertion regex is returned along with the
+    number of lines seen.
+    """
+
+    markers = {}
+    for b in blocks:
+        markers.setdefault(b['marker0'], []).append((b, 'n0'))
+        markers.setdefault(b['marker1'], []).append((b, 'n1'))
+    lengths = list(set([len(m) for m in markers]))
+    lengths.sort()
+
+    regexes = []
+    anchors = {}
+    for b in blocks:
+        pattern = b['insertre']
+        if pattern is not None and pattern not in anchors:
+            try:
+                regexes.append((pattern, re.compile(pattern)))
+            except re.error:
+                e = get_exception()
+                module.fail_json(msg='invalid regular expression %s: %s'
+                                     % (pattern, e))
+            anchors[pattern] = None
+
+    count = 0
+    for i, line in enumerate(lines):
+        for length in lengths:
+            hits = markers.get(line[:length])
+            if hits:
+                for b, key in hits:
+                    b[key] = i
+        for pattern, regex in regexes:
+            if regex.search(line):
+                anchors[pattern] = i
+        count = i + 1
+
+    return count, anchors
+
+
+def plan_edits(module, blocks, count, anchors):
+    """Turn scanned blocks into sorted, non-overlapping line edits."""
+
+    edits = []
+    for order, b in enumerate(blocks):
+        result = dict(marker=b['marker'], state=b['state'],
+                      changed=False, msg='')
+        b['result'] = result
+        n0, n1 = b['n0'], b['n1']
+        if None in (n0, n1):
+            if not b['blocklines']:
+                continue
+            if b['insertre'] is not None:
+                start = anchors[b['insertre']]
+                if start is None:
+                    start = count
+                elif b['insertafter'] is not None:
+                    start += 1
+            elif b['insertbefore'] is not None:
+                start = 0        # insertbefore=BOF
+            else:
+                start = count    # insertafter=EOF
+            end = start
+        else:
+            start, end = min(n0, n1), max(n0, n1) + 1
+        edits.append((start, end != start, order, end, b))
+
+    edits.sort()
+    planned = []
+    pos = 0
+    for start, replace, order, end, b in edits:
+        if start < pos:
+            if replace:
+                module.fail_json(msg='block %s overlaps another managed '
+                                     'block' % b['marker'])
+            # insertion anchor inside a replaced block: insert after it
+            start = end = pos
+        planned.append(dict(start=start, end=end, block=b))
+        pos = end
+    return planned
+
+
+def next_edit(edits):
+    for edit in edits:
+        return edit
+    return None
+
+
+def render_lines(lines, edits):
+    """Yield the lines of the file with the planned edits applied.
+
+    The per-block result of every edit is filled in as a side effect.
+    """
+
+    edits = iter(edits)
+    pending = next_edit(edits)
+    current = None
+    skip_until = 0
+    for i, line in enumerate(lines):
+        while pending is not None and pending['start'] == i:
+            if current is not None:
+                finish_edit(current)
+            current = pending
+            current['old'] = []
+            for newline in current['block']['blocklines']:
+                yield newline
+            skip_until = current['end']
+            pending = next_edit(edits)
+        if i < skip_until:
+            current['old'].append(line)
+        else:
+            yield line
+
+    if current is not None:
+        finish_edit(current)
+    while pending is not None:
+        pending['old'] = []
+        for newline in pending['block']['blocklines']:
+            yield newline
+        finish_edit(pending)
+        pending = next_edit(edits)
+
+
+def finish_edit(edit):
+    """Record whether an edit changed the lines of its block."""
+
+    b = edit['block']
+    result = b['result']
+    if edit['old'] == b['blocklines']:
+        return
+    result['changed'] = True
+    if b['blocklines']:
+        result['msg'] = 'Block inserted'
+    else:
+        result['msg'] = 'Block removed'
+
+
+def read_lines(f, digest=None):
+    """Yield the lines of an open file without their line ends.
+
+    Lines are split the same way as str.splitlines() does for the whole
+    file, so CR and CRLF line ends are replaced like in memory.
+    """
+
+    for line in f:
+        if digest is not None:
+            digest.update(line)
+        for part in line.splitlines():
+            yield part
+
+
+def stream_changes(module, dest, blocks):
+    """Apply blocks to dest without holding the file in memory.
+
+    The file is read twice: once to index markers and anchors and hash
+    the original content, once to write the result to a temporary file
+    next to dest while hashing it. Returns a (changed, tmpfile) tuple:
+    tmpfile is the path of the temporary file holding the result if the
+    content changed, None otherwise. In check mode only the hash of the
+    result is computed and tmpfile is always None.
+    """
+
+    hash_func = AVAILABLE_HASH_ALGORITHMS['sha1']
+    before = hash_func()
+    after = hash_func()
+
+    exists = os.path.exists(dest)
+    newline_at_eof = False
+    if exists:
+        f = open(dest, 'rb')
+        count, anchors = scan_lines(module, read_lines(f, before), blocks)
+        if f.tell() > 0:
+            f.seek(-1, 2)
+            newline_at_eof = f.read(1) == '\n'
+        f.close()
+    else:
+        count, anchors = scan_lines(module, [], blocks)
+    edits = plan_edits(module, blocks, count, anchors)
+
+    out = None
+    tmpfile = None
+    if not module.check_mode:
+        # a dot file is skipped by the tools reading a whole directory,
+        # like sudo and cron, should it be left behind
+        tmpfd, tmpfile = tempfile.mkstemp(
+            prefix='.%s.' % os.path.basename(dest), dir=os.path.dirname(dest))
+        out = os.fdopen(tmpfd, 'wb')
+
+    f = None
+    try:
+        if exists:
+            f = open(dest, 'rb')
+            lines = read_lines(f)
+        else:
+            lines = []
+
+        sep = ''
+        for line in render_lines(lines, edits):
+            chunk = sep + line
+            sep = '\n'
+            after.update(chunk)
+            if out is not None:
+                out.write(chunk)
+        if sep and newline_at_eof:
+            after.update(sep)
+            if out is not None:
+                out.write(sep)
+
+        if f is not None:
+            f.close()
+        if out is not None:
+            out.close()
+    except:
+        if f is not None:
+            f.close()
+        if out is not None:
+            out.close()
+            os.remove(tmpfile)
+        raise
+
+    if exists and before.hexdigest() == after.hexdigest():
+        if tmpfile is not None:
+            os.remove(tmpfile)
+        return False, None
+    return True, tmpfile
+
+
+def change_message(multi, blocks, created):
+
+    if created:
+        return 'File created'
+    if multi:
+        return '%d of %d blocks changed' % (
+            len([b for b in blocks if b['result']['changed']]), len(blocks))
+    if not blocks[0]['blocklines']:
+        return 'Block removed'
+    return 'Block inserted'
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -192,13 +545,16 @@ def main():
             state=dict(default='present', choices=['absent', 'present']),
             marker=dict(default='# {mark} ANSIBLE MANAGED BLOCK', type='str'),
             block=dict(default='', type='str', aliases=['content']),
+            blocks=dict(default=None, type='list'),
             insertafter=dict(default=None),
             insertbefore=dict(default=None),
             create=dict(default=False, type='bool'),
             backup=dict(default=False, type='bool'),
             validate=dict(default=None, type='str'),
+            streaming=dict(default=False, type='bool'),
         ),
-        mutually_exclusive=[['insertbefore', 'insertafter']],
+        mutually_exclusive=[['insertbefore', 'insertafter'],
+                            ['blocks', 'block']],
         add_file_common_args=True,
         supports_check_mode=True
     )
@@ -212,102 +568,89 @@ def main():
         module.fail_json(rc=256,
                          msg='Destination %s is a directory !' % dest)
 
-    if not os.path.exists(dest):
-        if not module.boolean(params['create']):
-            module.fail_json(rc=257,
-                             msg='Destination %s does not exist !' % dest)
-        original = None
-        lines = []
-    else:
-        f = open(dest, 'rb')
-        original = f.read()
-        f.close()
-        lines = original.splitlines()
-
-    insertbefore = params['insertbefore']
-    insertafter = params['insertafter']
-    block = params['block']
-    marker = params['marker']
-    present = params['state'] == 'present'
+    exists = os.path.exists(dest)
+    if not exists and not module.boolean(params['create']):
+        module.fail_json(rc=257,
+                         msg='Destination %s does not exist !' % dest)
 
-    if insertbefore is None and insertafter is None:
-        insertafter = 'EOF'
-
-    if insertafter not in (None, 'EOF'):
-        insertre = re.compile(insertafter)
-    elif insertbefore not in (None, 'BOF'):
-        insertre = re.compile(insertbefore)
+    multi = params['blocks'] is not None
+    if multi:
+        specs = params['blocks']
     else:
-        insertre = None
-
-    marker0 = re.sub(r'{mark}', 'BEGIN', marker)
-    marker1 = re.sub(r'{mark}', 'END', marker)
-    if present and block:
-        # Escape seqeuences like '\n' need to be handled in Ansible 1.x
-        if module.ansible_version.startswith('1.'):
-            block = re.sub('', block, '')
-        blocklines = [marker0] + block.splitlines() + [marker1]
+        specs = [{}]
+
+    blocks = []
+    seen = set()
+    for spec in specs:
+        if not isinstance(spec, dict):
+            module.fail_json(msg='blocks items must be dictionaries, '
+                                 'got %s' % spec)
+        unknown = [k for k in spec if k not in BLOCK_KEYS]
+        if unknown:
+            module.fail_json(msg='unsupported keys in blocks item: %s'
+                                 % ', '.join(unknown))
+        b = prepare_block(module, spec)
+        if b['marker'] in seen:
+            module.fail_json(msg='marker %s is used by more than one '
+                                 'block' % b['marker'])
+        seen.add(b['marker'])
+        blocks.append(b)
+
+    tmpfile = None
+    if module.boolean(params['streaming']):
+        changed, tmpfile = stream_changes(module, dest, blocks)
     else:
-        blocklines = []
-
-    n0 = n1 = None
-    for i, line in enumerate(lines):
-        if line.startswith(marker0):
-            n0 = i
-        if line.startswith(marker1):
-            n1 = i
-
-    if None in (n0, n1):
-        n0 = None
-        if insertre is not None:
-            for i, line in enumerate(lines):
-                if insertre.search(line):
-                    n0 = i
-            if n0 is None:
-                n0 = len(lines)
-            elif insertafter is not None:
-                n0 += 1
-        elif insertbefore is not None:
-            n0 = 0           # insertbefore=BOF
+        if exists:
+            f = open(dest, 'rb')
+            original = f.read()
+            f.close()
+            lines = original.splitlines()
         else:
-            n0 = len(lines)  # insertafter=EOF
-    elif n0 < n1:
-        lines[n0:n1+1] = []
-    else:
-        lines[n1:n0+1] = []
-        n0 = n1
+            original = None
+            lines = []
 
-    lines[n0:n0] = blocklines
+        count, anchors = scan_lines(module, lines, blocks)
+        edits = plan_edits(module, blocks, count, anchors)
+        lines = list(render_lines(lines, edits))
 
-    if lines:
-        result = '\n'.join(lines)
-        if original and original.endswith('\n'):
-            result += '\n'
-    else:
-        result = ''
-    if original == result:
-        msg = ''
-        changed = False
-    elif original is None:
-        msg = 'File created'
-        changed = True
-    elif not blocklines:
-        msg = 'Block removed'
-        changed = True
-    else:
-        msg = 'Block inserted'
-        changed = True
+        if lines:
+            result = '\n'.join(lines)
+            if original and original.endswith('\n'):
+                result += '\n'
+        else:
+            result = ''
+        changed = original != result
+
+    msg = ''
+    if changed:
+        msg = change_message(multi, blocks, not exists)
 
     if changed and not module.check_mode:
-        if module.boolean(params['backup']) and os.path.exists(dest):
-            module.backup_local(dest)
-        write_changes(module, result, dest)
+        if tmpfile is None:
+            if module.boolean(params['backup']) and exists:
+                module.backup_local(dest)
+            write_changes(module, result, dest)
+        else:
+            try:
+                if module.boolean(params['backup']) and exists:
+                    module.backup_local(dest)
+                install_changes(module, tmpfile, dest)
+            except:
+                # validation failed, or the backup or the move did not
+                # work, do not leave the new content next to dest
+                if os.path.exists(tmpfile):
+                    os.remove(tmpfile)
+                raise
 
     msg, changed = check_file_attrs(module, changed, msg)
+    if multi:
+        module.exit_json(changed=changed, msg=msg,
+                         results=[b['result'] for b in blocks])
     module.exit_json(changed=changed, msg=msg)
 
 # import module snippets
 from ansible.module_utils.basic import *
 from ansible.module_utils.splitter import *
+from ansible.module_utils.pycompat24 import get_exception
 if __name__ == '__main__':
     main()
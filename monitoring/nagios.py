@@ -21,7 +21,7 @@ module: nagios
 short_description: Perform common tasks in Nagios related to downtime and notifications.
 description:
   - "The M(nagios) module has two basic functions: scheduling downtime and toggling alerts for services or hosts."
-  - All actions require the I(host) parameter to be given explicitly. In playbooks you can use the C({{inventory_hostname}}) variable to refer to the host the playbook is currently running on.
+  - All actions require the I(host) or I(hosts) parameter to be given explicitly. In playbooks you can use the C({{inventory_hostname}}) variable to refer to the host the playbook is currently running on.
   - You can specify multiple services at once by separating them with commas, .e.g., C(services=httpd,nfs,puppet).
   - When specifying what service to handle there is a special service value, I(host), which will handle alerts/downtime for the I(host itself), e.g., C(service=host). This keyword may not be given with other services at the same time. I(Setting alerts/downtime for a host does not affect alerts/downtime for any of the services running on it.) To schedule downtime for all services on particular host use keyword "all", e.g., C(service=all).
   - When using the M(nagios) module you will need to specify your Nagios server using the C(delegate_to) parameter.
@@ -41,6 +41,13 @@ options:
       - Host to operate on in Nagios.
     required: false
     default: null
+  hosts:
+    version_added: "2.2"
+    description:
+      - List of hosts to operate on in Nagios, instead of a single I(host).
+        The commands for all hosts are submitted to the command file at once.
+    required: false
+    default: null
   cmdfile:
     description:
       - Path to the nagios I(command file) (FIFO pipe).
@@ -110,6 +117,13 @@ EXAMPLES = '''
 # set 30 minutes downtime for all host in servicegroup foo
 - nagios: action=servicegroup_host_downtime minutes=30 servicegroup=foo host={{ inventory_hostname }}
 
+# schedule downtime for ALL services on a whole deploy wave in one submission
+- nagios:
+    action: downtime
+    minutes: 30
+    service: all
+    hosts: "{{ groups['wave1'] }}"
+
 # delete all downtime for a given host
 - nagios: action=delete_downtime host={{ inventory_hostname }} service=all
 
@@ -144,7 +158,12 @@ EXAMPLES = '''
 import ConfigParser
 import types
 import time
+import os
 import os.path
+import select
+
+# writes of at most PIPE_BUF bytes to a FIFO are atomic
+PIPE_BUF = getattr(select, 'PIPE_BUF', 512)
 
 ######################################################################
 
@@ -207,16 +226,19 @@ def main():
             author=dict(default='Ansible'),
             comment=dict(default='Scheduling downtime'),
             host=dict(required=False, default=None),
+            hosts=dict(required=False, default=None, type='list'),
             servicegroup=dict(required=False, default=None),
             minutes=dict(default=30),
             cmdfile=dict(default=which_cmdfile()),
             services=dict(default=None, aliases=['service']),
             command=dict(required=False, default=None),
-            )
+            ),
+        mutually_exclusive=[['host', 'hosts']],
         )
 
     action = module.params['action']
     host = module.params['host']
+    hosts = module.params['hosts']
     servicegroup = module.params['servicegroup']
     minutes = module.params['minutes']
     services = module.params['services']
@@ -235,7 +257,7 @@ def main():
 
     ##################################################################
     if action not in ['command', 'silence_nagios', 'unsilence_nagios']:
-        if not host:
+        if not host and not hosts:
             module.fail_json(msg='no host specified for action requiring one')
     ######################################################################
     if action == 'downtime':
@@ -313,6 +335,10 @@ class Nagios(object):
         self.author = kwargs['author']
         self.comment = kwargs['comment']
         self.host = kwargs['host']
+        if kwargs.get('hosts'):
+            self.hosts = kwargs['hosts']
+        else:
+            self.hosts = [self.host]
         self.servicegroup = kwargs['servicegroup']
         self.minutes = int(kwargs['minutes'])
         self.cmdfile = kwargs['cmdfile']
@@ -324,6 +350,7 @@ class Nagios(object):
             self.services = kwargs['services'].split(',')
 
         self.command_results = []
+        self.pending_commands = []
 
     def _now(self):
         """
@@ -334,19 +361,48 @@ class Nagios(object):
 
     def _write_command(self, cmd):
         """
-        Write the given command to the Nagios command file
+        Queue the given command, it is written to the Nagios command
+        file along with the other commands of the action by
+        _flush_commands()
+        """
+
+        self.pending_commands.append(cmd)
+
+    def _flush_commands(self):
+        """
+        Write the queued commands to the Nagios command file
+
+        The command file is opened once and the commands are written
+        in chunks of whole lines of at most PIPE_BUF bytes, so each
+        chunk reaches Nagios atomically and no command is split.
         """
 
+        chunks = []
+        chunk = ''
+        for cmd in self.pending_commands:
+            if chunk and len(chunk) + len(cmd) > PIPE_BUF:
+                chunks.append(chunk)
+                chunk = ''
+            chunk += cmd
+        if chunk:
+            chunks.append(chunk)
+
         try:
-            fp = open(self.cmdfile, 'w')
-            fp.write(cmd)
-            fp.flush()
-            fp.close()
-            self.command_results.append(cmd.strip())
-        except IOError:
+            fd = os.open(self.cmdfile, os.O_WRONLY | os.O_APPEND)
+            try:
+                for chunk in chunks:
+                    while chunk:
+                        chunk = chunk[os.write(fd, chunk):]
+            finally:
+                os.close(fd)
+        except (IOError, OSError):
             self.module.fail_json(msg='unable to write to nagios command file',
                                   cmdfile=self.cmdfile)
 
+        for cmd in self.pending_commands:
+            self.command_results.append(cmd.strip())
+        self.pending_commands = []
+
     def _fmt_dt_str(self, cmd, host, duration, author=None,
                     comment=None, start=None,
                     svc=None, fixed=1, trigger=0):
@@ -956,73 +1012,85 @@ class Nagios(object):
         Figure out what you want to do from ansible, and then do the
         needful (at the earliest).
         """
+        if self.action in ['downtime', 'delete_downtime', 'silence',
+                           'unsilence', 'enable_alerts', 'disable_alerts']:
+            for host in self.hosts:
+                self.act_on_host(host)
+
+        elif self.action == "servicegroup_host_downtime":
+            if self.servicegroup:
+                self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+        elif self.action == "servicegroup_service_downtime":
+            if self.servicegroup:
+                self.schedule_servicegroup_svc_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+
+        elif self.action == 'silence_nagios':
+            self.silence_nagios()
+
+        elif self.action == 'unsilence_nagios':
+            self.unsilence_nagios()
+
+        elif self.action == 'command':
+            self.nagios_cmd(self.command)
+
+        # wtf?
+        else:
+            self.module.fail_json(msg="unknown action specified: '%s'" % \
+                                      self.action)
+
+        self._flush_commands()
+        self.module.exit_json(nagios_commands=self.command_results,
+                              changed=True)
+
+    def act_on_host(self, host):
+        """
+        Queue the commands of an action operating on a single host.
+        """
         # host or service downtime?
         if self.action == 'downtime':
             if self.services == 'host':
-                self.schedule_host_downtime(self.host, self.minutes)
+                self.schedule_host_downtime(host, self.minutes)
             elif self.services == 'all':
-                self.schedule_host_svc_downtime(self.host, self.minutes)
+                self.schedule_host_svc_downtime(host, self.minutes)
             else:
-                self.schedule_svc_downtime(self.host,
+                self.schedule_svc_downtime(host,
                                            services=self.services,
                                            minutes=self.minutes)
 
         elif self.action == 'delete_downtime':
             if self.services=='host':
-                self.delete_host_downtime(self.host)
+                self.delete_host_downtime(host)
             elif self.services=='all':
-                self.delete_host_downtime(self.host, comment='')
+                self.delete_host_downtime(host, comment='')
             else:
-                self.delete_host_downtime(self.host, services=self.services)
-
-        elif self.action == "servicegroup_host_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
-        elif self.action == "servicegroup_service_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_svc_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+                self.delete_host_downtime(host, services=self.services)
 
         # toggle the host AND service alerts
         elif self.action == 'silence':
-            self.silence_host(self.host)
+            self.silence_host(host)
 
         elif self.action == 'unsilence':
-            self.unsilence_host(self.host)
+            self.unsilence_host(host)
 
         # toggle host/svc alerts
         elif self.action == 'enable_alerts':
             if self.services == 'host':
-                self.enable_host_notifications(self.host)
+                self.enable_host_notifications(host)
             elif self.services == 'all':
-                self.enable_host_svc_notifications(self.host)
+                self.enable_host_svc_notifications(host)
             else:
-                self.enable_svc_notifications(self.host,
+                self.enable_svc_notifications(host,
                                               services=self.services)
 
         elif self.action == 'disable_alerts':
             if self.services == 'host':
-                self.disable_host_notifications(self.host)
+                self.disable_host_notifications(host)
             elif self.services == 'all':
-                self.disable_host_svc_notifications(self.host)
+                self.disable_host_svc_notifications(host)
             else:
-                self.disable_svc_notifications(self.host,
+                self.disable_svc_notifications(host,
                                                services=self.services)
-        elif self.action == 'silence_nagios':
-            self.silence_nagios()
-
-        elif self.action == 'unsilence_nagios':
-            self.unsilence_nagios()
-
-        elif self.action == 'command':
-            self.nagios_cmd(self.command)
-
-        # wtf?
-        else:
-            self.module.fail_json(msg="unknown action specified: '%s'" % \
-                                      self.action)
 
-        self.module.exit_json(nagios_commands=self.command_results,
-                              changed=True)
 
 ######################################################################
 # import module snippets
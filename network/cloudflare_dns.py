@@ -26,7 +26,17 @@ except ImportError:
     except ImportError:
         # Let snippet from module_utils/basic.py return a proper error in this case
         pass
+import time
 import urllib
+try:
+    from urllib2 import HTTPError
+except ImportError:
+    from urllib.error import HTTPError
+try:
+    from multiprocessing.pool import ThreadPool
+    HAS_THREADPOOL = True
+except ImportError:
+    HAS_THREADPOOL = False
 
 DOCUMENTATION = '''
 ---
@@ -45,6 +55,13 @@ options:
     description:
       - "Account email."
     required: true
+  concurrency:
+    description:
+      - Maximum number of concurrent API requests, e.g. when fetching the
+        remaining pages of a paginated result.
+    required: false
+    default: 4
+    version_added: "2.2"
   port:
     description: Service port. Required for C(type=SRV)
     required: false
@@ -58,12 +75,33 @@ options:
     required: false
     choices: [ 'tcp', 'udp' ]
     default: null
+  purge:
+    description:
+      - Only used with C(records). Delete all records of the zone that are
+        not listed in C(records). Only records of the types this module
+        manages are deleted.
+    required: false
+    default: false
+    version_added: "2.2"
   record:
     description:
       - Record to add. Required if C(state=present). Default is C(@) (e.g. the zone name)
     required: false
     default: "@"
     aliases: [ "name" ]
+  records:
+    description:
+      - Manage a whole set of records of the zone in one task instead of a single record.
+      - Each item is a dictionary with the keys C(record) (or C(name)), C(type), C(value)
+        (or C(content)) and optionally C(ttl), C(priority), C(weight), C(port), C(proto),
+        C(service), C(solo) and C(state). C(ttl), C(priority) and C(weight) default to the
+        module options of the same name, C(state) defaults to C(present).
+      - The zone is resolved once and all of its records are downloaded once. Only the
+        differences are applied, deletions first, through up to C(concurrency) concurrent
+        API calls.
+    required: false
+    default: null
+    version_added: "2.2"
   service:
     description: Record service. Required for C(type=SRV)
     required: false
@@ -174,6 +212,18 @@ EXAMPLES = '''
     weight: 20
     type: SRV
     value: fooserver.my.com
+
+# manage a set of records in one task, deleting all records not listed
+- cloudflare_dns:
+    zone: my.com
+    purge: true
+    records:
+      - { record: '@', type: A, value: 192.0.2.1 }
+      - { record: www, type: CNAME, value: my.com, ttl: 300 }
+      - { record: '@', type: MX, value: mail.my.com, priority: 10 }
+      - { record: old, type: A, state: absent }
+    account_email: test@example.com
+    account_api_token: dummyapitoken
 '''
 
 RETURN = '''
@@ -267,6 +317,27 @@ record:
             sample: sample.com
 '''
 
+RECORD_TYPES = [ 'A', 'AAAA', 'CNAME', 'TXT', 'SRV', 'MX', 'NS', 'SPF' ]
+
+# options required by each record type, for the module and the items of records
+RECORD_REQUIRED_IF = [
+    ('type','MX',['priority','value']),
+    ('type','SRV',['port','priority','proto','service','value','weight']),
+    ('type','A',['value']),
+    ('type','AAAA',['value']),
+    ('type','CNAME',['value']),
+    ('type','TXT',['value']),
+    ('type','NS',['value']),
+    ('type','SPF',['value'])
+]
+
+# number of retries and initial backoff in seconds for rate limited (429) calls
+RATE_LIMIT_RETRIES = 5
+RATE_LIMIT_BACKOFF = 1
+
+class CloudflareAPIError(Exception):
+    pass
+
 class CloudflareAPI(object):
 
     cf_api_endpoint = 'https://api.cloudflare.com/client/v4'
@@ -276,6 +347,7 @@ class CloudflareAPI(object):
         self.module            = module
         self.account_api_token = module.params['account_api_token']
         self.account_email     = module.params['account_email']
+        self.concurrency       = module.params['concurrency']
         self.port              = module.params['port']
         self.priority          = module.params['priority']
         self.proto             = module.params['proto']
@@ -290,22 +362,60 @@ class CloudflareAPI(object):
         self.weight            = module.params['weight']
         self.zone              = module.params['zone']
 
-        if self.record == '@':
-            self.record = self.zone
+        self.record, self.value, self.proto, self.service = self._normalize_record(
+            self.record, self.type, self.value, self.proto, self.service)
 
-        if (self.type in ['CNAME','NS','MX','SRV']) and (self.value is not None):
-            self.value = self.value.rstrip('.')
+        # zone name -> zone id
+        self.zone_ids = {}
+        # zone id -> index of the records fetched from that zone
+        self.record_index = {}
 
-        if (self.type == 'SRV'):
-            if (self.proto is not None) and (not self.proto.startswith('_')):
-                self.proto = '_' + self.proto
-            if (self.service is not None) and (not self.service.startswith('_')):
-                self.service = '_' + self.service
+    def _normalize_record(self,record,type,value,proto,service):
+        if record == '@':
+            record = self.zone
 
-        if not self.record.endswith(self.zone):
-            self.record = self.record + '.' + self.zone
+        if (type in ['CNAME','NS','MX','SRV']) and (value is not None):
+            value = value.rstrip('.')
+
+        if (type == 'SRV'):
+            if (proto is not None) and (not proto.startswith('_')):
+                proto = '_' + proto
+            if (service is not None) and (not service.startswith('_')):
+                service = '_' + service
+
+        if not record.endswith(self.zone):
+            record = record + '.' + self.zone
+
+        return record, value, proto, service
 
     def _cf_simple_api_call(self,api_call,method='GET',payload=None):
+        try:
+            return self._cf_request(api_call,method,payload)
+        except CloudflareAPIError, e:
+            self.module.fail_json(msg=str(e))
+
+    def _cf_request(self,api_call,method='GET',payload=None):
+        """
+        Perform one API call, retrying with exponential backoff while the
+        API reports that the client is rate limited. Errors are raised as
+        CloudflareAPIError so that this can be used from worker threads.
+        """
+        backoff = RATE_LIMIT_BACKOFF
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            result, info = self._cf_request_once(api_call,method,payload)
+            if info['status'] != 429 or attempt == RATE_LIMIT_RETRIES:
+                break
+            delay = backoff
+            try:
+                delay = max(delay, int(info.get('retry-after', 0)))
+            except ValueError:
+                pass
+            time.sleep(delay)
+            backoff *= 2
+
+        return self._cf_check_result(api_call,method,result,info)
+
+    def _cf_request_once(self,api_call,method,payload):
         headers = { 'X-Auth-Email': self.account_email,
                     'X-Auth-Key': self.account_api_token,
                     'Content-Type': 'application/json' }
@@ -314,17 +424,44 @@ class CloudflareAPI(object):
             try:
                 data = json.dumps(payload)
             except Exception, e:
-                self.module.fail_json(msg="Failed to encode payload as JSON: {0}".format(e))
+                raise CloudflareAPIError("Failed to encode payload as JSON: {0}".format(e))
 
-        resp, info = fetch_url(self.module,
-                               self.cf_api_endpoint + api_call,
-                               headers=headers,
-                               data=data,
-                               method=method,
-                               timeout=self.timeout)
+        # open_url raises instead of failing the module like fetch_url
+        # does, so that this can be used from worker threads
+        info = {}
+        try:
+            resp = open_url(self.cf_api_endpoint + api_call,
+                            headers=headers,
+                            data=data,
+                            method=method,
+                            timeout=self.timeout)
+            info['status'] = resp.getcode()
+            response_headers = resp.info()
+        except HTTPError, e:
+            resp = None
+            info['status'] = e.code
+            try:
+                info['body'] = e.read()
+            except AttributeError:
+                info['body'] = ''
+            response_headers = e.info()
+        except Exception, e:
+            raise CloudflareAPIError("Failed API call {0}; {1}".format(api_call,e))
+        for header, value in response_headers.items():
+            info[header.lower()] = value
 
         if info['status'] not in [200,304,400,401,403,429,405,415]:
-            self.module.fail_json(msg="Failed API call {0}; got unexpected HTTP code {1}".format(api_call,info['status']))
+            raise CloudflareAPIError("Failed API call {0}; got unexpected HTTP code {1}".format(api_call,info['status']))
+
+        content = None
+        try:
+            content = resp.read()
+        except AttributeError:
+            if info['body']:
+                content = info['body']
+        return content, info
+
+    def _cf_check_result(self,api_call,method,content,info):
 
         error_msg = ''
         if info['status'] == 401:
@@ -347,23 +484,17 @@ class CloudflareAPI(object):
             error_msg = "API bad request; Status: {0}; Method: {1}: Call: {2}".format(info['status'],method,api_call)
 
         result = None
-        try:
-            content = resp.read()
-        except AttributeError:
-            if info['body']:
-                content = info['body']
-            else:
-                error_msg += "; The API response was empty"
-
-        if content:
+        if not content:
+            error_msg += "; The API response was empty"
+        else:
             try:
                 result = json.loads(content)
-            except json.JSONDecodeError:
+            except ValueError:
                 error_msg += "; Failed to parse API response: {0}".format(content)
 
         # received an error status but no data with details on what failed
         if  (info['status'] not in [200,304]) and (result is None):
-            self.module.fail_json(msg=error_msg)
+            raise CloudflareAPIError(error_msg)
 
         if not result['success']:
             error_msg += "; Error details: "
@@ -372,10 +503,40 @@ class CloudflareAPI(object):
                 if 'error_chain' in error:
                     for chain_error in error['error_chain']:
                         error_msg += "code: {0}, error: {1}; ".format(chain_error['code'],chain_error['message'])
-            self.module.fail_json(msg=error_msg)
+            raise CloudflareAPIError(error_msg)
 
         return result, info['status']
 
+    def _cf_worker(self,args):
+        api_call, method, payload = args
+        try:
+            result, status = self._cf_request(api_call,method,payload)
+            return result['result'], None
+        except CloudflareAPIError, e:
+            return None, str(e)
+
+    def _cf_concurrent_calls(self,calls):
+        """
+        Perform a list of (api_call, method, payload) calls with up to
+        concurrency calls in flight and return their results in order.
+        """
+        if HAS_THREADPOOL and self.concurrency > 1 and len(calls) > 1:
+            pool = ThreadPool(min(self.concurrency, len(calls)))
+            try:
+                results = pool.map(self._cf_worker, calls)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = map(self._cf_worker, calls)
+
+        data = []
+        for result, error in results:
+            if error is not None:
+                self.module.fail_json(msg=error)
+            data.append(result)
+        return data
+
     def _cf_api_call(self,api_call,method='GET',payload=None):
         result, status = self._cf_simple_api_call(api_call,method,payload)
 
@@ -384,19 +545,21 @@ class CloudflareAPI(object):
         if 'result_info' in result:
             pagination = result['result_info']
             if pagination['total_pages'] > 1:
-                next_page = int(pagination['page']) + 1
-                parameters = ['page={0}'.format(next_page)]
                 # strip "page" parameter from call parameters (if there are any)
                 if '?' in api_call:
                     raw_api_call,query = api_call.split('?',1)
-                    parameters += [param for param in query.split('&') if not param.startswith('page')]
+                    parameters = [param for param in query.split('&') if not param.startswith('page=')]
                 else:
                     raw_api_call = api_call
-                while next_page <= pagination['total_pages']:
-                    raw_api_call += '?' + '&'.join(parameters)
-                    result, status = self._cf_simple_api_call(raw_api_call,method,payload)
-                    data += result['result']
-                    next_page += 1
+                    parameters = []
+                calls = []
+                for page in range(int(pagination['page']) + 1, pagination['total_pages'] + 1):
+                    page_call = raw_api_call + '?' + '&'.join(parameters + ['page={0}'.format(page)])
+                    calls.append((page_call,method,payload))
+
+                # the first page told us how many there are, fetch the others concurrently
+                for page_data in self._cf_concurrent_calls(calls):
+                    data += page_data
 
         return data, status
 
@@ -404,6 +567,9 @@ class CloudflareAPI(object):
         if not zone:
             zone = self.zone
 
+        if zone in self.zone_ids:
+            return self.zone_ids[zone]
+
         zones = self.get_zones(zone)
         if len(zones) > 1:
             self.module.fail_json(msg="More than one zone matches {0}".format(zone))
@@ -411,8 +577,63 @@ class CloudflareAPI(object):
         if len(zones) < 1:
             self.module.fail_json(msg="No zone found with name {0}".format(zone))
 
+        self.zone_ids[zone] = zones[0]['id']
         return zones[0]['id']
 
+    def _index_record(self,zone_id,rr):
+        # record names are case insensitive, the index keys are lower case
+        index = self.record_index[zone_id]
+        name = rr['name'].lower()
+        index['records'][rr['id']] = rr
+        index['by_content'].setdefault((rr['type'],name,rr['content']),{})[rr['id']] = rr
+        index['by_name'].setdefault((rr['type'],name),{})[rr['id']] = rr
+        index['by_name'].setdefault((None,name),{})[rr['id']] = rr
+
+    def _unindex_record(self,zone_id,rr_id):
+        index = self.record_index.get(zone_id)
+        if index is None or rr_id not in index['records']:
+            return
+        rr = index['records'].pop(rr_id)
+        name = rr['name'].lower()
+        index['by_content'].get((rr['type'],name,rr['content']),{}).pop(rr_id,None)
+        for key in [(rr['type'],name),(None,name)]:
+            index['by_name'].get(key,{}).pop(rr_id,None)
+
+    def _load_dns_records(self,zone_id,type=None,record=None):
+        """
+        Make sure the records of zone_id matching type and record (or all
+        records of the zone if both are None) are in the record index,
+        fetching them from the API only once.
+        """
+        index = self.record_index.setdefault(zone_id, {
+            'complete': False,
+            'loaded': set(),
+            'records': {},
+            'by_content': {},
+            'by_name': {},
+        })
+        if record:
+            record = record.lower()
+        if index['complete'] or (type,record) in index['loaded'] or (None,record) in index['loaded']:
+            return index
+
+        api_call = '/zones/{0}/dns_records'.format(zone_id)
+        query = {'per_page': 100}
+        if type:
+            query['type'] = type
+        if record:
+            query['name'] = record
+        api_call += '?' + urllib.urlencode(query)
+
+        records,status = self._cf_api_call(api_call)
+        for rr in records:
+            self._index_record(zone_id,rr)
+        if type is None and record is None:
+            index['complete'] = True
+        else:
+            index['loaded'].add((type,record))
+        return index
+
     def get_zones(self,name=None):
         if not name:
             name = self.zone
@@ -434,20 +655,24 @@ class CloudflareAPI(object):
         if (not value) and (value is not None):
             value = self.value
 
-        zone_id = self._get_zone_id()
-        api_call = '/zones/{0}/dns_records'.format(zone_id)
-        query = {}
-        if type:
-            query['type'] = type
-        if record:
-            query['name'] = record
-        if value:
-            query['content'] = value
-        if query:
-            api_call += '?' + urllib.urlencode(query)
-
-        records,status = self._cf_api_call(api_call)
-        return records
+        zone_id = self._get_zone_id(zone_name)
+        return self._find_dns_records(zone_id,type,record,value)
+
+    def _find_dns_records(self,zone_id,type,record,value):
+        index = self._load_dns_records(zone_id,type,record)
+        if record is not None:
+            record = record.lower()
+        if record is None:
+            records = [rr for rr in index['records'].values()
+                       if (not type or rr['type'] == type) and (not value or rr['content'] == value)]
+        elif value:
+            if type:
+                records = index['by_content'].get((type,record,value),{}).values()
+            else:
+                records = [rr for rr in index['by_name'].get((None,record),{}).values() if rr['content'] == value]
+        else:
+            records = index['by_name'].get((type or None,record),{}).values()
+        return list(records)
 
     def delete_dns_records(self,**kwargs):
         params = {}
@@ -476,20 +701,19 @@ class CloudflareAPI(object):
                     self.changed = True
                     if not self.module.check_mode:
                         result, info = self._cf_api_call('/zones/{0}/dns_records/{1}'.format(rr['zone_id'],rr['id']),'DELETE')
+                        self._unindex_record(rr['zone_id'],rr['id'])
             else:
                 self.changed = True
                 if not self.module.check_mode:
                     result, info = self._cf_api_call('/zones/{0}/dns_records/{1}'.format(rr['zone_id'],rr['id']),'DELETE')
+                    self._unindex_record(rr['zone_id'],rr['id'])
         return self.changed
 
-    def ensure_dns_record(self,**kwargs):
-        params = {}
-        for param in ['port','priority','proto','service','ttl','type','record','value','weight','zone']:
-          if param in kwargs:
-              params[param] = kwargs[param]
-          else:
-              params[param] = getattr(self,param)
-
+    def _build_record(self,params):
+        """
+        Validate the parameters of a record and return the payload to create
+        it along with the name and content to search for existing records.
+        """
         search_value = params['value']
         search_record = params['record']
         new_record = None
@@ -543,6 +767,31 @@ class CloudflareAPI(object):
             search_value = str(params['weight']) + '\t' + str(params['port']) + '\t' + params['value']
             search_record = params['service'] + '.' + params['proto'] + '.' + params['record']
 
+        return new_record, search_record, search_value
+
+    def _record_needs_update(self,params,cur_record,new_record):
+        do_update = False
+        if (params['ttl'] is not None) and (cur_record['ttl'] != params['ttl'] ):
+            do_update = True
+        if (params['priority'] is not None) and ('priority' in cur_record) and (cur_record['priority'] != params['priority']):
+            do_update = True
+        if ('data' in new_record) and ('data' in cur_record):
+            if (cur_record['data'] > new_record['data']) - (cur_record['data'] < new_record['data']):
+                do_update = True
+        if (params['type'] == 'CNAME') and (cur_record['content'] != new_record['content']):
+            do_update = True
+        return do_update
+
+    def ensure_dns_record(self,**kwargs):
+        params = {}
+        for param in ['port','priority','proto','service','ttl','type','record','value','weight','zone']:
+          if param in kwargs:
+              params[param] = kwargs[param]
+          else:
+              params[param] = getattr(self,param)
+
+        new_record, search_record, search_value = self._build_record(params)
+
         zone_id = self._get_zone_id(params['zone'])
         records = self.get_dns_records(params['zone'],params['type'],search_record,search_value)
         # in theory this should be impossible as cloudflare does not allow
@@ -552,60 +801,171 @@ class CloudflareAPI(object):
         # record already exists, check if it must be updated
         if len(records) == 1:
             cur_record = records[0]
-            do_update = False
-            if (params['ttl'] is not None) and (cur_record['ttl'] != params['ttl'] ):
-                do_update = True
-            if (params['priority'] is not None) and ('priority' in cur_record) and (cur_record['priority'] != params['priority']):
-                do_update = True
-            if ('data' in new_record) and ('data' in cur_record):
-                if (cur_record['data'] > new_record['data']) - (cur_record['data'] < new_record['data']):
-                    do_update = True
-            if (type == 'CNAME') and (cur_record['content'] != new_record['content']):
-                do_update = True
-            if do_update:
+            if self._record_needs_update(params,cur_record,new_record):
+                result = None
                 if not self.module.check_mode:
                     result, info = self._cf_api_call('/zones/{0}/dns_records/{1}'.format(zone_id,records[0]['id']),'PUT',new_record)
+                    self._unindex_record(zone_id,records[0]['id'])
+                    self._index_record(zone_id,result)
                 self.changed = True
                 return result,self.changed
             else:
                 return records,self.changed
+        result = None
         if not self.module.check_mode:
             result, info = self._cf_api_call('/zones/{0}/dns_records'.format(zone_id),'POST',new_record)
+            self._index_record(zone_id,result)
         self.changed = True
         return result,self.changed
 
+    def _record_item_params(self,item):
+        if not isinstance(item, dict):
+            self.module.fail_json(msg="Each item of records must be a dictionary, got: {0}".format(item))
+        params = {
+            'record': item.get('record', item.get('name', '@')),
+            'type': item.get('type'),
+            'value': item.get('value', item.get('content')),
+            'ttl': item.get('ttl', self.ttl),
+            'priority': item.get('priority', self.priority),
+            'weight': item.get('weight', self.weight),
+            'port': item.get('port'),
+            'proto': item.get('proto'),
+            'service': item.get('service'),
+            'solo': item.get('solo', False),
+            'state': item.get('state', 'present'),
+            'zone': self.zone,
+        }
+        if params['state'] not in ['present','absent']:
+            self.module.fail_json(msg="Invalid state {0} for record {1}".format(params['state'],params['record']))
+        if params['type'] is not None and params['type'] not in RECORD_TYPES:
+            self.module.fail_json(msg="Invalid type {0} for record {1}".format(params['type'],params['record']))
+        # records to delete may be matched by name and type only
+        if params['state'] == 'present' or params['value'] is not None:
+            for key, value, requirements in RECORD_REQUIRED_IF:
+                if params[key] != value:
+                    continue
+                missing = [x for x in requirements if params[x] is None]
+                if missing:
+                    self.module.fail_json(msg="{0} is {1} but the following are missing for record {2}: {3}".format(
+                        key,value,params['record'],','.join(missing)))
+        for param in ['ttl','priority','weight','port']:
+            if params[param] is not None:
+                try:
+                    params[param] = int(params[param])
+                except ValueError:
+                    self.module.fail_json(msg="{0} must be an integer for record {1}".format(param,params['record']))
+        params['record'], params['value'], params['proto'], params['service'] = self._normalize_record(
+            params['record'], params['type'], params['value'], params['proto'], params['service'])
+        return params
+
+    def sync_dns_records(self,items,purge=False):
+        """
+        Make the records of the zone match items: download the whole zone
+        once, compute the records to create, update and delete, and apply
+        the differences with concurrent API calls.
+        Returns a dict listing the created, updated and deleted records.
+        """
+        zone_id = self._get_zone_id()
+        index = self._load_dns_records(zone_id)
+
+        creates = []
+        updates = []
+        deletes = {}
+        kept = set()
+        solo = []
+        for item in items:
+            params = self._record_item_params(item)
+            if params['state'] == 'absent':
+                content = params['value']
+                search_record = params['record']
+                if params['type'] == 'SRV' and content is not None:
+                    content = str(params['weight']) + '\t' + str(params['port']) + '\t' + params['value']
+                    search_record = params['service'] + '.' + params['proto'] + '.' + params['record']
+                for rr in self._find_dns_records(zone_id,params['type'],search_record,content):
+                    deletes[rr['id']] = rr
+                continue
+
+            new_record, search_record, search_value = self._build_record(params)
+            if params['solo']:
+                solo.append((params['type'],search_record))
+            records = self._find_dns_records(zone_id,params['type'],search_record,search_value)
+            if len(records) > 1:
+                self.module.fail_json(msg="More than one record already exists for {0} {1}".format(params['type'],search_record))
+            if len(records) == 1:
+                kept.add(records[0]['id'])
+                if self._record_needs_update(params,records[0],new_record):
+                    updates.append((records[0],new_record))
+            else:
+                creates.append(new_record)
+
+        for type, record in solo:
+            for rr in self._find_dns_records(zone_id,type,record,None):
+                if rr['id'] not in kept:
+                    deletes[rr['id']] = rr
+
+        if purge:
+            for rr in index['records'].values():
+                if rr['type'] in RECORD_TYPES and rr['id'] not in kept:
+                    deletes[rr['id']] = rr
+
+        for rr in deletes.values():
+            if rr['id'] in kept:
+                self.module.fail_json(msg="Record {0} {1} is both listed as present and absent".format(rr['type'],rr['name']))
+
+        diff = {
+            'created': [self._describe_record(r) for r in creates],
+            'updated': [self._describe_record(r) for cur, r in updates],
+            'deleted': [self._describe_record(r) for r in deletes.values()],
+        }
+        if creates or updates or deletes:
+            self.changed = True
+        if self.module.check_mode:
+            return diff
+
+        # delete first, a CNAME cannot be created next to other records of the same name
+        calls = [('/zones/{0}/dns_records/{1}'.format(zone_id,rr_id),'DELETE',None) for rr_id in deletes]
+        self._cf_concurrent_calls(calls)
+        for rr_id in deletes:
+            self._unindex_record(zone_id,rr_id)
+
+        calls = [('/zones/{0}/dns_records/{1}'.format(zone_id,cur['id']),'PUT',r) for cur, r in updates]
+        calls += [('/zones/{0}/dns_records'.format(zone_id),'POST',r) for r in creates]
+        for rr in self._cf_concurrent_calls(calls):
+            self._unindex_record(zone_id,rr['id'])
+            self._index_record(zone_id,rr)
+        return diff
+
+    def _describe_record(self,rr):
+        if 'data' in rr and 'content' not in rr:
+            data = rr['data']
+            return {'type': rr['type'], 'name': '{0}.{1}.{2}'.format(data['service'],data['proto'],data['name']),
+                    'content': '{0}\t{1}\t{2}'.format(data['weight'],data['port'],data['target'])}
+        return {'type': rr['type'], 'name': rr['name'], 'content': rr['content']}
+
 def main():
     module = AnsibleModule(
         argument_spec = dict(
             account_api_token = dict(required=True, no_log=True, type='str'),
             account_email     = dict(required=True, type='str'),
+            concurrency       = dict(required=False, default=4, type='int'),
             port              = dict(required=False, default=None, type='int'),
             priority          = dict(required=False, default=1, type='int'),
             proto             = dict(required=False, default=None, choices=[ 'tcp', 'udp' ], type='str'),
+            purge             = dict(required=False, default=False, type='bool'),
             record            = dict(required=False, default='@', aliases=['name'], type='str'),
+            records           = dict(required=False, default=None, type='list'),
             service           = dict(required=False, default=None, type='str'),
             solo              = dict(required=False, default=None, type='bool'),
             state             = dict(required=False, default='present', choices=['present', 'absent'], type='str'),
             timeout           = dict(required=False, default=30, type='int'),
             ttl               = dict(required=False, default=1, type='int'),
-            type              = dict(required=False, default=None, choices=[ 'A', 'AAAA', 'CNAME', 'TXT', 'SRV', 'MX', 'NS', 'SPF' ], type='str'),
+            type              = dict(required=False, default=None, choices=RECORD_TYPES, type='str'),
             value             = dict(required=False, default=None, aliases=['content'], type='str'),
             weight            = dict(required=False, default=1, type='int'),
             zone              = dict(required=True, default=None, aliases=['domain'], type='str'),
         ),
         supports_check_mode = True,
-        required_if = ([
-                ('state','present',['record','type']),
-                ('type','MX',['priority','value']),
-                ('type','SRV',['port','priority','proto','service','value','weight']),
-                ('type','A',['value']),
-                ('type','AAAA',['value']),
-                ('type','CNAME',['value']),
-                ('type','TXT',['value']),
-                ('type','NS',['value']),
-                ('type','SPF',['value'])
-            ]
-       ),
+        required_if = RECORD_REQUIRED_IF,
        required_one_of = (
             [['record','value','type']]
         )
@@ -614,7 +974,13 @@ def main():
     changed = False
     cf_api = CloudflareAPI(module)
 
+    if module.params['records'] is not None:
+        diff = cf_api.sync_dns_records(module.params['records'],module.params['purge'])
+        module.exit_json(changed=cf_api.changed,result=diff)
+
     # sanity checks
+    if cf_api.state == 'present' and not cf_api.type:
+        module.fail_json(msg="state is present but the following are missing: type")
     if cf_api.is_solo and cf_api.state == 'absent':
         module.fail_json(msg="solo=true can only be used with state=present")
 
@@ -115,6 +115,28 @@ options:
     default: null
     choices: []
     aliases: []
+  concurrency:
+    description:
+      - Number of iControl sessions used to gather fact categories and
+        fields concurrently. Use C(1) to gather everything sequentially
+        over a single session. The seconds spent in the calls of each
+        category are returned in the C(timing) fact.
+    required: false
+    default: 4
+    version_added: "2.2"
+  snapshot_dir:
+    description:
+      - Directory where the facts of each device are stored between runs.
+        When a snapshot exists, the object lists and a few fingerprint
+        fields are fetched first and only objects that are new or whose
+        fingerprint changed are fetched in full, the others are taken from
+        the snapshot. The objects added, removed and changed since the
+        previous run are returned in C(changes).
+      - Changes to fields that are not part of the fingerprint of a
+        category are not detected until the fingerprint changes as well.
+    required: false
+    default: null
+    version_added: "2.2"
 '''
 
 EXAMPLES = '''
@@ -125,6 +147,29 @@ EXAMPLES = '''
       password: "secret"
       include: "interface,vlan"
   delegate_to: localhost
+
+- name: Collect BIG-IP facts over 8 concurrent sessions
+  bigip_facts:
+      server: "lb.mydomain.com"
+      user: "admin"
+      password: "secret"
+      include: "virtual_server,pool,node,client_ssl_profile"
+      session: true
+      concurrency: 8
+  delegate_to: localhost
+
+- name: Detect configuration drift since the previous run
+  bigip_facts:
+      server: "lb.mydomain.com"
+      user: "admin"
+      password: "secret"
+      include: "virtual_server,pool,node"
+      snapshot_dir: "/var/cache/bigip_facts"
+  delegate_to: localhost
+  register: bigip
+
+- debug:
+    var: bigip.changes
 '''
 
 try:
@@ -134,8 +179,21 @@ except ImportError:
 else:
     bigsuds_found = True
 
+try:
+    from multiprocessing.pool import ThreadPool
+except ImportError:
+    HAS_THREADPOOL = False
+else:
+    HAS_THREADPOOL = True
+
+import copy
 import fnmatch
+import json
+import os
 import re
+import tempfile
+import threading
+import time
 import traceback
 
 
@@ -1377,234 +1435,400 @@ class SystemInfo(object):
         return self.api.System.SystemInfo.get_uptime()
 
 
-def generate_dict(api_obj, fields):
-    result_dict = {}
-    lists = []
-    supported_fields = []
-    if api_obj.get_list():
-        for field in fields:
+# category: (class, fields); the certificate, key and software categories
+# are gathered by a single call and have no fields
+FACT_CATEGORIES = {
+    'interface': (Interfaces, ['active_media', 'actual_flow_control', 'bundle_state',
+                               'description', 'dual_media_state', 'enabled_state', 'if_index',
+                               'learning_mode', 'lldp_admin_status', 'lldp_tlvmap',
+                               'mac_address', 'media', 'media_option', 'media_option_sfp',
+                               'media_sfp', 'media_speed', 'media_status', 'mtu',
+                               'phy_master_slave_mode', 'prefer_sfp_state', 'flow_control',
+                               'sflow_poll_interval', 'sflow_poll_interval_global',
+                               'sfp_media_state', 'stp_active_edge_port_state',
+                               'stp_enabled_state', 'stp_link_type',
+                               'stp_protocol_detection_reset_state']),
+    'self_ip': (SelfIPs, ['address', 'allow_access_list', 'description',
+                          'enforced_firewall_policy', 'floating_state', 'fw_rule',
+                          'netmask', 'staged_firewall_policy', 'traffic_group',
+                          'vlan', 'is_traffic_group_inherited']),
+    'trunk': (Trunks, ['active_lacp_state', 'configured_member_count', 'description',
+                       'distribution_hash_option', 'interface', 'lacp_enabled_state',
+                       'lacp_timeout_option', 'link_selection_policy', 'media_speed',
+                       'media_status', 'operational_member_count', 'stp_enabled_state',
+                       'stp_protocol_detection_reset_state']),
+    'vlan': (Vlans, ['auto_lasthop', 'cmp_hash_algorithm', 'description',
+                     'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
+                     'failsafe_timeout', 'if_index', 'learning_mode',
+                     'mac_masquerade_address', 'member', 'mtu',
+                     'sflow_poll_interval', 'sflow_poll_interval_global',
+                     'sflow_sampling_rate', 'sflow_sampling_rate_global',
+                     'source_check_state', 'true_mac_address', 'vlan_id']),
+    'virtual_server': (VirtualServers, ['actual_hardware_acceleration', 'authentication_profile',
+                                        'auto_lasthop', 'bw_controller_policy', 'clone_pool',
+                                        'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
+                                        'default_pool_name', 'description', 'destination',
+                                        'enabled_state', 'enforced_firewall_policy',
+                                        'fallback_persistence_profile', 'fw_rule', 'gtm_score',
+                                        'last_hop_pool', 'nat64_state', 'object_status',
+                                        'persistence_profile', 'profile', 'protocol',
+                                        'rate_class', 'rate_limit', 'rate_limit_destination_mask',
+                                        'rate_limit_mode', 'rate_limit_source_mask', 'related_rule',
+                                        'rule', 'security_log_profile', 'snat_pool', 'snat_type',
+                                        'source_address', 'source_address_translation_lsn_pool',
+                                        'source_address_translation_snat_pool',
+                                        'source_address_translation_type', 'source_port_behavior',
+                                        'staged_firewall_policy', 'translate_address_state',
+                                        'translate_port_state', 'type', 'vlan', 'wildmask']),
+    'pool': (Pools, ['action_on_service_down', 'active_member_count',
+                     'aggregate_dynamic_ratio', 'allow_nat_state',
+                     'allow_snat_state', 'client_ip_tos', 'client_link_qos',
+                     'description', 'gateway_failsafe_device',
+                     'ignore_persisted_weight_state', 'lb_method', 'member',
+                     'minimum_active_member', 'minimum_up_member',
+                     'minimum_up_member_action', 'minimum_up_member_enabled_state',
+                     'monitor_association', 'monitor_instance', 'object_status',
+                     'profile', 'queue_depth_limit',
+                     'queue_on_connection_limit_state', 'queue_time_limit',
+                     'reselect_tries', 'server_ip_tos', 'server_link_qos',
+                     'simple_timeout', 'slow_ramp_time']),
+    'device': (Devices, ['active_modules', 'base_mac_address', 'blade_addresses',
+                         'build', 'chassis_id', 'chassis_type', 'comment',
+                         'configsync_address', 'contact', 'description', 'edition',
+                         'failover_state', 'hostname', 'inactive_modules', 'location',
+                         'management_address', 'marketing_name', 'multicast_address',
+                         'optional_modules', 'platform_id', 'primary_mirror_address',
+                         'product', 'secondary_mirror_address', 'software_version',
+                         'timelimited_modules', 'timezone', 'unicast_addresses']),
+    'device_group': (DeviceGroups, ['all_preferred_active', 'autosync_enabled_state', 'description',
+                                    'device', 'full_load_on_sync_state',
+                                    'incremental_config_sync_size_maximum',
+                                    'network_failover_enabled_state', 'sync_status', 'type']),
+    'traffic_group': (TrafficGroups, ['auto_failback_enabled_state', 'auto_failback_time',
+                                      'default_device', 'description', 'ha_load_factor',
+                                      'ha_order', 'is_floating', 'mac_masquerade_address',
+                                      'unit_id']),
+    'rule': (Rules, ['definition', 'description', 'ignore_vertification',
+                     'verification_status']),
+    'node': (Nodes, ['address', 'connection_limit', 'description', 'dynamic_ratio',
+                     'monitor_instance', 'monitor_rule', 'monitor_status',
+                     'object_status', 'rate_limit', 'ratio', 'session_status']),
+    'virtual_address': (VirtualAddresses, ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
+                                           'description', 'enabled_state', 'icmp_echo_state',
+                                           'is_floating_state', 'netmask', 'object_status',
+                                           'route_advertisement_state', 'traffic_group']),
+    'address_class': (AddressClasses, ['address_class', 'description']),
+    'client_ssl_profile': (ProfileClientSSL, ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
+                                              'authenticate_once_state', 'ca_file', 'cache_size',
+                                              'cache_timeout', 'certificate_file', 'chain_file',
+                                              'cipher_list', 'client_certificate_ca_file', 'crl_file',
+                                              'default_profile', 'description',
+                                              'forward_proxy_ca_certificate_file', 'forward_proxy_ca_key_file',
+                                              'forward_proxy_ca_passphrase',
+                                              'forward_proxy_certificate_extension_include',
+                                              'forward_proxy_certificate_lifespan',
+                                              'forward_proxy_enabled_state',
+                                              'forward_proxy_lookup_by_ipaddr_port_state', 'handshake_timeout',
+                                              'key_file', 'modssl_emulation_state', 'passphrase',
+                                              'peer_certification_mode', 'profile_mode',
+                                              'renegotiation_maximum_record_delay', 'renegotiation_period',
+                                              'renegotiation_state', 'renegotiation_throughput',
+                                              'retain_certificate_state', 'secure_renegotiation_mode',
+                                              'server_name', 'session_ticket_state', 'sni_default_state',
+                                              'sni_require_state', 'ssl_option', 'strict_resume_state',
+                                              'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']),
+    'system_info': (SystemInfo, ['base_mac_address',
+                                 'blade_temperature', 'chassis_slot_information',
+                                 'globally_unique_identifier', 'group_id',
+                                 'hardware_information',
+                                 'marketing_name',
+                                 'product_information', 'pva_version', 'system_id',
+                                 'system_information', 'time',
+                                 'time_zone', 'uptime']),
+}
+
+
+# cheap fields whose values change when an object is modified. With a
+# snapshot, only objects that are new or whose fingerprint changed are
+# fetched in full; categories not listed here are always fetched in full
+FINGERPRINT_FIELDS = {
+    'interface': ['enabled_state', 'media', 'mtu'],
+    'self_ip': ['address', 'netmask', 'vlan'],
+    'trunk': ['interface', 'lacp_enabled_state'],
+    'vlan': ['vlan_id', 'member', 'mtu'],
+    'virtual_server': ['destination', 'default_pool_name', 'enabled_state',
+                       'profile', 'rule'],
+    'pool': ['description', 'lb_method', 'member', 'monitor_association'],
+    'device': ['build', 'configsync_address', 'management_address',
+               'software_version'],
+    'device_group': ['device', 'type'],
+    'traffic_group': ['default_device', 'ha_order'],
+    'rule': ['definition'],
+    'node': ['address', 'connection_limit', 'description', 'ratio'],
+    'virtual_address': ['address', 'enabled_state', 'netmask'],
+    'client_ssl_profile': ['certificate_file', 'chain_file', 'cipher_list',
+                           'key_file'],
+}
+
+
+class F5SessionPool(object):
+    """Pool of iControl sessions used to gather facts concurrently.
+
+    Every worker thread gets its own F5 object, created on first use and
+    kept for the rest of the run. bigsuds builds the SOAP client of an
+    interface the first time it is used and keeps it on the API object, so
+    each interface is only built once per session and clients are never
+    shared between threads.
+
+    Attributes:
+        size: Number of worker threads, one session each.
+        sessions: F5 objects created by the pool.
+    """
+
+    def __init__(self, f5, factory, size=1):
+        self.factory = factory
+        self.size = size
+        self.sessions = []
+        self.local = threading.local()
+        # the calling thread keeps using the session it already has
+        self.local.f5 = f5
+        self.lock = threading.Lock()
+        self.pool = None
+        if HAS_THREADPOOL and size > 1:
+            self.pool = ThreadPool(size)
+
+    def get_api(self):
+        f5 = getattr(self.local, 'f5', None)
+        if f5 is None:
+            f5 = self.factory()
+            self.local.f5 = f5
+            self.lock.acquire()
             try:
-                api_response = getattr(api_obj, "get_" + field)()
-            except (MethodNotFound, WebFault):
-                pass
-            else:
-                lists.append(api_response)
-                supported_fields.append(field)
-        for i, j in enumerate(api_obj.get_list()):
-            temp = {}
-            temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
-            result_dict[j] = temp
-    return result_dict
+                self.sessions.append(f5)
+            finally:
+                self.lock.release()
+        return f5.get_api()
 
+    def map(self, func, items):
+        if self.pool is None or len(items) < 2:
+            return map(func, items)
+        return self.pool.map(func, items)
 
-def generate_simple_dict(api_obj, fields):
-    result_dict = {}
-    for field in fields:
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+class FactCollector(object):
+    """Fact collector class.
+
+    Gathers the object lists of all requested categories first, then every
+    field of every category as an independent call. Both steps are spread
+    over the sessions of a F5SessionPool.
+
+    When the facts of a previous run are given, the fingerprint fields of
+    all objects are fetched before the full field sets, and objects whose
+    fingerprint did not change are taken from the previous facts.
+
+    Attributes:
+        pool: F5SessionPool used to run the calls.
+        regex: Regular expression used to filter fact keys.
+        timing: Seconds spent in the calls of each category.
+        changes: Objects added, removed and changed since the previous facts.
+    """
+
+    def __init__(self, pool, regex=None):
+        self.pool = pool
+        self.regex = regex
+        self.timing = {}
+        self.changes = {'added': {}, 'removed': {}, 'changed': {}}
+
+    def load_category(self, category):
+        started = time.time()
+        api = self.pool.get_api()
+        api_obj = None
+        facts = None
+        if category == 'software':
+            facts = Software(api).get_all_software_status()
+        elif category == 'certificate':
+            certificates = Certificates(api, self.regex)
+            facts = dict(zip(certificates.get_list(), certificates.get_certificate_list()))
+        elif category == 'key':
+            keys = Keys(api, self.regex)
+            facts = dict(zip(keys.get_list(), keys.get_key_list()))
+        elif category == 'system_info':
+            api_obj = SystemInfo(api)
+        else:
+            api_obj = FACT_CATEGORIES[category][0](api, self.regex)
+            if not api_obj.get_list():
+                api_obj = None
+                facts = {}
+        return category, api_obj, facts, time.time() - started
+
+    def fetch_field(self, task):
+        category, api_obj, field = task
+        started = time.time()
+        # bind the object to the session of the calling thread
+        api_obj = copy.copy(api_obj)
+        api_obj.api = self.pool.get_api()
         try:
-            api_response = getattr(api_obj, "get_" + field)()
+            response = getattr(api_obj, "get_" + field)()
         except (MethodNotFound, WebFault):
-            pass
-        else:
-            result_dict[field] = api_response
-    return result_dict
+            return category, field, False, None, time.time() - started
+        return category, field, True, response, time.time() - started
+
+    def fetch_fields(self, tasks):
+        responses = {}
+        for category, api_obj, field in tasks:
+            responses[category] = []
+        for category, field, supported, response, elapsed in self.pool.map(self.fetch_field, tasks):
+            self.timing[category] += elapsed
+            if supported:
+                responses[category].append((field, response))
+        return responses
+
+    def find_changed(self, objects, previous):
+        """Return the names of the objects to fetch in full per category."""
+        tasks = []
+        for category, api_obj in objects.items():
+            for field in FINGERPRINT_FIELDS[category]:
+                tasks.append((category, api_obj, field))
+
+        changed = {}
+        for category, responses in self.fetch_fields(tasks).items():
+            fingerprints = generate_dict(objects[category].get_list(), responses)
+            changed[category] = []
+            for name, fingerprint in fingerprints.items():
+                old = previous[category].get(name)
+                if old is None:
+                    changed[category].append(name)
+                    continue
+                # compare with the values as they were stored
+                fingerprint = json.loads(json.dumps(fingerprint))
+                for field, value in fingerprint.items():
+                    if old.get(field) != value:
+                        changed[category].append(name)
+                        break
+        return changed
+
+    def compare(self, category, old, new):
+        added = [x for x in new if x not in old]
+        removed = [x for x in old if x not in new]
+        changed = {}
+        for name in new:
+            if name in old and new[name] != old[name]:
+                fields = [x for x in new[name] if new[name][x] != old[name].get(x)]
+                changed[name] = sorted(fields)
+        if added:
+            self.changes['added'][category] = sorted(added)
+        if removed:
+            self.changes['removed'][category] = sorted(removed)
+        if changed:
+            self.changes['changed'][category] = changed
+
+    def collect(self, include, previous=None):
+        if previous is None:
+            previous = {}
+        facts = {}
+        objects = {}
+        tasks = []
+        for category, api_obj, category_facts, elapsed in self.pool.map(self.load_category, include):
+            self.timing[category] = elapsed
+            if api_obj is None:
+                facts[category] = category_facts
+            else:
+                objects[category] = api_obj
+
+        incremental = {}
+        for category in objects:
+            if category in FINGERPRINT_FIELDS and category in previous:
+                incremental[category] = objects[category]
+        changed = self.find_changed(incremental, previous)
+        for category, names in changed.items():
+            objects[category] = subset(objects[category], names)
+
+        for category, api_obj in objects.items():
+            if category in changed and not changed[category]:
+                continue
+            for field in FACT_CATEGORIES[category][1]:
+                tasks.append((category, api_obj, field))
+        responses = self.fetch_fields(tasks)
+
+        for category, api_obj in objects.items():
+            if category == 'system_info':
+                facts[category] = dict(responses[category])
+                continue
+            facts[category] = generate_dict(api_obj.get_list(), responses.get(category, []))
+            if category in changed:
+                for name in incremental[category].get_list():
+                    if name not in facts[category]:
+                        facts[category][name] = previous[category][name]
+
+        if previous:
+            # compare with the values as they will be stored
+            new_facts = json.loads(json.dumps(facts))
+            for category in new_facts:
+                if category in previous and category not in ('software', 'system_info'):
+                    self.compare(category, previous[category], new_facts[category])
+
+        for category in self.timing:
+            self.timing[category] = round(self.timing[category], 3)
+        return facts
+
+
+def subset(api_obj, names):
+    """Return a copy of a category object limited to the given names."""
+    current = api_obj.get_list()
+    api_obj = copy.copy(api_obj)
+    for attr, value in vars(api_obj).items():
+        if value is current:
+            setattr(api_obj, attr, names)
+    return api_obj
+
+
+def snapshot_path(snapshot_dir, server, server_port):
+    name = re.sub(r'[^\w.-]', '_', '%s_%s' % (server, server_port))
+    return os.path.join(snapshot_dir, name + '.json')
+
+
+def load_snapshot(path, fact_filter):
+    """Return the facts stored by the previous run, if any."""
+    try:
+        f = open(path)
+        try:
+            snapshot = json.load(f)
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        return {}
+    if not isinstance(snapshot, dict) or snapshot.get('filter') != fact_filter:
+        return {}
+    return snapshot.get('facts', {})
+
+
+def save_snapshot(path, fact_filter, facts):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        f = os.fdopen(fd, 'w')
+        try:
+            json.dump({'filter': fact_filter, 'facts': facts}, f)
+        finally:
+            f.close()
+        os.rename(tmp, path)
+    except:
+        os.unlink(tmp)
+        raise
 
 
-def generate_interface_dict(f5, regex):
-    interfaces = Interfaces(f5.get_api(), regex)
-    fields = ['active_media', 'actual_flow_control', 'bundle_state',
-              'description', 'dual_media_state', 'enabled_state', 'if_index',
-              'learning_mode', 'lldp_admin_status', 'lldp_tlvmap',
-              'mac_address', 'media', 'media_option', 'media_option_sfp',
-              'media_sfp', 'media_speed', 'media_status', 'mtu',
-              'phy_master_slave_mode', 'prefer_sfp_state', 'flow_control',
-              'sflow_poll_interval', 'sflow_poll_interval_global',
-              'sfp_media_state', 'stp_active_edge_port_state',
-              'stp_enabled_state', 'stp_link_type',
-              'stp_protocol_detection_reset_state']
-    return generate_dict(interfaces, fields)
-
-
-def generate_self_ip_dict(f5, regex):
-    self_ips = SelfIPs(f5.get_api(), regex)
-    fields = ['address', 'allow_access_list', 'description',
-              'enforced_firewall_policy', 'floating_state', 'fw_rule',
-              'netmask', 'staged_firewall_policy', 'traffic_group',
-              'vlan', 'is_traffic_group_inherited']
-    return generate_dict(self_ips, fields)
-
-
-def generate_trunk_dict(f5, regex):
-    trunks = Trunks(f5.get_api(), regex)
-    fields = ['active_lacp_state', 'configured_member_count', 'description',
-              'distribution_hash_option', 'interface', 'lacp_enabled_state',
-              'lacp_timeout_option', 'link_selection_policy', 'media_speed',
-              'media_status', 'operational_member_count', 'stp_enabled_state',
-              'stp_protocol_detection_reset_state']
-    return generate_dict(trunks, fields)
-
-
-def generate_vlan_dict(f5, regex):
-    vlans = Vlans(f5.get_api(), regex)
-    fields = ['auto_lasthop', 'cmp_hash_algorithm', 'description',
-              'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
-              'failsafe_timeout', 'if_index', 'learning_mode',
-              'mac_masquerade_address', 'member', 'mtu',
-              'sflow_poll_interval', 'sflow_poll_interval_global',
-              'sflow_sampling_rate', 'sflow_sampling_rate_global',
-              'source_check_state', 'true_mac_address', 'vlan_id']
-    return generate_dict(vlans, fields)
-
-
-def generate_vs_dict(f5, regex):
-    virtual_servers = VirtualServers(f5.get_api(), regex)
-    fields = ['actual_hardware_acceleration', 'authentication_profile',
-              'auto_lasthop', 'bw_controller_policy', 'clone_pool',
-              'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
-              'default_pool_name', 'description', 'destination',
-              'enabled_state', 'enforced_firewall_policy',
-              'fallback_persistence_profile', 'fw_rule', 'gtm_score',
-              'last_hop_pool', 'nat64_state', 'object_status',
-              'persistence_profile', 'profile', 'protocol',
-              'rate_class', 'rate_limit', 'rate_limit_destination_mask',
-              'rate_limit_mode', 'rate_limit_source_mask', 'related_rule',
-              'rule', 'security_log_profile', 'snat_pool', 'snat_type',
-              'source_address', 'source_address_translation_lsn_pool',
-              'source_address_translation_snat_pool',
-              'source_address_translation_type', 'source_port_behavior',
-              'staged_firewall_policy', 'translate_address_state',
-              'translate_port_state', 'type', 'vlan', 'wildmask']
-    return generate_dict(virtual_servers, fields)
-
-
-def generate_pool_dict(f5, regex):
-    pools = Pools(f5.get_api(), regex)
-    fields = ['action_on_service_down', 'active_member_count',
-              'aggregate_dynamic_ratio', 'allow_nat_state',
-              'allow_snat_state', 'client_ip_tos', 'client_link_qos',
-              'description', 'gateway_failsafe_device',
-              'ignore_persisted_weight_state', 'lb_method', 'member',
-              'minimum_active_member', 'minimum_up_member',
-              'minimum_up_member_action', 'minimum_up_member_enabled_state',
-              'monitor_association', 'monitor_instance', 'object_status',
-              'profile', 'queue_depth_limit',
-              'queue_on_connection_limit_state', 'queue_time_limit',
-              'reselect_tries', 'server_ip_tos', 'server_link_qos',
-              'simple_timeout', 'slow_ramp_time']
-    return generate_dict(pools, fields)
-
-
-def generate_device_dict(f5, regex):
-    devices = Devices(f5.get_api(), regex)
-    fields = ['active_modules', 'base_mac_address', 'blade_addresses',
-              'build', 'chassis_id', 'chassis_type', 'comment',
-              'configsync_address', 'contact', 'description', 'edition',
-              'failover_state', 'hostname', 'inactive_modules', 'location',
-              'management_address', 'marketing_name', 'multicast_address',
-              'optional_modules', 'platform_id', 'primary_mirror_address',
-              'product', 'secondary_mirror_address', 'software_version',
-              'timelimited_modules', 'timezone', 'unicast_addresses']
-    return generate_dict(devices, fields)
-
-
-def generate_device_group_dict(f5, regex):
-    device_groups = DeviceGroups(f5.get_api(), regex)
-    fields = ['all_preferred_active', 'autosync_enabled_state', 'description',
-              'device', 'full_load_on_sync_state',
-              'incremental_config_sync_size_maximum',
-              'network_failover_enabled_state', 'sync_status', 'type']
-    return generate_dict(device_groups, fields)
-
-
-def generate_traffic_group_dict(f5, regex):
-    traffic_groups = TrafficGroups(f5.get_api(), regex)
-    fields = ['auto_failback_enabled_state', 'auto_failback_time',
-              'default_device', 'description', 'ha_load_factor',
-              'ha_order', 'is_floating', 'mac_masquerade_address',
-              'unit_id']
-    return generate_dict(traffic_groups, fields)
-
-
-def generate_rule_dict(f5, regex):
-    rules = Rules(f5.get_api(), regex)
-    fields = ['definition', 'description', 'ignore_vertification',
-              'verification_status']
-    return generate_dict(rules, fields)
-
-
-def generate_node_dict(f5, regex):
-    nodes = Nodes(f5.get_api(), regex)
-    fields = ['address', 'connection_limit', 'description', 'dynamic_ratio',
-              'monitor_instance', 'monitor_rule', 'monitor_status',
-              'object_status', 'rate_limit', 'ratio', 'session_status']
-    return generate_dict(nodes, fields)
-
-
-def generate_virtual_address_dict(f5, regex):
-    virtual_addresses = VirtualAddresses(f5.get_api(), regex)
-    fields = ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
-              'description', 'enabled_state', 'icmp_echo_state',
-              'is_floating_state', 'netmask', 'object_status',
-              'route_advertisement_state', 'traffic_group']
-    return generate_dict(virtual_addresses, fields)
-
-
-def generate_address_class_dict(f5, regex):
-    address_classes = AddressClasses(f5.get_api(), regex)
-    fields = ['address_class', 'description']
-    return generate_dict(address_classes, fields)
-
-
-def generate_certificate_dict(f5, regex):
-    certificates = Certificates(f5.get_api(), regex)
-    return dict(zip(certificates.get_list(), certificates.get_certificate_list()))
-
-
-def generate_key_dict(f5, regex):
-    keys = Keys(f5.get_api(), regex)
-    return dict(zip(keys.get_list(), keys.get_key_list()))
-
-
-def generate_client_ssl_profile_dict(f5, regex):
-    profiles = ProfileClientSSL(f5.get_api(), regex)
-    fields = ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
-              'authenticate_once_state', 'ca_file', 'cache_size',
-              'cache_timeout', 'certificate_file', 'chain_file',
-              'cipher_list', 'client_certificate_ca_file', 'crl_file',
-              'default_profile', 'description',
-              'forward_proxy_ca_certificate_file', 'forward_proxy_ca_key_file',
-              'forward_proxy_ca_passphrase',
-              'forward_proxy_certificate_extension_include',
-              'forward_proxy_certificate_lifespan',
-              'forward_proxy_enabled_state',
-              'forward_proxy_lookup_by_ipaddr_port_state', 'handshake_timeout',
-              'key_file', 'modssl_emulation_state', 'passphrase',
-              'peer_certification_mode', 'profile_mode',
-              'renegotiation_maximum_record_delay', 'renegotiation_period',
-              'renegotiation_state', 'renegotiation_throughput',
-              'retain_certificate_state', 'secure_renegotiation_mode',
-              'server_name', 'session_ticket_state', 'sni_default_state',
-              'sni_require_state', 'ssl_option', 'strict_resume_state',
-              'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
-    return generate_dict(profiles, fields)
-
-
-def generate_system_info_dict(f5):
-    system_info = SystemInfo(f5.get_api())
-    fields = ['base_mac_address',
-              'blade_temperature', 'chassis_slot_information',
-              'globally_unique_identifier', 'group_id',
-              'hardware_information',
-              'marketing_name',
-              'product_information', 'pva_version', 'system_id',
-              'system_information', 'time',
-              'time_zone', 'uptime']
-    return generate_simple_dict(system_info, fields)
-
-
-def generate_software_list(f5):
-    software = Software(f5.get_api())
-    software_list = software.get_all_software_status()
-    return software_list
+def generate_dict(keys, responses):
+    result_dict = {}
+    for i, j in enumerate(keys):
+        temp = {}
+        temp.update([(field, response[i]) for field, response in responses])
+        result_dict[j] = temp
+    return result_dict
 
 
 def main():
@@ -1614,6 +1838,8 @@ def main():
         session=dict(type='bool', default=False),
         include=dict(type='list', required=True),
         filter=dict(type='str', required=False),
+        concurrency=dict(type='int', default=4),
+        snapshot_dir=dict(type='path', required=False),
     )
     argument_spec.update(meta_args)
 
@@ -1631,6 +1857,8 @@ def main():
     validate_certs = module.params['validate_certs']
     session = module.params['session']
     fact_filter = module.params['filter']
+    concurrency = module.params['concurrency']
+    snapshot_dir = module.params['snapshot_dir']
 
     if validate_certs:
         import ssl
@@ -1650,9 +1878,24 @@ def main():
     include_test = map(lambda x: x in valid_includes, include)
     if not all(include_test):
         module.fail_json(msg="value of include must be one or more of: %s, got: %s" % (",".join(valid_includes), ",".join(include)))
+    include = [x for x in valid_includes if x in include]
+    if concurrency < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+
+    def new_session():
+        f5 = F5(server, user, password, session, validate_certs, server_port)
+        if session:
+            # folder and query state are per session settings
+            f5.set_active_folder("/")
+            f5.enable_recursive_query_state()
+        return f5
+
+    if snapshot_dir and not os.path.isdir(snapshot_dir):
+        module.fail_json(msg="snapshot_dir %s is not a directory" % snapshot_dir)
 
     try:
         facts = {}
+        result = {}
 
         if len(include) > 0:
             f5 = F5(server, user, password, session, validate_certs, server_port)
@@ -1663,42 +1906,24 @@ def main():
             if saved_recursive_query_state != "STATE_ENABLED":
                 f5.enable_recursive_query_state()
 
-            if 'interface' in include:
-                facts['interface'] = generate_interface_dict(f5, regex)
-            if 'self_ip' in include:
-                facts['self_ip'] = generate_self_ip_dict(f5, regex)
-            if 'trunk' in include:
-                facts['trunk'] = generate_trunk_dict(f5, regex)
-            if 'vlan' in include:
-                facts['vlan'] = generate_vlan_dict(f5, regex)
-            if 'virtual_server' in include:
-                facts['virtual_server'] = generate_vs_dict(f5, regex)
-            if 'pool' in include:
-                facts['pool'] = generate_pool_dict(f5, regex)
-            if 'device' in include:
-                facts['device'] = generate_device_dict(f5, regex)
-            if 'device_group' in include:
-                facts['device_group'] = generate_device_group_dict(f5, regex)
-            if 'traffic_group' in include:
-                facts['traffic_group'] = generate_traffic_group_dict(f5, regex)
-            if 'rule' in include:
-                facts['rule'] = generate_rule_dict(f5, regex)
-            if 'node' in include:
-                facts['node'] = generate_node_dict(f5, regex)
-            if 'virtual_address' in include:
-                facts['virtual_address'] = generate_virtual_address_dict(f5, regex)
-            if 'address_class' in include:
-                facts['address_class'] = generate_address_class_dict(f5, regex)
-            if 'software' in include:
-                facts['software'] = generate_software_list(f5)
-            if 'certificate' in include:
-                facts['certificate'] = generate_certificate_dict(f5, regex)
-            if 'key' in include:
-                facts['key'] = generate_key_dict(f5, regex)
-            if 'client_ssl_profile' in include:
-                facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex)
-            if 'system_info' in include:
-                facts['system_info'] = generate_system_info_dict(f5)
+            previous = {}
+            if snapshot_dir:
+                path = snapshot_path(snapshot_dir, server, server_port)
+                previous = load_snapshot(path, fact_filter)
+
+            pool = F5SessionPool(f5, new_session, concurrency)
+            collector = FactCollector(pool, regex)
+            try:
+                facts = collector.collect(include, previous)
+            finally:
+                pool.close()
+
+            if snapshot_dir:
+                # keep the categories of the previous run not gathered now
+                previous.update(facts)
+                save_snapshot(path, fact_filter, previous)
+                result['changes'] = collector.changes
+            facts['timing'] = collector.timing
 
             # restore saved state
             if saved_active_folder and saved_active_folder != "/":
@@ -1707,7 +1932,7 @@ def main():
                saved_recursive_query_state != "STATE_ENABLED":
                 f5.set_recursive_query_state(saved_recursive_query_state)
 
-        result = {'ansible_facts': facts}
+        result['ansible_facts'] = facts
 
     except Exception as e:
         module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, traceback.format_exc()))
@@ -136,10 +136,12 @@ from string import Template
 
 
 DEFAULT_SOCKET_LOCATION="/var/run/haproxy.sock"
-RECV_SIZE = 1024
+RECV_SIZE = 65536
 ACTION_CHOICES = ['enabled', 'disabled']
 WAIT_RETRIES=25
 WAIT_INTERVAL=5
+# In interactive mode HAProxy terminates every response with LF + '> '
+PROMPT = '\n> '
 
 ######################################################################
 class TimeoutException(Exception):
@@ -151,6 +153,10 @@ class HAProxy(object):
     Perform common tasks in Haproxy related to enable server and
     disable server.
 
+    A single connection in interactive mode ('prompt') is used for all
+    commands, and 'show stat' is only fetched again when the state has to
+    be re-read, i.e. after sending commands and between wait retries.
+
     The complete set of external commands Haproxy handles is documented
     on their website:
 
@@ -171,26 +177,76 @@ class HAProxy(object):
         self.wait_retries = self.module.params['wait_retries']
         self.wait_interval = self.module.params['wait_interval']
         self.command_results = {}
+        self.client = None
+        self.buffer = ''
+        self.stats = None
+        self.backends = []
 
-    def execute(self, cmd, timeout=200, capture_output=True):
+    def connect(self):
         """
-        Executes a HAProxy command by sending a message to a HAProxy's local
-        UNIX socket and waiting up to 'timeout' milliseconds for the response.
+        Open the session to HAProxy's UNIX socket and switch it to interactive
+        mode, so that it stays open for the following commands. Does nothing
+        if the session is already open.
         """
+        if self.client is not None:
+            return
         self.client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.client.connect(self.socket)
-        self.client.sendall('%s\n' % cmd)
-        result = ''
-        buf = ''
-        buf = self.client.recv(RECV_SIZE)
-        while buf:
-            result += buf
-            buf = self.client.recv(RECV_SIZE)
-        if capture_output:
-            self.capture_command_output(cmd, result.strip())
+        self.client.sendall('prompt\n')
+        self.read_response()
+
+    def close(self):
+        if self.client is None:
+            return
+        try:
+            self.client.sendall('quit\n')
+        except socket.error:
+            pass
         self.client.close()
+        self.client = None
+        self.buffer = ''
+
+    def read_response(self):
+        """
+        Read the output of one command, up to the next prompt.
+        """
+        chunks = [self.buffer]
+        tail = self.buffer
+        while PROMPT not in tail:
+            buf = self.client.recv(RECV_SIZE)
+            if not buf:
+                self.module.fail_json(msg="HAProxy closed the connection on socket %s" % self.socket)
+            chunks.append(buf)
+            # what was read before has been searched already, except for
+            # the end of a prompt that is split over several reads
+            tail = tail[1 - len(PROMPT):] + buf
+        data = ''.join(chunks)
+        result, self.buffer = data.split(PROMPT, 1)
         return result
 
+    def execute(self, cmd, capture_output=True):
+        """
+        Executes a HAProxy command (or a list of them) over the interactive
+        session and returns the output. Each command may hold several
+        ';'-separated commands; all of them are sent one per line in a
+        single write, then one response is read per command.
+        """
+        if not isinstance(cmd, list):
+            cmd = [cmd]
+        commands = []
+        for c in cmd:
+            commands.extend([part.strip() for part in c.split(';') if part.strip()])
+
+        self.connect()
+        self.client.sendall(''.join(['%s\n' % c for c in commands]))
+        results = []
+        for c in commands:
+            result = self.read_response()
+            if capture_output:
+                self.capture_command_output(c, result.strip())
+            results.append(result)
+        return ''.join(results)
+
 
     def capture_command_output(self, cmd, output):
         """
@@ -204,20 +260,37 @@ class HAProxy(object):
         self.command_results['output'].append(output)
 
 
+    def refresh_stats(self):
+        """
+        Fetch and parse 'show stat' once, indexing the rows by (pxname, svname)
+        and by svname, and remembering all backends in order.
+        """
+        data = self.execute('show stat', False).lstrip('# ')
+        self.stats = {}
+        self.backends = []
+        for d in csv.DictReader(data.splitlines()):
+            state = { 'status': d['status'], 'weight': d['weight'] }
+            self.stats[(d['pxname'], d['svname'])] = state
+            self.stats.setdefault((None, d['svname']), []).append(state)
+            if d['svname'] == 'BACKEND':
+                self.backends.append(d['pxname'])
+
+
     def discover_all_backends(self):
         """
         Discover all entries with svname = 'BACKEND' and return a list of their corresponding
         pxnames
         """
-        data = self.execute('show stat', 200, False).lstrip('# ')
-        r = csv.DictReader(data.splitlines())
-        return map(lambda d: d['pxname'], filter(lambda d: d['svname'] == 'BACKEND', r))
+        if self.stats is None:
+            self.refresh_stats()
+        return self.backends
 
 
     def execute_for_backends(self, cmd, pxname, svname, wait_for_status = None):
         """
         Run some command on the specified backends. If no backends are provided they will
-        be discovered automatically (all backends)
+        be discovered automatically (all backends). The commands for all backends are sent
+        in one batch, then all of them are waited for together.
         """
         # Discover backends if none are given
         if pxname is None:
@@ -225,46 +298,61 @@ class HAProxy(object):
         else:
             backends = [pxname]
 
-        # Run the command for each requested backend
+        # Build the command for each requested backend
+        commands = []
         for backend in backends:
             # Fail when backends were not found
             state = self.get_state_for(backend, svname)
             if (self.fail_on_not_found or self.wait) and state is None:
                 self.module.fail_json(msg="The specified backend '%s/%s' was not found!" % (backend, svname))
 
-            self.execute(Template(cmd).substitute(pxname = backend, svname = svname))
-            if self.wait:
-                self.wait_until_status(backend, svname, wait_for_status)
+            commands.append(Template(cmd).substitute(pxname = backend, svname = svname))
+
+        if commands:
+            self.execute(commands)
+        # The state has changed, make sure it is read again
+        self.stats = None
+        if self.wait:
+            self.wait_until_status(backends, svname, wait_for_status)
 
 
     def get_state_for(self, pxname, svname):
         """
         Find the state of specific services. When pxname is not set, get all backends for a specific host.
         Returns a list of dictionaries containing the status and weight for those services.
+        The state is taken from the last 'show stat' snapshot.
         """
-        data = self.execute('show stat', 200, False).lstrip('# ')
-        r = csv.DictReader(data.splitlines())
-        state = map(lambda d: { 'status': d['status'], 'weight': d['weight'] }, filter(lambda d: (pxname is None or d['pxname'] == pxname) and d['svname'] == svname, r))
+        if self.stats is None:
+            self.refresh_stats()
+        state = self.stats.get((pxname, svname))
+        if state is not None and pxname is not None:
+            state = [state]
         return state or None
 
 
-    def wait_until_status(self, pxname, svname, status):
+    def wait_until_status(self, pxnames, svname, status):
         """
-        Wait for a service to reach the specified status. Try RETRIES times
-        with INTERVAL seconds of sleep in between. If the service has not reached
-        the expected status in that time, the module will fail. If the service was 
+        Wait for services to reach the specified status. Try RETRIES times
+        with INTERVAL seconds of sleep in between, reading the state of all
+        services with a single 'show stat' per try. If a service has not reached
+        the expected status in that time, the module will fail. If the service was
         not found, the module will fail.
         """
+        pending = list(pxnames)
         for i in range(1, self.wait_retries):
-            state = self.get_state_for(pxname, svname)
+            self.refresh_stats()
 
             # We can assume there will only be 1 element in state because both svname and pxname are always set when we get here
-            if state[0]['status'] == status:
+            pending = [pxname for pxname in pending if self.get_state_for(pxname, svname)[0]['status'] != status]
+            if not pending:
                 return True
             else:
+                # HAProxy drops idle sessions after 'stats timeout' (10s by
+                # default), so do not keep the session open while sleeping
+                self.close()
                 time.sleep(self.wait_interval)
 
-        self.module.fail_json(msg="server %s/%s not status '%s' after %d retries. Aborting." % (pxname, svname, status, self.wait_retries))
+        self.module.fail_json(msg="server %s/%s not status '%s' after %d retries. Aborting." % (pending[0], svname, status, self.wait_retries))
 
 
     def enabled(self, host, backend, weight):
@@ -310,6 +398,7 @@ class HAProxy(object):
         # Get the state after the run
         state_after = self.get_state_for(self.backend, self.host)
         self.command_results['state_after'] = state_after
+        self.close()
 
         # Report change status
         if state_before != state_after:
@@ -116,38 +116,101 @@ import os
 import re
 import sys
 
-def get_version(pacman_output):
-    """Take pacman -Qi or pacman -Si output and get the Version"""
-    lines = pacman_output.split('\n')
-    for line in lines:
-        if 'Version' in line:
-            return line.split(':')[1].strip()
-    return None
-
-def query_package(module, pacman_path, name, state="present"):
-    """Query the package status in both the local system and the repository. Returns a boolean to indicate if the package is installed, a second boolean to indicate if the package is up-to-date and a third boolean to indicate whether online information were available"""
-    if state == "present":
-        lcmd = "%s -Qi %s" % (pacman_path, name)
-        lrc, lstdout, lstderr = module.run_command(lcmd, check_rc=False)
-        if lrc != 0:
-            # package is not installed locally
-            return False, False, False
-
-        # get the version installed locally (if any)
-        lversion = get_version(lstdout)
-
-        rcmd = "%s -Si %s" % (pacman_path, name)
-        rrc, rstdout, rstderr = module.run_command(rcmd, check_rc=False)
-        # get the version in the repository
-        rversion = get_version(rstdout)
+def get_local_versions(module, pacman_path):
+    """Return a dict of all locally installed packages and their versions, from a single pacman -Q"""
+    cmd = "%s -Q" % (pacman_path)
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    if rc != 0:
+        module.fail_json(msg="failed to list installed packages")
+
+    versions = {}
+    for line in stdout.split('\n'):
+        fields = line.split()
+        if len(fields) >= 2:
+            versions[fields[0]] = fields[1]
+    return versions
+
+def get_local_providers(module, pacman_path, names):
+    """Return a dict mapping each of names that is an installed package or is provided by one
+    (like sh or java-runtime) to the name of that package, from a single pacman -Qi"""
+    cmd = "%s -Qi %s" % (pacman_path, " ".join(names))
+    # pacman -Qi fails if one of the names is not installed, but still lists the others
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-        if rrc == 0:
-            # Return True to indicate that the package is installed locally, and the result of the version number comparison
-            # to determine if the package is up-to-date.
-            return True, (lversion == rversion), False
+    wanted = set(names)
+    providers = {}
+    pkgname = None
+    for line in stdout.split('\n'):
+        if ':' not in line:
+            continue
+        key, value = [x.strip() for x in line.split(':', 1)]
+        if key == 'Name':
+            pkgname = value
+            if pkgname in wanted:
+                providers[pkgname] = pkgname
+        elif key == 'Provides' and pkgname is not None:
+            for provide in value.split():
+                # strip the version of versioned provides like java-runtime=8
+                provide = re.split('[<>=]', provide)[0]
+                if provide in wanted and provide not in providers:
+                    providers[provide] = pkgname
+    return providers
+
+def get_sync_versions(module, pacman_path):
+    """Return a dict of the packages in the sync databases and their versions, from a single pacman -Sl.
+    Packages are keyed both by name and by repo/name; for a bare name the first repository listing it wins, as with pacman -Si"""
+    cmd = "%s -Sl" % (pacman_path)
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-    # package is installed but cannot fetch remote Version. Last True stands for the error
-        return True, True, True
+    versions = {}
+    if rc != 0:
+        return versions
+    for line in stdout.split('\n'):
+        fields = line.split()
+        if len(fields) >= 3:
+            versions['%s/%s' % (fields[0], fields[1])] = fields[2]
+            if fields[1] not in versions:
+                versions[fields[1]] = fields[2]
+    return versions
+
+def query_packages(module, pacman_path, names, need_remote):
+    """Query the status of all packages at once in both the local system and the repository.
+    Returns a dict mapping every name to a tuple of three booleans: whether the package is installed,
+    whether it is up-to-date and whether online information was unavailable.
+    The repository is only queried if need_remote is set; otherwise installed packages count as up-to-date.
+    Names that are not installed packages are resolved to the installed package providing them, as pacman -Qi does."""
+    local = get_local_versions(module, pacman_path)
+    if need_remote:
+        remote = get_sync_versions(module, pacman_path)
+
+    unresolved = []
+    for name in names:
+        pkgname = name.split('/')[-1]
+        if pkgname not in local and pkgname not in unresolved:
+            unresolved.append(pkgname)
+    providers = {}
+    if unresolved:
+        providers = get_local_providers(module, pacman_path, unresolved)
+
+    status = {}
+    for name in names:
+        # the installed package named or providing name, kept under the repository prefix if any
+        parts = name.split('/')
+        parts[-1] = providers.get(parts[-1], parts[-1])
+        target = '/'.join(parts)
+        lversion = local.get(parts[-1])
+        if lversion is None:
+            # package is not installed locally
+            status[name] = (False, False, False)
+        elif not need_remote:
+            status[name] = (True, True, False)
+        elif target in remote:
+            # compare the installed version to the one in the repository to determine if the package is up-to-date
+            status[name] = (True, lversion == remote[target], False)
+        else:
+            # package is installed but cannot fetch remote Version. Last True stands for the error
+            status[name] = (True, True, True)
+    return status
 
 
 def update_package_db(module, pacman_path):
@@ -192,37 +255,36 @@ def remove_packages(module, pacman_path, packages):
     else:
         args = "R"
 
-    remove_c = 0
-    # Using a for loop incase of error, we can report the package that failed
+    # Query all packages first, to see if we even need to remove them
+    status = query_packages(module, pacman_path, packages, False)
+    to_remove = []
     for package in packages:
-        # Query the package first, to see if we even need to remove
-        installed, updated, unknown = query_package(module, pacman_path, package)
-        if not installed:
-            continue
-
-        cmd = "%s -%s %s --noconfirm" % (pacman_path, args, package)
-        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
-
-        if rc != 0:
-            module.fail_json(msg="failed to remove %s" % (package))
+        if status[package][0] and package not in to_remove:
+            to_remove.append(package)
 
-        remove_c += 1
+    if not to_remove:
+        module.exit_json(changed=False, msg="package(s) already absent")
 
-    if remove_c > 0:
+    # Remove everything in one transaction
+    cmd = "%s -%s %s --noconfirm" % (pacman_path, args, " ".join(to_remove))
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-        module.exit_json(changed=True, msg="removed %s package(s)" % remove_c)
+    if rc != 0:
+        module.fail_json(msg="failed to remove %s" % (" ".join(to_remove)), stderr=stderr)
 
-    module.exit_json(changed=False, msg="package(s) already absent")
+    module.exit_json(changed=True, msg="removed %s package(s)" % len(to_remove))
 
 
 def install_packages(module, pacman_path, state, packages, package_files):
-    install_c = 0
     package_err = []
     message = ""
 
+    status = query_packages(module, pacman_path, packages, state == 'latest')
+    to_install = []
+    to_install_files = []
     for i, package in enumerate(packages):
         # if the package is installed and state == present or state == latest and is up-to-date then skip
-        installed, updated, latestError = query_package(module, pacman_path, package)
+        installed, updated, latestError = status[package]
         if latestError and state == 'latest':
             package_err.append(package)
 
@@ -230,17 +292,22 @@ def install_packages(module, pacman_path, state, packages, package_files):
             continue
 
         if package_files[i]:
-            params = '-U %s' % package_files[i]
-        else:
-            params = '-S %s' % package
-
-        cmd = "%s %s --noconfirm --needed" % (pacman_path, params)
+            if package_files[i] not in to_install_files:
+                to_install_files.append(package_files[i])
+        elif package not in to_install:
+            to_install.append(package)
+
+    # One transaction for repository packages and one for package files
+    for params, targets in (('-S', to_install), ('-U', to_install_files)):
+        if not targets:
+            continue
+        cmd = "%s %s %s --noconfirm --needed" % (pacman_path, params, " ".join(targets))
         rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
         if rc != 0:
-            module.fail_json(msg="failed to install %s" % (package))
+            module.fail_json(msg="failed to install %s" % (" ".join(targets)), stderr=stderr)
 
-        install_c += 1
+    install_c = len(to_install) + len(to_install_files)
 
     if state == 'latest' and len(package_err) > 0:
         message = "But could not ensure 'latest' state for %s package(s) as remote version could not be fetched." % (package_err)
@@ -252,8 +319,9 @@ def install_packages(module, pacman_path, state, packages, package_files):
 
 def check_packages(module, pacman_path, packages, state):
     would_be_changed = []
+    status = query_packages(module, pacman_path, packages, state == 'latest')
     for package in packages:
-        installed, updated, unknown = query_package(module, pacman_path, package)
+        installed, updated, unknown = status[package]
         if ((state in ["present", "latest"] and not installed) or
                 (state == "absent" and installed) or
                 (state == "latest" and not updated)):
@@ -268,18 +336,22 @@ def check_packages(module, pacman_path, packages, state):
 
 
 def expand_package_groups(module, pacman_path, pkgs):
-    expanded = []
+    # A single pacman -Sgg lists the members of every group as "group package" lines
+    cmd = "%s -Sgg" % (pacman_path)
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-    for pkg in pkgs:
-        cmd = "%s -Sgq %s" % (pacman_path, pkg)
-        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    groups = {}
+    if rc == 0:
+        for line in stdout.split('\n'):
+            fields = line.split()
+            if len(fields) == 2:
+                groups.setdefault(fields[0], []).append(fields[1])
 
-        if rc == 0:
+    expanded = []
+    for pkg in pkgs:
+        if pkg in groups:
             # A group was found matching the name, so expand it
-            for name in stdout.split('\n'):
-                name = name.strip()
-                if name:
-                    expanded.append(name)
+            expanded.extend(groups[pkg])
         else:
             expanded.append(pkg)
 
@@ -86,6 +86,31 @@ options:
     required: false
     default: null
     version_added: "2.1"
+  services:
+    description:
+      - "List of services to add/remove to/from the zone. Combined with C(service) when both are given."
+      - "Zone settings are read once and all permanent changes are written with a single update of the zone."
+    required: false
+    default: null
+    version_added: "2.2"
+  ports:
+    description:
+      - "List of ports or port ranges in the form PORT/PROTOCOL or PORT-PORT/PROTOCOL. Combined with C(port) when both are given."
+    required: false
+    default: null
+    version_added: "2.2"
+  rich_rules:
+    description:
+      - "List of rich rules to add/remove to/from the zone. Combined with C(rich_rule) when both are given."
+    required: false
+    default: null
+    version_added: "2.2"
+  sources:
+    description:
+      - "List of sources/networks to add/remove to/from the zone. Like C(source), sources are always stored in the permanent configuration."
+    required: false
+    default: null
+    version_added: "2.2"
 notes:
   - Not tested on any Debian based system.
   - Requires the python2 bindings of firewalld, who may not be installed by default if the distribution switched to python 3 
@@ -102,6 +127,20 @@ EXAMPLES = '''
 - firewalld: source='192.168.1.0/24' zone=internal state=enabled
 - firewalld: zone=trusted interface=eth2 permanent=true state=enabled
 - firewalld: masquerade=yes state=enabled permanent=true zone=dmz
+
+# Open many ports and rich rules with a single update of the zone
+- firewalld:
+    zone: public
+    permanent: true
+    immediate: true
+    state: enabled
+    ports:
+      - 8080/tcp
+      - 8443/tcp
+      - 5000-5010/udp
+    services: [ http, https ]
+    rich_rules:
+      - 'rule family="ipv4" source address="10.0.0.0/8" service name="ssh" accept'
 '''
 
 import os
@@ -329,6 +368,159 @@ def set_rich_rule_disabled_permanent(zone, rule):
     fw_zone.update(fw_settings)
 
 
+####################
+# batch handling
+#
+ZONE_ITEMS = ('services', 'ports', 'rich_rules', 'sources')
+
+# settings methods used to add/remove each kind of item in the permanent
+# configuration, and the client methods doing the same at runtime
+PERMANENT_ACTIONS = dict(
+    services=('addService', 'removeService'),
+    ports=('addPort', 'removePort'),
+    rich_rules=('addRichRule', 'removeRichRule'),
+    sources=('addSource', 'removeSource'),
+)
+RUNTIME_ACTIONS = dict(
+    services=('addService', 'removeService'),
+    ports=('addPort', 'removePort'),
+    rich_rules=('addRichRule', 'removeRichRule'),
+)
+
+def format_zone_item(kind, item):
+    if kind == 'ports':
+        return '%s/%s' % item
+    return item
+
+def wanted_zone_items(module):
+    """ Merge the list and single item parameters into normalized items """
+    wanted = {}
+    for kind, single in (('services', 'service'), ('ports', 'port'),
+                         ('rich_rules', 'rich_rule'), ('sources', 'source')):
+        values = list(module.params[kind] or [])
+        if module.params[single] != None:
+            values.append(module.params[single])
+        items = []
+        for value in values:
+            if kind == 'ports':
+                try:
+                    port, protocol = value.split('/')
+                except ValueError:
+                    module.fail_json(msg='improper port format %s (missing protocol?)' % value)
+                item = (port, protocol)
+            elif kind == 'rich_rules':
+                # Convert the rule string to standard format
+                # so it compares equal to the stored one
+                item = str(Rich_Rule(rule_str=value))
+            else:
+                item = value
+            if item not in items:
+                items.append(item)
+        if items:
+            wanted[kind] = items
+    return wanted
+
+def pending_zone_items(current, wanted, desired_state):
+    pending = {}
+    for kind, items in wanted.items():
+        present = current[kind]
+        if desired_state == 'enabled':
+            todo = [item for item in items if item not in present]
+        else:
+            todo = [item for item in items if item in present]
+        if todo:
+            pending[kind] = todo
+    return pending
+
+def get_zone_items_permanent(fw_settings, kinds):
+    current = {}
+    if 'services' in kinds:
+        current['services'] = fw_settings.getServices()
+    if 'ports' in kinds:
+        current['ports'] = [tuple(p) for p in fw_settings.getPorts()]
+    if 'rich_rules' in kinds:
+        current['rich_rules'] = fw_settings.getRichRules()
+    if 'sources' in kinds:
+        current['sources'] = fw_settings.getSources()
+    return current
+
+def get_zone_items(zone, kinds):
+    current = {}
+    if 'services' in kinds:
+        current['services'] = fw.getServices(zone)
+    if 'ports' in kinds:
+        current['ports'] = [tuple(p) for p in fw.getPorts(zone)]
+    if 'rich_rules' in kinds:
+        current['rich_rules'] = fw.getRichRules(zone)
+    return current
+
+def set_zone_items_permanent(fw_zone, fw_settings, pending, enable):
+    """ Apply every pending change to the settings and write them once """
+    for kind, items in pending.items():
+        method = getattr(fw_settings, PERMANENT_ACTIONS[kind][not enable])
+        for item in items:
+            if kind == 'ports':
+                method(*item)
+            else:
+                method(item)
+    fw_zone.update(fw_settings)
+
+def set_zone_items(zone, pending, enable, timeout):
+    for kind, items in pending.items():
+        method = getattr(fw, RUNTIME_ACTIONS[kind][not enable])
+        for item in items:
+            if kind == 'ports':
+                args = [zone, item[0], item[1]]
+            else:
+                args = [zone, item]
+            if enable:
+                args.append(timeout)
+            method(*args)
+
+def sync_zone_items(module, zone, wanted, permanent, immediate):
+    """ Bring the services, ports, rich rules and sources of a zone to the
+    desired state reading and writing the permanent zone settings once """
+    desired_state = module.params['state']
+    enable = desired_state == 'enabled'
+    changes = dict(permanent={}, runtime={})
+    msgs = []
+
+    # sources are always handled in the permanent configuration, as with
+    # the single source parameter
+    permanent_kinds = [kind for kind in wanted if permanent or kind == 'sources']
+    if permanent_kinds:
+        fw_zone = fw.config().getZoneByName(zone)
+        fw_settings = fw_zone.getSettings()
+        current = get_zone_items_permanent(fw_settings, permanent_kinds)
+        pending = pending_zone_items(current,
+                dict([(k, wanted[k]) for k in permanent_kinds]), desired_state)
+        if pending and not module.check_mode:
+            set_zone_items_permanent(fw_zone, fw_settings, pending, enable)
+        changes['permanent'] = pending
+        if permanent:
+            msgs.append('Permanent operation')
+
+    runtime_kinds = [kind for kind in wanted if kind in RUNTIME_ACTIONS]
+    if runtime_kinds and (immediate or not permanent):
+        current = get_zone_items(zone, runtime_kinds)
+        pending = pending_zone_items(current,
+                dict([(k, wanted[k]) for k in runtime_kinds]), desired_state)
+        if pending and not module.check_mode:
+            set_zone_items(zone, pending, enable, module.params['timeout'])
+        changes['runtime'] = pending
+        msgs.append('Non-permanent operation')
+
+    changed = False
+    for scope in ('permanent', 'runtime'):
+        for kind, items in changes[scope].items():
+            changed = True
+            items = [format_zone_item(kind, item) for item in items]
+            changes[scope][kind] = items
+            msgs.append("Changed %s %s to %s in zone %s" % (kind,
+                        ', '.join(items), desired_state, zone))
+    return changed, changes, msgs
+
+
 def main():
 
     module = AnsibleModule(
@@ -344,10 +536,15 @@ def main():
             timeout=dict(type='int',required=False,default=0),
             interface=dict(required=False,default=None),
             masquerade=dict(required=False,default=None),
+            services=dict(type='list',required=False,default=None),
+            ports=dict(type='list',required=False,default=None),
+            rich_rules=dict(type='list',required=False,default=None),
+            sources=dict(type='list',required=False,default=None),
         ),
         supports_check_mode=True
     )
-    if module.params['source'] == None and module.params['permanent'] == None:
+    if module.params['source'] == None and module.params['sources'] == None \
+            and module.params['permanent'] == None:
         module.fail_json(msg='permanent is a required parameter')
 
     if module.params['interface'] != None and module.params['zone'] == None:
@@ -363,6 +560,24 @@ def main():
     ## Global Vars
     changed=False
     msgs = []
+
+    if module.params['zone'] != None:
+        zone = module.params['zone']
+    else:
+        zone = fw.getDefaultZone()
+
+    batch = False
+    for kind in ZONE_ITEMS:
+        if module.params[kind] != None:
+            batch = True
+    if batch:
+        if module.params['interface'] != None or module.params['masquerade'] != None:
+            module.fail_json(msg='interface and masquerade can not be combined with services, ports, rich_rules or sources')
+        wanted = wanted_zone_items(module)
+        changed, changes, msgs = sync_zone_items(module, zone, wanted,
+                module.params['permanent'], module.params['immediate'])
+        module.exit_json(changed=changed, changes=changes, msg=', '.join(msgs))
+
     service = module.params['service']
     rich_rule = module.params['rich_rule']
     source = module.params['source']
@@ -374,11 +589,6 @@ def main():
     else:
         port = None
 
-    if module.params['zone'] != None:
-        zone = module.params['zone']
-    else:
-        zone = fw.getDefaultZone()
-
     permanent = module.params['permanent']
     desired_state = module.params['state']
     immediate = module.params['immediate']
@@ -23,6 +23,16 @@ BINS = dict(
     ipv6='ip6tables',
 )
 
+SAVE_BINS = dict(
+    ipv4='iptables-save',
+    ipv6='ip6tables-save',
+)
+
+RESTORE_BINS = dict(
+    ipv4='iptables-restore',
+    ipv6='ip6tables-restore',
+)
+
 DOCUMENTATION = '''
 ---
 module: iptables
@@ -75,7 +85,22 @@ options:
       - "Chain to operate on. This option can either be the name of a user
         defined chain or any of the builtin chains: 'INPUT', 'FORWARD',
         'OUTPUT', 'PREROUTING', 'POSTROUTING', 'SECMARK', 'CONNSECMARK'"
-    required: true
+      - Required unless C(rules) is given.
+    required: false
+  rules:
+    version_added: "2.2"
+    description:
+      - A list of rules to manage at once instead of a single rule. Each item
+        is a dictionary taking the same keys as this module, including
+        C(table), C(chain), C(state), C(action) and C(ip_version); the options
+        given to the module are used as defaults for each rule.
+      - The current rules are read once with iptables-save, compared with the
+        wanted rules, and all changes are applied in a single
+        C(iptables-restore --noflush) call, so each table is updated
+        atomically. Rules that are inserted are placed at the top of their
+        chain in the order they are listed.
+    required: false
+    default: null
   protocol:
     description:
       - The protocol of the rule or of the packet to check. The specified
@@ -308,8 +333,160 @@ EXAMPLES = '''
 
 # Tag all outbound tcp packets with DSCP DiffServ class CS1
 - iptables: chain=OUTPUT jump=DSCP table=mangle set_dscp_mark_class=CS1 protocol=tcp
+
+# Converge a set of rules in one transaction
+- iptables:
+    chain: INPUT
+    rules:
+      - { ctstate: [ 'ESTABLISHED', 'RELATED' ], jump: ACCEPT, action: insert }
+      - { protocol: tcp, destination_port: 22, jump: ACCEPT }
+      - { protocol: tcp, destination_port: 80, jump: ACCEPT, comment: "web traffic" }
+      - { source: 8.8.8.8, jump: DROP, state: absent }
+  become: yes
 '''
 
+import pwd
+import shlex
+import socket
+
+# iptables-save option -> module parameter
+SAVE_OPTIONS = {
+    '-p': 'protocol',
+    '-s': 'source',
+    '-d': 'destination',
+    '-j': 'jump',
+    '-g': 'goto',
+    '-i': 'in_interface',
+    '-o': 'out_interface',
+    '--to-destination': 'to_destination',
+    '--to-source': 'to_source',
+    '--sport': 'source_port',
+    '--source-port': 'source_port',
+    '--dport': 'destination_port',
+    '--destination-port': 'destination_port',
+    '--to-ports': 'to_ports',
+    '--set-dscp': 'set_dscp_mark',
+    '--set-dscp-class': 'set_dscp_mark_class',
+    '--comment': 'comment',
+    '--limit': 'limit',
+    '--limit-burst': 'limit_burst',
+    '--uid-owner': 'uid_owner',
+    '--reject-with': 'reject_with',
+    '--icmp-type': 'icmp_type',
+}
+
+# parameters describing a rule, with their defaults
+RULE_PARAMS = dict(
+    protocol=None, source=None, destination=None, match=[], jump=None,
+    to_destination=None, to_source=None, goto=None, in_interface=None,
+    out_interface=None, fragment=None, set_counters=None, source_port=None,
+    destination_port=None, to_ports=None, set_dscp_mark=None,
+    set_dscp_mark_class=None, comment=None, ctstate=[], limit=None,
+    limit_burst=None, uid_owner=None, reject_with=None, icmp_type=None,
+)
+
+# default --reject-with of the REJECT target, and the names iptables-save
+# prints for the abbreviated forms
+REJECT_DEFAULTS = dict(
+    ipv4='icmp-port-unreachable',
+    ipv6='icmp6-port-unreachable',
+)
+
+REJECT_ALIASES = dict(
+    ipv4={
+        'net-unreach': 'icmp-net-unreachable',
+        'host-unreach': 'icmp-host-unreachable',
+        'port-unreach': 'icmp-port-unreachable',
+        'proto-unreach': 'icmp-proto-unreachable',
+        'net-prohib': 'icmp-net-prohibited',
+        'host-prohib': 'icmp-host-prohibited',
+        'admin-prohib': 'icmp-admin-prohibited',
+    },
+    ipv6={
+        'no-route': 'icmp6-no-route',
+        'adm-prohibited': 'icmp6-adm-prohibited',
+        'addr-unreach': 'icmp6-addr-unreachable',
+        'port-unreach': 'icmp6-port-unreachable',
+    },
+)
+
+# ICMP type names and the type[/code] iptables-save prints for them
+ICMP_TYPES = {
+    'any': 'any',
+    'echo-reply': '0',
+    'pong': '0',
+    'destination-unreachable': '3',
+    'network-unreachable': '3/0',
+    'host-unreachable': '3/1',
+    'protocol-unreachable': '3/2',
+    'port-unreachable': '3/3',
+    'fragmentation-needed': '3/4',
+    'source-route-failed': '3/5',
+    'network-unknown': '3/6',
+    'host-unknown': '3/7',
+    'network-prohibited': '3/9',
+    'host-prohibited': '3/10',
+    'tos-network-unreachable': '3/11',
+    'tos-host-unreachable': '3/12',
+    'communication-prohibited': '3/13',
+    'host-precedence-violation': '3/14',
+    'precedence-cutoff': '3/15',
+    'source-quench': '4',
+    'redirect': '5',
+    'network-redirect': '5/0',
+    'host-redirect': '5/1',
+    'tos-network-redirect': '5/2',
+    'tos-host-redirect': '5/3',
+    'echo-request': '8',
+    'ping': '8',
+    'router-advertisement': '9',
+    'router-solicitation': '10',
+    'time-exceeded': '11',
+    'ttl-exceeded': '11',
+    'ttl-zero-during-transit': '11/0',
+    'ttl-zero-during-reassembly': '11/1',
+    'parameter-problem': '12',
+    'ip-header-bad': '12/0',
+    'required-option-missing': '12/1',
+    'timestamp-request': '13',
+    'timestamp-reply': '14',
+    'address-mask-request': '17',
+    'address-mask-reply': '18',
+}
+
+# protocol names iptables-save prints as given
+SAVE_PROTOCOLS = dict(
+    ipv4=['tcp', 'udp', 'udplite', 'icmp', 'esp', 'ah', 'sctp', 'gre'],
+    ipv6=['tcp', 'udp', 'udplite', 'ipv6-icmp', 'esp', 'ah', 'sctp', 'gre'],
+)
+
+# DSCP value of each DiffServ class, iptables-save prints the value
+DSCP_CLASSES = dict(
+    CS0=0, CS1=8, CS2=16, CS3=24, CS4=32, CS5=40, CS6=48, CS7=56,
+    AF11=10, AF12=12, AF13=14, AF21=18, AF22=20, AF23=22,
+    AF31=26, AF32=28, AF33=30, AF41=34, AF42=36, AF43=38,
+    EF=46,
+)
+
+# units of --limit from the largest to the smallest, with their length in
+# ten-thousandths of a second, as the limit match stores them
+LIMIT_UNITS = [
+    ('day', 24 * 60 * 60 * 10000),
+    ('hour', 60 * 60 * 10000),
+    ('minute', 60 * 10000),
+    ('second', 10000),
+]
+LIMIT_SAVE_NAMES = dict(day='day', hour='hour', minute='min', second='sec')
+
+# matches loaded by construct_rule() for the parameter using them
+IMPLIED_MATCHES = dict(
+    comment='comment',
+    ctstate='state',
+    limit='limit',
+    limit_burst='limit',
+    uid_owner='owner',
+)
+
 
 def append_param(rule, param, flag, is_list):
     if is_list:
@@ -369,6 +546,384 @@ def construct_rule(params):
     return rule
 
 
+def canonical_icmp_type(icmp_type):
+    """
+    Return the ICMP type as iptables-save prints it, or None if it is not
+    known.
+    """
+    icmp_type = icmp_type.strip().lower()
+    if icmp_type in ICMP_TYPES:
+        return ICMP_TYPES[icmp_type]
+    parts = icmp_type.split('/')
+    try:
+        numbers = [int(x) for x in parts]
+    except ValueError:
+        return None
+    if len(numbers) > 2 or [x for x in numbers if x < 0 or x > 255]:
+        return None
+    return '/'.join([str(x) for x in numbers])
+
+
+def canonical_limit(limit):
+    """
+    Return the rate of --limit as iptables-save prints it, or None if it
+    can not be parsed.
+    """
+    limit = limit.strip().lower()
+    if '/' in limit:
+        rate, unit = limit.split('/', 1)
+    else:
+        rate, unit = limit, 'second'
+    period = None
+    for name, length in LIMIT_UNITS:
+        if unit and name.startswith(unit):
+            period = length
+            break
+    try:
+        rate = int(rate)
+    except ValueError:
+        return None
+    if period is None or rate <= 0:
+        return None
+    period = period // rate
+    if period == 0:
+        return None
+    # the limit match prints the rate with the smallest unit it is a whole
+    # number of
+    i = 1
+    while i < len(LIMIT_UNITS):
+        length = LIMIT_UNITS[i][1]
+        if period > length or length // period < length % period:
+            break
+        i += 1
+    name, length = LIMIT_UNITS[i - 1]
+    return '%d/%s' % (length // period, LIMIT_SAVE_NAMES[name])
+
+
+def canonical_address(address, ip_version):
+    """
+    Return an address or network as iptables-save prints it, with the host
+    bits masked and without a full mask, or None if it is not a literal
+    address. Return '' for a network matching every address.
+    """
+    if ip_version == 'ipv4':
+        family, bits = socket.AF_INET, 32
+    else:
+        family, bits = socket.AF_INET6, 128
+    if '/' in address:
+        address, prefix = address.split('/', 1)
+    else:
+        prefix = str(bits)
+    try:
+        packed = socket.inet_pton(family, address)
+        prefix = int(prefix)
+    except (AttributeError, socket.error, ValueError):
+        return None
+    if prefix < 0 or prefix > bits:
+        return None
+    if prefix == 0:
+        return ''
+    value = 0
+    for c in bytearray(packed):
+        value = (value << 8) | c
+    value &= ((1 << bits) - 1) ^ ((1 << (bits - prefix)) - 1)
+    octets = bytearray(bits // 8)
+    for i in range(len(octets) - 1, -1, -1):
+        octets[i] = value & 0xff
+        value >>= 8
+    address = socket.inet_ntop(family, bytes(octets))
+    if prefix == bits:
+        return address
+    return '%s/%d' % (address, prefix)
+
+
+def canonical_port(port):
+    """
+    Return a port or port range as iptables-save prints it, or None if it
+    uses service names or lists several ports.
+    """
+    ports = port.strip().split(':')
+    if len(ports) > 2 or [x for x in ports if not x.isdigit()]:
+        return None
+    ports = [int(x) for x in ports]
+    if len(ports) == 2 and ports[0] == ports[1]:
+        ports = ports[:1]
+    return ':'.join([str(x) for x in ports])
+
+
+def canonical_uid(uid):
+    """
+    Return the user id iptables-save prints for a user name or id, or None
+    if it is not known.
+    """
+    uid = uid.strip()
+    if uid.isdigit():
+        return str(int(uid))
+    try:
+        return str(pwd.getpwnam(uid).pw_uid)
+    except KeyError:
+        return None
+
+
+def canonical_params(params, ip_version):
+    """
+    Return the rule parameters in the form iptables-save prints them, so that
+    construct_rule() gives the same result for a wanted and a saved rule.
+    Return None if the rule can not be compared that way and has to be
+    checked with iptables -C.
+    """
+    rule = dict(RULE_PARAMS)
+    for key in RULE_PARAMS:
+        if params.get(key) is not None:
+            rule[key] = params[key]
+    if rule['fragment'] is not None or rule['set_counters'] is not None:
+        return None
+    # everything below is either rewritten the way iptables-save prints it,
+    # or makes the rule fall back to iptables -C
+    if rule['protocol'] is not None:
+        rule['protocol'] = str(rule['protocol']).lower()
+        if ip_version == 'ipv6' and rule['protocol'] == 'icmpv6':
+            rule['protocol'] = 'ipv6-icmp'
+        if rule['protocol'] == 'all':
+            rule['protocol'] = None
+        elif rule['protocol'] not in SAVE_PROTOCOLS[ip_version]:
+            return None
+    for key in ['source', 'destination']:
+        if rule[key] is not None:
+            rule[key] = canonical_address(str(rule[key]), ip_version)
+            if rule[key] is None:
+                return None
+            if not rule[key]:
+                rule[key] = None
+    for key in ['source_port', 'destination_port']:
+        if rule[key] is not None:
+            rule[key] = canonical_port(str(rule[key]))
+            if rule[key] is None:
+                return None
+    if rule['uid_owner'] is not None:
+        rule['uid_owner'] = canonical_uid(str(rule['uid_owner']))
+        if rule['uid_owner'] is None:
+            return None
+    if rule['set_dscp_mark_class'] is not None:
+        dscp_class = str(rule['set_dscp_mark_class']).upper()
+        if dscp_class not in DSCP_CLASSES:
+            return None
+        rule['set_dscp_mark'] = DSCP_CLASSES[dscp_class]
+        rule['set_dscp_mark_class'] = None
+    if rule['set_dscp_mark'] is not None:
+        try:
+            rule['set_dscp_mark'] = str(int(str(rule['set_dscp_mark']), 0))
+        except ValueError:
+            return None
+    if rule['jump'] == 'REJECT' and rule['reject_with'] is None:
+        rule['reject_with'] = REJECT_DEFAULTS[ip_version]
+    if rule['reject_with'] is not None:
+        reject_with = str(rule['reject_with'])
+        rule['reject_with'] = REJECT_ALIASES[ip_version].get(reject_with, reject_with)
+        if rule['jump'] == 'REJECT':
+            rule['jump'] = None
+    if rule['icmp_type'] is not None:
+        # ip6tables prints the type with --icmpv6-type, which construct_rule()
+        # does not produce
+        if ip_version != 'ipv4':
+            return None
+        rule['icmp_type'] = canonical_icmp_type(str(rule['icmp_type']))
+        if rule['icmp_type'] is None:
+            return None
+    if rule['limit'] is not None or rule['limit_burst'] is not None:
+        rule['limit'] = canonical_limit(str(rule['limit'] or '3/hour'))
+        if rule['limit'] is None:
+            return None
+        # the default burst is not printed
+        if rule['limit_burst'] is not None:
+            if not str(rule['limit_burst']).isdigit():
+                return None
+            rule['limit_burst'] = str(int(str(rule['limit_burst'])))
+            if rule['limit_burst'] == '5':
+                rule['limit_burst'] = None
+    rule['ctstate'] = sorted([x.upper() for x in rule['ctstate']])
+    implied = []
+    for key, match in IMPLIED_MATCHES.items():
+        if rule[key]:
+            implied.append(match)
+    if rule['ctstate']:
+        implied.append('conntrack')
+    matches = []
+    for match in rule['match']:
+        if rule['protocol'] is not None and match.lower() == rule['protocol']:
+            match = rule['protocol']
+        elif match not in implied:
+            # the options of other matches, like multiport, are not known
+            return None
+        if match not in implied and match not in matches:
+            matches.append(match)
+    rule['match'] = matches
+    for key in RULE_PARAMS:
+        if rule[key] is not None and not isinstance(rule[key], list):
+            rule[key] = str(rule[key])
+    return rule
+
+
+def parse_saved_rule(args, ip_version):
+    """
+    Parse the arguments of a rule printed by iptables-save into rule
+    parameters. Return None if the rule uses options this module does not
+    handle.
+    """
+    params = dict(RULE_PARAMS)
+    params['match'] = []
+    i = 0
+    while i < len(args):
+        opt = args[i]
+        # negations and fragments take no value, and are not compared
+        if opt in ['!', '-f'] or i + 1 == len(args):
+            return None
+        value = args[i + 1]
+        if opt == '-m':
+            params['match'].append(value)
+        elif opt in ['--state', '--ctstate']:
+            params['ctstate'] = value.split(',')
+        elif opt in SAVE_OPTIONS:
+            params[SAVE_OPTIONS[opt]] = value
+        else:
+            return None
+        i += 2
+    return canonical_params(params, ip_version)
+
+
+def rule_key(chain, params):
+    # iptables-save always lists the match of the protocol and may print
+    # the state match as conntrack, ignore both
+    params = dict(params)
+    params['match'] = [x for x in params['match'] if x not in [params['protocol'], 'conntrack']]
+    return (chain, tuple(construct_rule(params)))
+
+
+def quote_restore_arg(arg):
+    if arg and not [c for c in arg if c.isspace() or c in '"\'#']:
+        return arg
+    return '"%s"' % arg.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def load_saved_rules(module, save_path, ip_version):
+    """
+    Read all tables with a single iptables-save call and index their rules
+    by table and canonical form.
+    """
+    rc, out, err = module.run_command([save_path], check_rc=True)
+    tables = {}
+    table = None
+    for line in out.splitlines():
+        if line.startswith('*'):
+            table = line[1:].strip()
+            tables[table] = {}
+        elif line.startswith('-A ') and table is not None:
+            args = shlex.split(line)
+            chain = args[1]
+            params = parse_saved_rule(args[2:], ip_version)
+            if params is None:
+                key = (chain, line)
+            else:
+                key = rule_key(chain, params)
+            # keep the saved text, used to delete the rule
+            tables[table].setdefault(key, line[len('-A '):])
+    return tables
+
+
+def apply_rules(module, items):
+    """
+    Compare the wanted rules with the saved tables and apply all changes
+    with a single iptables-restore --noflush call per IP version.
+    """
+    results = []
+    changed = False
+    versions = {}
+    for item in items:
+        if not isinstance(item, dict):
+            module.fail_json(msg="Each item of rules must be a dictionary, got: %s" % item)
+        for key in item:
+            if key not in RULE_PARAMS and key not in ['table', 'chain', 'state', 'action', 'ip_version']:
+                module.fail_json(msg="Unsupported option %s in rule %s" % (key, item))
+        params = dict(module.params)
+        params.update(item)
+        for key in ['match', 'ctstate']:
+            if not isinstance(params[key], list):
+                params[key] = str(params[key]).split(',')
+        if not params['chain']:
+            module.fail_json(msg="No chain given for rule %s" % item)
+        versions.setdefault(params['ip_version'], []).append(params)
+
+    for ip_version, rules in versions.items():
+        saved = load_saved_rules(module, module.get_bin_path(SAVE_BINS[ip_version], True), ip_version)
+        iptables_path = None
+        # table -> list of restore commands
+        commands = {}
+        inserts = {}
+        # rules checked with iptables -C -> state after the pending commands
+        checked = {}
+        for params in rules:
+            table = params['table']
+            chain = params['chain']
+            should_be_present = (params['state'] == 'present')
+            canonical = canonical_params(params, ip_version)
+            if canonical is None:
+                rule = construct_rule(params)
+                key = (table, chain, tuple(rule))
+                if key not in checked:
+                    if iptables_path is None:
+                        iptables_path = module.get_bin_path(BINS[ip_version], True)
+                    checked[key] = check_present(iptables_path, module, params)
+                present = checked[key]
+                checked[key] = should_be_present
+            else:
+                rule = construct_rule(canonical)
+                key = rule_key(chain, canonical)
+                present = key in saved.get(table, {})
+            result = dict(ip_version=ip_version, table=table, chain=chain,
+                          rule=' '.join(rule), state=params['state'],
+                          changed=(present != should_be_present))
+            results.append(result)
+            if not result['changed']:
+                continue
+            changed = True
+            tables = saved.setdefault(table, {})
+            line = ' '.join([quote_restore_arg(arg) for arg in rule])
+            if canonical is None:
+                # the rule is not indexed in the saved tables
+                if not should_be_present:
+                    commands.setdefault(table, []).append('-D %s %s' % (chain, line))
+                elif params['action'] == 'insert':
+                    inserts.setdefault(table, []).append('-I %s 1 %s' % (chain, line))
+                else:
+                    commands.setdefault(table, []).append('-A %s %s' % (chain, line))
+            elif not should_be_present:
+                commands.setdefault(table, []).append('-D ' + tables.pop(key))
+            elif params['action'] == 'insert':
+                inserts.setdefault(table, []).append('-I %s 1 %s' % (chain, line))
+                tables[key] = '%s %s' % (chain, line)
+            else:
+                commands.setdefault(table, []).append('-A %s %s' % (chain, line))
+                tables[key] = '%s %s' % (chain, line)
+
+        for table, lines in inserts.items():
+            # the rules inserted last end up at the top
+            lines.reverse()
+            commands.setdefault(table, []).extend(lines)
+
+        if commands and not module.check_mode:
+            data = []
+            for table, lines in commands.items():
+                data.append('*' + table)
+                data.extend(lines)
+                data.append('COMMIT')
+            restore_path = module.get_bin_path(RESTORE_BINS[ip_version], True)
+            rc, out, err = module.run_command([restore_path, '--noflush'], data='\n'.join(data) + '\n')
+            if rc != 0:
+                module.fail_json(msg="iptables-restore failed: %s" % err, rc=rc, rules=results)
+
+    return changed, results
+
+
 def push_arguments(iptables_path, action, params):
     cmd = [iptables_path]
     cmd.extend(['-t', params['table']])
@@ -406,7 +961,8 @@ def main():
             state=dict(required=False, default='present', choices=['present', 'absent']),
             action=dict(required=False, default='append', type='str', choices=['append', 'insert']),
             ip_version=dict(required=False, default='ipv4', choices=['ipv4', 'ipv6']),
-            chain=dict(required=True, default=None, type='str'),
+            chain=dict(required=False, default=None, type='str'),
+            rules=dict(required=False, default=None, type='list'),
             protocol=dict(required=False, default=None, type='str'),
             source=dict(required=False, default=None, type='str'),
             to_source=dict(required=False, default=None, type='str'),
@@ -436,6 +992,13 @@ def main():
             ['set_dscp_mark', 'set_dscp_mark_class'],
         ),
     )
+    if module.params['rules'] is not None:
+        changed, results = apply_rules(module, module.params['rules'])
+        module.exit_json(changed=changed, rules=results)
+
+    if not module.params['chain']:
+        module.fail_json(msg="chain is required unless rules is given")
+
     args = dict(
         changed=False,
         failed=False,
@@ -32,8 +32,9 @@ options:
   name:
     aliases: [ 'host' ]
     description:
-      - The host to add or remove (must match a host specified in key)
-    required: true
+      - The host to add or remove (must match a host specified in key).
+        Required unless C(hosts) is given.
+    required: false
     default: null
   key:
     description:
@@ -51,6 +52,18 @@ options:
     choices: [ "present", "absent" ]
     required: no
     default: present
+  hosts:
+    description:
+      - A list of entries to manage in one go instead of a single C(name).
+        Each item is a dictionary with the keys C(name), C(key) and
+        optionally C(state), which defaults to the module's C(state).
+      - The file is parsed once into an in-memory index, hashed (C(|1|))
+        entries are matched without calling ssh-keygen, all changes are
+        applied in memory and the file is written once.
+      - Mutually exclusive with C(name).
+    required: false
+    default: null
+    version_added: "2.2"
 requirements: [ ]
 author: "Matthew Vernon (@mcv21)"
 '''
@@ -61,6 +74,18 @@ EXAMPLES = '''
   known_hosts: path='/etc/ssh/ssh_known_hosts'
                name='foo.com.invalid'
                key="{{ lookup('file', 'pubkeys/foo.com.invalid') }}"
+
+# Manage the keys of a whole fleet with a single write
+- name: add fleet host keys, drop a decommissioned host
+  known_hosts:
+    path: /etc/ssh/ssh_known_hosts
+    hosts:
+      - name: web1.example.com
+        key: "{{ lookup('file', 'pubkeys/web1.example.com') }}"
+      - name: web2.example.com
+        key: "{{ lookup('file', 'pubkeys/web2.example.com') }}"
+      - name: old.example.com
+        state: absent
 '''
 
 # Makes sure public host keys are present or absent in the given known_hosts
@@ -78,6 +103,12 @@ import os.path
 import tempfile
 import errno
 import re
+import hmac
+import base64
+try:
+    from hashlib import sha1
+except ImportError:
+    import sha as sha1
 from ansible.module_utils.pycompat24 import get_exception
 from ansible.module_utils.basic import *
 
@@ -265,19 +296,239 @@ def normalize_known_hosts_key(key, host):
         d['key']=k[2]
     return d
 
+HASH_MAGIC = '|1|'
+
+
+def match_host_pattern(host, pattern):
+    '''Match host against one ssh_config(5) style pattern (* and ?)'''
+    regex = re.escape(pattern.lower()).replace('\\*', '.*').replace('\\?', '.')
+    return re.match('^%s$' % regex, host.lower()) is not None
+
+class KnownHostsIndex(object):
+    '''
+    In-memory copy of a known_hosts file, indexed by host.
+
+    Plain host names are kept in a dictionary, hashed entries (|1|salt|hash)
+    are matched by computing the HMAC-SHA1 of the host with each salt and
+    entries using wildcards or negation are matched pattern by pattern.
+    Removed lines are set to None so that line indexes stay valid.
+    '''
+
+    def __init__(self, lines):
+        self.lines = []
+        self.plain = {}
+        self.hashed = []
+        self.patterns = []
+        for line in lines:
+            self.add_line(line)
+
+    def add_line(self, line):
+        i = len(self.lines)
+        self.lines.append(line)
+        fields = line.split()
+        if not fields or fields[0][0] == '#':
+            return
+        # a marker line needs marker, hosts, type and key, any other line
+        # hosts, type and key; ssh ignores shorter lines as well
+        if fields[0][0] == '@':
+            if len(fields) < 4:
+                return
+            hostfield = fields[1]
+        else:
+            if len(fields) < 3:
+                return
+            hostfield = fields[0]
+
+        if hostfield.startswith(HASH_MAGIC):
+            try:
+                salt, digest = hostfield[len(HASH_MAGIC):].split('|')
+                salt = base64.b64decode(salt)
+                digest = base64.b64decode(digest)
+            except (ValueError, TypeError):
+                return # not a hash ssh would understand either
+            self.hashed.append((i, hmac.new(salt, None, sha1), digest))
+            return
+
+        patterns = hostfield.split(',')
+        for pattern in patterns:
+            if pattern[:1] == '!' or '*' in pattern or '?' in pattern:
+                self.patterns.append((i, patterns))
+                return
+        for pattern in patterns:
+            self.plain.setdefault(pattern.lower(), []).append(i)
+
+    def lookup(self, host):
+        '''Return the indexes of the live lines matching host, in file order'''
+        found = list(self.plain.get(host.lower(), []))
+        if isinstance(host, bytes):
+            host_bytes = host
+        else:
+            host_bytes = host.encode('utf-8')
+        for i, base, digest in self.hashed:
+            h = base.copy()
+            h.update(host_bytes)
+            if h.digest() == digest:
+                found.append(i)
+        for i, patterns in self.patterns:
+            matched = False
+            for pattern in patterns:
+                if pattern[:1] == '!':
+                    if match_host_pattern(host, pattern[1:]):
+                        matched = False
+                        break
+                elif match_host_pattern(host, pattern):
+                    matched = True
+            if matched:
+                found.append(i)
+        found = [i for i in set(found) if self.lines[i] is not None]
+        found.sort()
+        return found
+
+    def remove(self, i):
+        self.lines[i] = None
+
+    def append_key(self, key):
+        for i in range(len(self.lines) - 1, -1, -1):
+            if self.lines[i] is not None:
+                if not self.lines[i].endswith('\n'):
+                    self.lines[i] += '\n'
+                break
+        for line in key.splitlines(True):
+            self.add_line(line)
+
+    def content(self):
+        return ''.join([l for l in self.lines if l is not None])
+
+def key_matches_host(key, host):
+    '''Native equivalent of sanity_check: does a line of key match host?'''
+    index = KnownHostsIndex(key.splitlines(True))
+    return len(index.lookup(host)) > 0
+
+def search_index(index, host, key):
+    '''search_index(index,host,key) -> (found,replace_or_add,found_line)
+
+    Same as search_for_host_key, but against a KnownHostsIndex; found_line
+    is an index into index.lines.
+    '''
+    matches = index.lookup(host)
+    if not matches:
+        return False, False, None
+    if key is None:
+        return True, False, None
+
+    new_key = normalize_known_hosts_key(key, host)
+    for i in matches:
+        found_key = normalize_known_hosts_key(index.lines[i], host)
+        if new_key == found_key:
+            return True, False, i
+        elif new_key['type'] == found_key['type']:
+            return True, True, i
+    return True, True, None
+
+def enforce_state_batch(module, params):
+    """
+    Add or remove the keys of every entry in hosts, reading and writing
+    the known_hosts file only once.
+    """
+
+    path = params.get("path")
+    requests = []
+    for item in params["hosts"]:
+        if not isinstance(item, dict) or not item.get("name"):
+            module.fail_json(msg="Each item of hosts must be a dictionary with a name")
+        host = item["name"]
+        key = item.get("key", None)
+        state = item.get("state", params.get("state"))
+        if state not in ("absent", "present"):
+            module.fail_json(msg="Invalid state %s for host %s" % (state, host))
+        if key and key[-1] != '\n':
+            key+='\n'
+        if key is None and state != "absent":
+            module.fail_json(msg="No key specified when adding host %s" % host)
+        if key is not None:
+            for line in key.splitlines():
+                fields = line.split()
+                if not fields:
+                    continue
+                if len(fields) < 3 or (fields[0][0] == '@' and len(fields) < 4):
+                    module.fail_json(msg="Invalid key supplied for host %s" % host)
+            if not key_matches_host(key, host):
+                module.fail_json(msg="Host parameter %s does not match host field in supplied key" % host)
+        requests.append((host, key, state))
+
+    try:
+        inf=open(path,"r")
+        lines=inf.readlines()
+        inf.close()
+    except IOError:
+        e = get_exception()
+        if e.errno == errno.ENOENT:
+            lines=[]
+        else:
+            module.fail_json(msg="Failed to read %s: %s" % \
+                                 (path,str(e)))
+
+    index = KnownHostsIndex(lines)
+    original = ''.join(lines)
+    results = []
+    for host, key, state in requests:
+        found, replace_or_add, found_line = search_index(index, host, key)
+        changed = False
+        if found and key is None and state == "absent":
+            for i in index.lookup(host):
+                index.remove(i)
+            changed = True
+        elif replace_or_add or found != (state == "present"):
+            if found_line is not None and (replace_or_add or state == "absent"):
+                index.remove(found_line)
+                changed = True
+            if state == "present":
+                index.append_key(key)
+                changed = True
+        results.append(dict(name=host, state=state, changed=changed))
+
+    content = index.content()
+    params['results'] = results
+    params['changed'] = content != original
+    if not params['changed'] or module.check_mode:
+        return params
+
+    try:
+        outf=tempfile.NamedTemporaryFile(dir=os.path.dirname(path))
+        outf.write(content)
+        outf.flush()
+        module.atomic_move(outf.name,path)
+    except (IOError,OSError):
+        e = get_exception()
+        module.fail_json(msg="Failed to write to file %s: %s" % \
+                             (path,str(e)))
+
+    try:
+        outf.close()
+    except:
+        pass
+
+    return params
+
 def main():
 
     module = AnsibleModule(
         argument_spec = dict(
-            name      = dict(required=True,  type='str', aliases=['host']),
+            name      = dict(required=False,  type='str', aliases=['host']),
             key       = dict(required=False,  type='str'),
             path      = dict(default="~/.ssh/known_hosts", type='path'),
             state     = dict(default='present', choices=['absent','present']),
+            hosts     = dict(required=False, type='list'),
             ),
+        required_one_of = [['name', 'hosts']],
+        mutually_exclusive = [['name', 'hosts'], ['key', 'hosts']],
         supports_check_mode = True
         )
 
-    results = enforce_state(module,module.params)
+    if module.params['hosts'] is not None:
+        results = enforce_state_batch(module,module.params)
+    else:
+        results = enforce_state(module,module.params)
     module.exit_json(**results)
 
 main()
@@ -121,6 +121,19 @@ options:
       - Apply the rule to routed/forwarded packets.
     required: false
     choices: ['yes', 'no']
+  rules:
+    description:
+      - A list of rules to manage at once. Each item is a dictionary taking the
+        rule options of this module (C(rule), C(direction), C(interface),
+        C(log), C(from_ip), C(from_port), C(to_ip), C(to_port), C(proto),
+        C(name), C(delete), C(insert) and C(route), aliases included); the
+        options given to the module are used as defaults for each rule.
+      - The C(### tuple) lines of the ufw rules files are read once and ufw is
+        only run for the rules that are missing, or present while marked with
+        C(delete=yes). Other commands of the task, such as C(state=reloaded),
+        run once after the rules.
+    required: false
+    version_added: "2.2"
 '''
 
 EXAMPLES = '''
@@ -176,10 +189,97 @@ ufw: rule=deny proto=tcp src=2001:db8::/32 port=25
 # Deny forwarded/routed traffic from subnet 1.2.3.0/24 to subnet 4.5.6.0/24.
 # Can be used to further restrict a global FORWARD policy set to allow
 ufw: rule=deny route=yes src=1.2.3.0/24 dest=4.5.6.0/24
+
+# Manage a set of rules, running ufw only for those that changed,
+# then reload the firewall once
+ufw:
+  state: reloaded
+  rules:
+    - { rule: allow, name: OpenSSH }
+    - { rule: allow, port: 80, proto: tcp }
+    - { rule: allow, port: 443, proto: tcp }
+    - { rule: deny, proto: udp, src: 1.2.3.4, port: 514 }
+    - { rule: allow, port: 8080, proto: tcp, delete: yes }
 '''
 
+import glob
 from operator import itemgetter
 
+# the rules ufw manages are described by a "### tuple ###" line in these files
+UFW_RULES_FILES = ['/lib/ufw/user*.rules', '/etc/ufw/user*.rules']
+
+RULE_KEYS = ['direction', 'delete', 'route', 'insert', 'rule', 'interface',
+             'log', 'from_ip', 'from_port', 'to_ip', 'to_port', 'proto', 'app']
+
+RULE_ALIASES = {'src': 'from_ip', 'from': 'from_ip', 'dest': 'to_ip',
+                'to': 'to_ip', 'port': 'to_port', 'protocol': 'proto',
+                'name': 'app', 'if': 'interface'}
+
+
+def normalize_address(address):
+    if address in ['any', '0.0.0.0/0', '::/0']:
+        return 'any'
+    for suffix in ['/32', '/128']:
+        if address.endswith(suffix):
+            return address[:-len(suffix)]
+    return address
+
+
+def rule_tuple_key(action, proto, dport, dst, sport, src, dapp, sapp, direction):
+    """
+    Return the key of a rule: the fields of its tuple line, with the
+    addresses normalized. The ports and protocol of application rules come
+    from the application profile and are left out.
+    """
+    if dapp != '-':
+        dport = None
+        proto = None
+    if sapp != '-':
+        sport = None
+        proto = None
+    return (action, proto, dport, normalize_address(dst), sport,
+            normalize_address(src), dapp.replace('%20', ' '),
+            sapp.replace('%20', ' '), direction)
+
+
+def read_rule_tuples():
+    """
+    Index the rules ufw knows about by their key, reading the tuple lines
+    of the rules files once
+    """
+    index = set()
+    for pattern in UFW_RULES_FILES:
+        for path in glob.glob(pattern):
+            f = open(path)
+            try:
+                for line in f:
+                    if not line.startswith('### tuple ###'):
+                        continue
+                    fields = line.split()[3:]
+                    if len(fields) == 7:
+                        fields = fields[:6] + ['-', '-'] + fields[6:]
+                    if len(fields) == 9:
+                        index.add(rule_tuple_key(*fields))
+            finally:
+                f.close()
+    return index
+
+
+def wanted_rule_key(params):
+    action = params['rule']
+    if params['log']:
+        action += '_log'
+    if params['route']:
+        action = 'route:' + action
+    direction = params['direction'] or 'in'
+    direction = {'incoming': 'in', 'outgoing': 'out'}.get(direction, direction)
+    if params['interface']:
+        direction += '_' + params['interface']
+    return rule_tuple_key(action, params['proto'] or 'any',
+                          str(params['to_port'] or 'any'), params['to_ip'] or 'any',
+                          str(params['from_port'] or 'any'), params['from_ip'] or 'any',
+                          params['app'] or '-', '-', direction)
+
 
 def main():
     module = AnsibleModule(
@@ -199,7 +299,8 @@ def main():
             to_ip     = dict(default='any', aliases=['dest', 'to']),
             to_port   = dict(default=None,  aliases=['port']),
             proto     = dict(default=None,  aliases=['protocol'], choices=['any', 'tcp', 'udp', 'ipv6', 'esp', 'ah']),
-            app       = dict(default=None,  aliases=['name'])
+            app       = dict(default=None,  aliases=['name']),
+            rules     = dict(default=None,  type='list')
         ),
         supports_check_mode = True,
         mutually_exclusive = [['app', 'proto', 'logging']]
@@ -222,7 +323,7 @@ def main():
     command_keys = ['state', 'default', 'rule', 'logging']
     commands = dict((key, params[key]) for key in command_keys if params[key])
 
-    if len(commands) < 1:
+    if len(commands) < 1 and params['rules'] is None:
         module.fail_json(msg="Not any of the command arguments %s given" % commands)
 
     if('interface' in params and 'direction' not in params):
@@ -231,6 +332,60 @@ def main():
     # Ensure ufw is available
     ufw_bin = module.get_bin_path('ufw', True)
 
+    def rule_command(params, value):
+        # Rules are constructed according to the long format
+        #
+        # ufw [--dry-run] [delete] [insert NUM] [route] allow|deny|reject|limit [in|out on INTERFACE] [log|log-all] \
+        #     [from ADDRESS [port PORT]] [to ADDRESS [port PORT]] \
+        #     [proto protocol] [app application]
+        cmd = [[ufw_bin], [module.check_mode, '--dry-run']]
+        cmd.append([module.boolean(params['delete']), 'delete'])
+        cmd.append([module.boolean(params['route']), 'route'])
+        cmd.append([params['insert'], "insert %s" % params['insert']])
+        cmd.append([value])
+        cmd.append([module.boolean(params['log']), 'log'])
+
+        for (key, template) in [('direction', "%s"      ), ('interface', "on %s"   ),
+                                ('from_ip',   "from %s" ), ('from_port', "port %s" ),
+                                ('to_ip',     "to %s"   ), ('to_port',   "port %s" ),
+                                ('proto',     "proto %s"), ('app',       "app '%s'")]:
+
+            value = params[key]
+            cmd.append([value, template % (value)])
+
+        return cmd
+
+    rules_changed = False
+    if params['rules'] is not None:
+        # Run ufw only for the rules that are missing or have to be deleted
+        existing = read_rule_tuples()
+        for item in params['rules']:
+            if not isinstance(item, dict):
+                module.fail_json(msg="Each item of rules must be a dictionary, got: %s" % item)
+            rule_params = dict(params)
+            for (key, value) in item.items():
+                key = RULE_ALIASES.get(key, key)
+                if key not in RULE_KEYS:
+                    module.fail_json(msg="Unsupported option %s in rule %s" % (key, item))
+                rule_params[key] = value
+            if rule_params['rule'] not in ['allow', 'deny', 'reject', 'limit']:
+                module.fail_json(msg="Invalid rule %s in %s" % (rule_params['rule'], item))
+            for key in ['delete', 'route', 'log']:
+                rule_params[key] = module.boolean(rule_params[key])
+
+            key = wanted_rule_key(rule_params)
+            if (key in existing) != rule_params['delete']:
+                continue
+            execute(rule_command(rule_params, rule_params['rule']))
+            rules_changed = True
+            if rule_params['delete']:
+                existing.discard(key)
+            else:
+                existing.add(key)
+
+        if len(commands) < 1:
+            return module.exit_json(changed=rules_changed, commands=cmds)
+
     # Save the pre state and rules in order to recognize changes
     (_, pre_state, _) = module.run_command(ufw_bin + ' status verbose')
     (_, pre_rules, _) = module.run_command("grep '^### tuple' /lib/ufw/user*.rules")
@@ -251,31 +406,12 @@ def main():
             execute(cmd + [[command], [value], [params['direction']]])
 
         elif command == 'rule':
-            # Rules are constructed according to the long format
-            #
-            # ufw [--dry-run] [delete] [insert NUM] [route] allow|deny|reject|limit [in|out on INTERFACE] [log|log-all] \
-            #     [from ADDRESS [port PORT]] [to ADDRESS [port PORT]] \
-            #     [proto protocol] [app application]
-            cmd.append([module.boolean(params['delete']), 'delete'])
-            cmd.append([module.boolean(params['route']), 'route'])
-            cmd.append([params['insert'], "insert %s" % params['insert']])
-            cmd.append([value])
-            cmd.append([module.boolean(params['log']), 'log'])
-
-            for (key, template) in [('direction', "%s"      ), ('interface', "on %s"   ),
-                                    ('from_ip',   "from %s" ), ('from_port', "port %s" ),
-                                    ('to_ip',     "to %s"   ), ('to_port',   "port %s" ),
-                                    ('proto',     "proto %s"), ('app',       "app '%s'")]:
-
-                value = params[key]
-                cmd.append([value, template % (value)])
-
-            execute(cmd)
+            execute(rule_command(params, value))
 
     # Get the new state
     (_, post_state, _) = module.run_command(ufw_bin + ' status verbose')
     (_, post_rules, _) = module.run_command("grep '^### tuple' /lib/ufw/user*.rules")
-    changed = (pre_state != post_state) or (pre_rules != post_rules)
+    changed = rules_changed or (pre_state != post_state) or (pre_rules != post_rules)
 
     return module.exit_json(changed=changed, commands=cmds, msg=post_state.rstrip())
 
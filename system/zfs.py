@@ -30,14 +30,29 @@ options:
   name:
     description:
       - File system, snapshot or volume name e.g. C(rpool/myfs)
-    required: true
+      - Required unless C(datasets) is given.
+    required: false
   state:
     description:
       - Whether to create (C(present)), or remove (C(absent)) a 
         file system, snapshot or volume. All parents/children
         will be created/destroyed as needed to reach the desired state.
+      - Required unless C(retention) is given.
     choices: ['present', 'absent']
-    required: true
+    required: false
+  datasets:
+    description:
+      - List of datasets to manage in one run. Each item is a dict with a
+        C(name) key and optionally C(state), C(origin) and any zfs
+        properties. The module level C(state) and properties are used as
+        defaults for every item.
+      - The properties of all datasets in the involved pools are read with a
+        single C(zfs get) and each dataset gets at most one C(zfs set) for all
+        of its changed properties, which requires a zfs version accepting
+        several properties in one C(zfs set).
+    required: false
+    default: null
+    version_added: "2.2"
   origin:
     description:
       - Snapshot from which to create a clone
@@ -70,15 +85,72 @@ EXAMPLES = '''
 
 # Destroy a filesystem
 - zfs: name=rpool/myfs state=absent
+
+# Manage many file systems at once, with compression on by default
+- zfs:
+    state: present
+    compression: lz4
+    datasets:
+      - name: tank/home/alice
+        quota: 10G
+      - name: tank/home/bob
+        quota: 20G
+        compression: off
+      - name: tank/home/carol
+        state: absent
+
+# Keep the newest auto- snapshot of the last 24 hours, 7 days and 4 weeks
+# for tank/home and its descendants, destroy the others
+- zfs:
+    name: tank/home
+    retention:
+      prefix: auto-
+      hourly: 24
+      daily: 7
+      weekly: 4
+      recursive: yes
 '''
 
 
+import datetime
 import os
+import re
+import time
+
+SIZE_SUFFIXES = 'BKMGTPEZ'
+
+RETENTION_PERIODS = ('hourly', 'daily', 'weekly')
+
+# upper bound of the snapshot list passed to a single zfs destroy
+DESTROY_BATCH_BYTES = 65536
+
+
+def to_zfs_value(value):
+    # Reverse the boolification of freestyle zfs properties
+    if type(value) == bool:
+        if value is True:
+            return 'on'
+        else:
+            return 'off'
+    return value
+
+
+def parsable_value(value):
+    """ Convert a human readable size like 10G to the bytes reported by
+    zfs get -p, leave any other value untouched """
+    value = str(value)
+    if value == 'none':
+        return '0'
+    match = re.match(r'^(\d+(?:\.\d+)?)([BKMGTPEZ]?)B?$', value.upper())
+    if not match:
+        return value
+    number, suffix = match.groups()
+    return str(int(float(number) * 1024 ** SIZE_SUFFIXES.find(suffix or 'B')))
 
 
 class Zfs(object):
 
-    def __init__(self, module, name, properties):
+    def __init__(self, module, name, properties, index=None, enhanced_sharing=None):
         self.module = module
         self.name = name
         self.properties = properties
@@ -87,7 +159,12 @@ class Zfs(object):
         self.pool = name.split('/')[0]
         self.zfs_cmd = module.get_bin_path('zfs', True)
         self.zpool_cmd = module.get_bin_path('zpool', True)
-        self.enhanced_sharing = self.check_enhanced_sharing()
+        # properties of all datasets as read by ZfsDatasets, used instead of
+        # running zfs list and zfs get for this dataset
+        self.index = index
+        if enhanced_sharing is None:
+            enhanced_sharing = self.check_enhanced_sharing()
+        self.enhanced_sharing = enhanced_sharing
 
     def check_enhanced_sharing(self):
         if os.uname()[0] == 'SunOS':
@@ -101,6 +178,8 @@ class Zfs(object):
         return False
 
     def exists(self):
+        if self.index is not None:
+            return self.name in self.index
         cmd = [self.zfs_cmd, 'list', '-t', 'all', self.name]
         (rc, out, err) = self.module.run_command(' '.join(cmd))
         if rc == 0:
@@ -133,7 +212,7 @@ class Zfs(object):
         if volsize:
             cmd += ['-V', volsize]
         if volblocksize:
-            cmd += ['-b', 'volblocksize']
+            cmd += ['-b', volblocksize]
         if properties:
             for prop, value in properties.iteritems():
                 cmd += ['-o', '%s="%s"' % (prop, value)]
@@ -168,13 +247,48 @@ class Zfs(object):
         else:
             self.module.fail_json(msg=err)
 
+    def set_properties(self, properties):
+        if self.module.check_mode:
+            self.changed = True
+            return
+        cmd = [self.zfs_cmd, 'set']
+        for prop, value in properties:
+            cmd.append(prop + '=' + str(value))
+        cmd.append(self.name)
+        (rc, out, err) = self.module.run_command(cmd)
+        if rc == 0:
+            self.changed = True
+        else:
+            self.module.fail_json(msg=err)
+
     def set_properties_if_changed(self):
         current_properties = self.get_current_properties()
+        if self.index is not None:
+            # zfs get -p reports exact numbers, compare sizes in bytes and
+            # set all changed properties at once
+            changed = []
+            for prop, value in self.properties.iteritems():
+                if prop in ('origin', 'volblocksize'):
+                    continue
+                current = current_properties.get(prop, None)
+                if current != str(value) and current != parsable_value(value):
+                    changed.append((prop, value))
+            if changed:
+                self.set_properties(changed)
+            return
         for prop, value in self.properties.iteritems():
             if current_properties.get(prop, None) != value:
                 self.set_property(prop, value)
 
     def get_current_properties(self):
+        if self.index is not None:
+            properties = dict()
+            for prop, (value, source) in self.index[self.name].iteritems():
+                if source == 'local':
+                    properties[prop] = value
+            properties['sharenfs'] = properties.get('share.nfs', None)
+            properties['sharesmb'] = properties.get('share.smb', None)
+            return properties
         cmd = [self.zfs_cmd, 'get', '-H']
         if self.enhanced_sharing:
             cmd += ['-e']
@@ -190,14 +304,232 @@ class Zfs(object):
         return properties
 
 
+class ZfsDatasets(object):
+    """ Manage a list of datasets, reading the properties of all of them
+    with a single zfs get over their pools """
+
+    def __init__(self, module, datasets):
+        self.module = module
+        self.datasets = datasets
+        self.changed = False
+        self.zfs_cmd = module.get_bin_path('zfs', True)
+        self.zpool_cmd = module.get_bin_path('zpool', True)
+        self.pools = []
+        for name, state, properties in datasets:
+            pool = name.split('/')[0].split('@')[0]
+            if pool not in self.pools:
+                self.pools.append(pool)
+        self.enhanced_sharing = self.check_enhanced_sharing()
+
+    def check_enhanced_sharing(self):
+        if os.uname()[0] != 'SunOS':
+            return False
+        for pool in self.pools:
+            cmd = [self.zpool_cmd, 'get', 'version', pool]
+            (rc, out, err) = self.module.run_command(cmd, check_rc=True)
+            version = out.splitlines()[-1].split()[2]
+            if int(version) < 34:
+                return False
+        return True
+
+    def get_all_properties(self):
+        """ Return {dataset: {property: (value, source)}} for every dataset
+        of the pools, limited to the properties used by the datasets """
+        types = ['filesystem', 'volume']
+        props = ['type']
+        for name, state, properties in self.datasets:
+            if '@' in name and 'snapshot' not in types:
+                types.append('snapshot')
+            for prop in properties:
+                if prop in ('origin', 'volblocksize'):
+                    continue
+                if prop in ('sharenfs', 'sharesmb') and self.enhanced_sharing:
+                    prop = prop.replace('share', 'share.')
+                if prop not in props:
+                    props.append(prop)
+        cmd = [self.zfs_cmd, 'get', '-H', '-p', '-r']
+        if self.enhanced_sharing:
+            cmd += ['-e']
+        cmd += ['-o', 'name,property,value,source', '-t', ','.join(types),
+                ','.join(props)]
+        cmd += self.pools
+        (rc, out, err) = self.module.run_command(cmd)
+        if rc != 0:
+            self.module.fail_json(msg=err)
+        index = dict()
+        for line in out.splitlines():
+            fields = line.split('\t')
+            if len(fields) < 4:
+                continue
+            name, prop, value, source = fields[:4]
+            index.setdefault(name, dict())[prop] = (value, source)
+        return index
+
+    def run(self):
+        index = self.get_all_properties()
+        results = []
+        for name, state, properties in self.datasets:
+            zfs = Zfs(self.module, name, properties, index=index,
+                      enhanced_sharing=self.enhanced_sharing)
+            if state == 'present':
+                if zfs.exists():
+                    zfs.set_properties_if_changed()
+                else:
+                    zfs.create()
+                    # zfs create -p also creates the missing parents
+                    parent = name.split('@')[0]
+                    while parent:
+                        index.setdefault(parent, dict())
+                        parent = '/'.join(parent.split('/')[:-1])
+                    index.setdefault(name, dict())
+            elif state == 'absent':
+                if zfs.exists():
+                    zfs.destroy()
+                    # zfs destroy -R also removes children and snapshots
+                    for other in list(index.keys()):
+                        if other == name or other.startswith(name + '/') \
+                                or other.startswith(name + '@'):
+                            del index[other]
+            if zfs.changed:
+                self.changed = True
+            results.append(dict(name=name, state=state, changed=zfs.changed))
+        return results
+
+
+class ZfsRetention(object):
+    """ Expire the snapshots of a dataset according to a keep N
+    hourly/daily/weekly policy """
+
+    def __init__(self, module, name, policy):
+        self.module = module
+        self.name = name
+        self.prefix = policy.get('prefix') or ''
+        self.recursive = policy.get('recursive', False)
+        self.keep = dict()
+        for period in RETENTION_PERIODS:
+            self.keep[period] = int(policy.get(period) or 0)
+        self.changed = False
+        self.zfs_cmd = module.get_bin_path('zfs', True)
+
+    def list_snapshots(self):
+        """ Return {dataset: [(snapshot, creation)]} in creation order """
+        cmd = [self.zfs_cmd, 'list', '-H', '-p', '-t', 'snapshot',
+               '-o', 'name,creation', '-s', 'createtxg']
+        if self.recursive:
+            cmd += ['-r']
+        else:
+            cmd += ['-d', '1']
+        cmd.append(self.name)
+        (rc, out, err) = self.module.run_command(cmd)
+        if rc != 0:
+            self.module.fail_json(msg=err)
+        snapshots = dict()
+        for line in out.splitlines():
+            fields = line.split('\t')
+            if len(fields) < 2:
+                continue
+            dataset, snapshot = fields[0].split('@', 1)
+            snapshots.setdefault(dataset, []).append((snapshot, int(fields[1])))
+        return snapshots
+
+    def period_key(self, period, creation):
+        created = time.localtime(creation)
+        if period == 'hourly':
+            return created[:4]
+        elif period == 'daily':
+            return created[:3]
+        return datetime.date(*created[:3]).isocalendar()[:2]
+
+    def expired(self, snapshots):
+        """ Return the snapshots matching the prefix that are not the newest
+        of one of the last N hours, days or weeks """
+        candidates = [s for s in snapshots if s[0].startswith(self.prefix)]
+        keep = dict()
+        for period in RETENTION_PERIODS:
+            seen = []
+            for snapshot, creation in reversed(candidates):
+                if len(seen) >= self.keep[period]:
+                    break
+                key = self.period_key(period, creation)
+                if key not in seen:
+                    seen.append(key)
+                    keep[snapshot] = True
+        return [s[0] for s in candidates if s[0] not in keep]
+
+    def destroy_specs(self, snapshots, expired):
+        """ Fold the expired snapshots of a dataset into a@b%c,d lists,
+        using a range wherever consecutive snapshots all expire """
+        expired = dict([(s, True) for s in expired])
+        parts = []
+        run = []
+        for snapshot, creation in snapshots + [(None, None)]:
+            if snapshot in expired:
+                run.append(snapshot)
+                continue
+            if len(run) > 1:
+                parts.append('%s%%%s' % (run[0], run[-1]))
+            elif run:
+                parts.append(run[0])
+            run = []
+        specs = []
+        batch = []
+        size = 0
+        for part in parts:
+            if batch and size + len(part) > DESTROY_BATCH_BYTES:
+                specs.append(batch)
+                batch = []
+                size = 0
+            batch.append(part)
+            size += len(part) + 1
+        if batch:
+            specs.append(batch)
+        return specs
+
+    def destroy(self, dataset, parts):
+        """ Destroy a batch of snapshots, returning the bytes reclaimed """
+        cmd = [self.zfs_cmd, 'destroy', '-v', '-p']
+        if self.module.check_mode:
+            cmd += ['-n']
+        cmd.append('%s@%s' % (dataset, ','.join(parts)))
+        (rc, out, err) = self.module.run_command(cmd)
+        if rc != 0:
+            self.module.fail_json(msg=err)
+        reclaimed = 0
+        for line in out.splitlines():
+            fields = line.split()
+            if len(fields) == 2 and fields[0] == 'reclaim':
+                reclaimed += int(fields[1])
+        return reclaimed
+
+    def run(self):
+        result = dict(destroyed=[], kept=0, reclaimed=0)
+        all_snapshots = self.list_snapshots()
+        datasets = list(all_snapshots.keys())
+        datasets.sort()
+        for dataset in datasets:
+            snapshots = all_snapshots[dataset]
+            expired = self.expired(snapshots)
+            result['kept'] += len([s for s in snapshots
+                                   if s[0].startswith(self.prefix)]) - len(expired)
+            if not expired:
+                continue
+            for parts in self.destroy_specs(snapshots, expired):
+                result['reclaimed'] += self.destroy(dataset, parts)
+            result['destroyed'] += ['%s@%s' % (dataset, s) for s in expired]
+            self.changed = True
+        return result
+
+
 def main():
 
     module = AnsibleModule(
         argument_spec = dict(
-            name =         dict(type='str', required=True),
-            state =        dict(type='str', required=True, choices=['present', 'absent']),
+            name =         dict(type='str', required=False),
+            state =        dict(type='str', required=False, choices=['present', 'absent']),
             # No longer used. Kept here to not interfere with zfs properties
-            createparent = dict(type='bool', required=False)
+            createparent = dict(type='bool', required=False),
+            datasets =     dict(type='list', required=False, default=None),
+            retention =    dict(type='dict', required=False, default=None),
             ),
         supports_check_mode=True,
         check_invalid_arguments=False
@@ -205,20 +537,58 @@ def main():
 
     state = module.params.pop('state')
     name = module.params.pop('name')
+    datasets = module.params.pop('datasets')
+    retention = module.params.pop('retention')
+
+    if retention is not None:
+        if name is None or '@' in name:
+            module.fail_json(msg='retention requires name to be a file system or volume')
+        for key in retention:
+            if key not in ('prefix', 'recursive') + RETENTION_PERIODS:
+                module.fail_json(msg='unsupported retention key %s' % key)
+        try:
+            for period in RETENTION_PERIODS:
+                int(retention.get(period) or 0)
+        except ValueError:
+            module.fail_json(msg='retention %s must be an integer' % period)
+        if not [p for p in RETENTION_PERIODS if int(retention.get(p) or 0) > 0]:
+            module.fail_json(msg='retention must keep at least one of %s' % ', '.join(RETENTION_PERIODS))
+        retention['recursive'] = module.boolean(retention.get('recursive', False))
+        zfs = ZfsRetention(module, name, retention)
+        result = zfs.run()
+        module.exit_json(changed=zfs.changed, name=name, **result)
+
+    if state is None:
+        module.fail_json(msg='state is required unless retention is given')
 
     # Get all valid zfs-properties
     properties = dict()
     for prop, value in module.params.iteritems():
         # All freestyle params are zfs properties
         if prop not in module.argument_spec:
-            # Reverse the boolification of freestyle zfs properties
-            if type(value) == bool:
-                if value is True:
-                    properties[prop] = 'on'
-                else:
-                    properties[prop] = 'off'
-            else:
-                properties[prop] = value
+            properties[prop] = to_zfs_value(value)
+
+    if datasets is not None:
+        if name is not None:
+            module.fail_json(msg='name and datasets are mutually exclusive')
+        items = []
+        for item in datasets:
+            if not isinstance(item, dict) or not item.get('name'):
+                module.fail_json(msg='each item of datasets must be a dict with a name')
+            item_state = item.get('state', state)
+            if item_state not in ('present', 'absent'):
+                module.fail_json(msg='invalid state %s for dataset %s' % (item_state, item['name']))
+            item_properties = properties.copy()
+            for prop, value in item.iteritems():
+                if prop not in ('name', 'state'):
+                    item_properties[prop] = to_zfs_value(value)
+            items.append((item['name'], item_state, item_properties))
+        zfs = ZfsDatasets(module, items)
+        results = zfs.run()
+        module.exit_json(changed=zfs.changed, state=state, datasets=results)
+
+    if name is None:
+        module.fail_json(msg='one of name or datasets is required')
 
     result = {}
     result['name'] = name
@@ -38,7 +38,8 @@ description:
     C(previous_release), the release the 'current' symlink is pointing to,
     C(previous_release_path), the full path to the 'current' symlink target,
     C(new_release), either the 'release' parameter or a generated timestamp,
-    C(new_release_path), the path to the new release folder (not created by the module)."
+    C(new_release_path), the path to the new release folder (not created by the module, unless
+    I(clone_previous_release) is set)."
 
 options:
   path:
@@ -112,6 +113,26 @@ options:
       - the number of old releases to keep when cleaning. Used in C(finalize) and C(clean). Any unfinished builds
         will be deleted first, so only correct releases will count. The current version will not count.
 
+  clone_previous_release:
+    required: False
+    default: False
+    version_added: "2.2"
+    description:
+      - Whether to create the new release folder on C(state=present) as a hard-link clone of the release the
+        I(current) symlink points to, like C(cp -al) or C(rsync --link-dest). Unchanged files then take no space
+        or copy time. Files in the new release must be replaced (as rsync does) rather than modified in place,
+        otherwise the previous release changes too. The clone already contains the I(unfinished_filename) file,
+        so it is cleaned up like any other unfinished build until it is finalized.
+
+  clean_workers:
+    required: False
+    default: 4
+    version_added: "2.2"
+    description:
+      - the number of old or unfinished releases deleted concurrently when cleaning. The releases are first moved
+        out of the way, so they are gone from the releases folder immediately, and then deleted by up to this many
+        workers.
+
 notes:
   - Facts are only returned for C(state=query) and C(state=present). If you use both, you should pass any overridden
     parameters to both calls, otherwise the second call will overwrite the facts of the first one.
@@ -213,6 +234,13 @@ procedure to remove it during cleanup.
 - deploy_helper: path=/path/to/root state=clean
 - deploy_helper: path=/path/to/root state=present
 
+# Building the new release as a hard-link clone of the current one, then syncing the changes into it:
+- deploy_helper: path=/path/to/root clone_previous_release=yes
+- file: path={{ deploy_helper.new_release_path }}/{{ deploy_helper.unfinished_filename }} state=touch
+- synchronize: src=build/ dest={{ deploy_helper.new_release_path }} delete=yes
+               rsync_opts=--exclude={{ deploy_helper.unfinished_filename }}
+- deploy_helper: path=/path/to/root release={{ deploy_helper.new_release }} state=finalize
+
 # Keeping more old releases:
 - deploy_helper: path=/path/to/root release={{ deploy_helper.new_release }} state=finalize keep_releases=10
 # Or, if you use 'clean=false' on finalize:
@@ -229,6 +257,17 @@ procedure to remove it during cleanup.
 # import module snippets
 from ansible.module_utils.basic import *
 from ansible.module_utils.pycompat24 import get_exception
+import stat
+try:
+    from multiprocessing.pool import ThreadPool
+    HAS_THREADPOOL = True
+except ImportError:
+    HAS_THREADPOOL = False
+
+# suffix of releases that have been moved out of the way to be deleted
+DELETE_SUFFIX = '.deleting'
+# suffix of a release folder while it is being cloned
+CLONE_SUFFIX = '.cloning'
 
 class DeployHelper(object):
 
@@ -239,6 +278,8 @@ class DeployHelper(object):
         self.file_args = module.load_file_common_arguments(module.params)
 
         self.clean               = module.params['clean']
+        self.clean_workers       = module.params['clean_workers']
+        self.clone_previous      = module.params['clone_previous_release']
         self.current_path        = module.params['current_path']
         self.keep_releases       = module.params['keep_releases']
         self.path                = module.params['path']
@@ -291,6 +332,92 @@ class DeployHelper(object):
 
         return True
 
+    def _delete_worker(self, path):
+        try:
+            shutil.rmtree(path, ignore_errors=False)
+        except Exception:
+            e = get_exception()
+            return "rmtree failed: %s" % str(e)
+        return None
+
+    def delete_paths(self, paths):
+        """ Move the release folders out of the way, then delete them with up to clean_workers at once """
+        for path in paths:
+            if not os.path.isdir(path) or os.path.islink(path):
+                self.module.fail_json(msg="%s exists but is not a directory" % path)
+
+        if self.module.check_mode or not paths:
+            return len(paths)
+
+        trash = []
+        for path in paths:
+            if path.endswith(DELETE_SUFFIX):
+                trash.append(path)
+            else:
+                trash_path = path + DELETE_SUFFIX
+                if os.path.lexists(trash_path):
+                    shutil.rmtree(trash_path)
+                os.rename(path, trash_path)
+                trash.append(trash_path)
+
+        if HAS_THREADPOOL and self.clean_workers > 1 and len(trash) > 1:
+            pool = ThreadPool(min(self.clean_workers, len(trash)))
+            try:
+                errors = pool.map(self._delete_worker, trash)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            errors = map(self._delete_worker, trash)
+
+        for error in errors:
+            if error is not None:
+                self.module.fail_json(msg=error)
+
+        return len(paths)
+
+    def clone_release(self, source, dest):
+        """ Create dest as a copy of source, hard-linking every regular file """
+        if not source or not os.path.isdir(source) or os.path.lexists(dest):
+            return False
+
+        if self.module.check_mode:
+            return True
+
+        tmp_dest = dest + CLONE_SUFFIX
+        if os.path.lexists(tmp_dest):
+            shutil.rmtree(tmp_dest)
+        try:
+            for root, dirs, files in os.walk(source):
+                relative = root[len(source):].lstrip(os.sep)
+                if relative:
+                    target = os.path.join(tmp_dest, relative)
+                else:
+                    target = tmp_dest
+                os.mkdir(target)
+                shutil.copystat(root, target)
+                for name in dirs + files:
+                    src = os.path.join(root, name)
+                    if os.path.islink(src):
+                        os.symlink(os.readlink(src), os.path.join(target, name))
+                    elif name in files:
+                        os.link(src, os.path.join(target, name))
+                # os.walk does not descend into symlinked dirs, they are
+                # recreated as links above
+                dirs[:] = [d for d in dirs if not os.path.islink(os.path.join(root, d))]
+            # mark the clone unfinished before it shows up as a release;
+            # an existing file is a hard link into the source, leave it alone
+            unfinished_file_path = os.path.join(tmp_dest, self.unfinished_filename)
+            if not os.path.lexists(unfinished_file_path):
+                open(unfinished_file_path, 'w').close()
+            os.rename(tmp_dest, dest)
+        except (OSError, IOError):
+            e = get_exception()
+            shutil.rmtree(tmp_dest, ignore_errors=True)
+            self.module.fail_json(msg="cloning %s to %s failed: %s" % (source, dest, str(e)))
+
+        return True
+
     def create_path(self, path):
         changed = False
 
@@ -347,16 +474,13 @@ class DeployHelper(object):
         return changed
 
     def remove_unfinished_builds(self, releases_path):
-        changes = 0
+        unfinished = []
 
         for release in os.listdir(releases_path):
             if os.path.isfile(os.path.join(releases_path, release, self.unfinished_filename)):
-                if self.module.check_mode:
-                    changes += 1
-                else:
-                    changes += self.delete_path(os.path.join(releases_path, release))
+                unfinished.append(os.path.join(releases_path, release))
 
-        return changes
+        return self.delete_paths(unfinished)
 
     def remove_unfinished_link(self, path):
         changed = False
@@ -372,18 +496,25 @@ class DeployHelper(object):
         changes = 0
 
         if os.path.lexists(releases_path):
-            releases = [ f for f in os.listdir(releases_path) if os.path.isdir(os.path.join(releases_path,f)) ]
-            try:
-                releases.remove(reserve_version)
-            except ValueError:
-                pass
+            # stat every entry once, for both the directory check and the ctime to sort on
+            releases = []
+            leftovers = []
+            for f in os.listdir(releases_path):
+                try:
+                    st = os.stat(os.path.join(releases_path, f))
+                except OSError:
+                    continue
+                if not stat.S_ISDIR(st.st_mode) or f == reserve_version:
+                    continue
+                if f.endswith(DELETE_SUFFIX) or f.endswith(CLONE_SUFFIX):
+                    # left behind by an interrupted cleanup or clone
+                    leftovers.append(os.path.join(releases_path, f))
+                else:
+                    releases.append((st.st_ctime, f))
 
-            if not self.module.check_mode:
-                releases.sort( key=lambda x: os.path.getctime(os.path.join(releases_path,x)), reverse=True)
-                for release in releases[self.keep_releases:]:
-                    changes += self.delete_path(os.path.join(releases_path, release))
-            elif len(releases) > self.keep_releases:
-                changes += (len(releases) - self.keep_releases)
+            releases.sort(reverse=True)
+            old = [ os.path.join(releases_path, f) for ctime, f in releases[self.keep_releases:] ]
+            changes += self.delete_paths(old + leftovers)
 
         return changes
 
@@ -412,6 +543,8 @@ def main():
             shared_path         = dict(required=False, type='str', default='shared'),
             current_path        = dict(required=False, type='str', default='current'),
             keep_releases       = dict(required=False, type='int', default=5),
+            clone_previous_release = dict(required=False, type='bool', default=False),
+            clean_workers       = dict(required=False, type='int', default=4),
             clean               = dict(required=False, type='bool', default=True),
             unfinished_filename = dict(required=False, type='str', default='DEPLOY_UNFINISHED'),
             state               = dict(required=False, choices=['present', 'absent', 'clean', 'finalize', 'query'], default='present')
@@ -438,6 +571,8 @@ def main():
         changes += deploy_helper.create_path(facts['releases_path'])
         if deploy_helper.shared_path:
             changes += deploy_helper.create_path(facts['shared_path'])
+        if deploy_helper.clone_previous:
+            changes += deploy_helper.clone_release(facts['previous_release_path'], facts['new_release_path'])
 
         result['ansible_facts'] = { 'deploy_helper': facts }
 
@@ -23,6 +23,30 @@ import copy
 import textwrap
 from datetime import datetime
 
+try:
+    from urllib2 import HTTPError
+except ImportError:
+    from urllib.error import HTTPError
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+try:
+    from multiprocessing.pool import ThreadPool
+    HAS_THREADPOOL = True
+except ImportError:
+    HAS_THREADPOOL = False
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
 DOCUMENTATION = '''
 ---
 module: letsencrypt
@@ -49,6 +73,7 @@ description:
       protocol."
 requirements:
   - "python >= 2.6"
+  - "cryptography (optional, requests are signed with the openssl binary without it)"
 options:
   account_key:
     description:
@@ -106,6 +131,14 @@ options:
          will be renewed."
     required: false
     default: 10
+  concurrency:
+    description:
+      - "The number of authorizations that are requested, triggered and polled
+         at the same time. Each of the Subject Alternate Names of the CSR has its
+         own authorization."
+    required: false
+    default: 4
+    version_added: "2.2"
 '''
 
 EXAMPLES = '''
@@ -149,6 +182,12 @@ challenge_data:
       returned: changed
       type: string
       sample: IlirfxKKXA...17Dt3juxGJ-PCt92wr-oA
+timings:
+  description: per domain seconds spent requesting the authorization (authz),
+    triggering its challenge (trigger) and until it was validated (validation).
+  returned: changed
+  type: dictionary
+  sample: {"sample.com": {"trigger": 0.31, "validation": 4.2}}
 authorizations:
   description: ACME authorization data.
   returned: changed
@@ -160,11 +199,75 @@ authorizations:
         type: dict
 '''
 
+# parsed account keys per key file, see ACMEAccount._parse_account_key
+ACCOUNT_KEY_CACHE = {}
+
+class ACMEError(Exception):
+    '''
+    Raised by the code talking to the ACME server instead of failing the
+    module, so that it can run in worker threads. main() fails the module
+    with the message.
+    '''
+    pass
+
+def run_concurrently(func, items, concurrency):
+    '''
+    Returns the results of func for every item, with up to concurrency
+    calls running at the same time. The first ACMEError raised by a call
+    is raised again once all calls are done.
+    '''
+    items = list(items)
+    if not HAS_THREADPOOL or concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    def worker(item):
+        try:
+            return func(item), None
+        except ACMEError as e:
+            return None, e
+
+    pool = ThreadPool(min(concurrency, len(items)))
+    try:
+        results = pool.map(worker, items)
+    finally:
+        pool.close()
+        pool.join()
+
+    for result, error in results:
+        if error is not None:
+            raise error
+    return [result for result, error in results]
+
+def acme_request(url, data=None, method='GET'):
+    '''
+    Sends a request to the ACME server and returns the response and an
+    info dict with the status and the lower cased headers, like fetch_url.
+    Connection errors are raised as ACMEError.
+    '''
+    info = {'url': url}
+    try:
+        resp = open_url(url, data=data, method=method)
+        info['status'] = resp.getcode()
+        headers = resp.info()
+    except HTTPError as e:
+        resp = None
+        info['status'] = e.code
+        try:
+            info['body'] = e.read()
+        except AttributeError:
+            info['body'] = ''
+        headers = e.info()
+    except Exception as e:
+        raise ACMEError("Request to {0} failed: {1}".format(url, e))
+    for header, value in headers.items():
+        info[header.lower()] = value
+    return resp, info
+
 def nopad_b64(data):
     return base64.urlsafe_b64encode(data).decode('utf8').replace("=", "")
 
 def simple_get(module,url):
-    resp, info = fetch_url(module, url, method='GET')
+    resp, info = acme_request(url, method='GET')
 
     result = None
     try:
@@ -176,10 +279,10 @@ def simple_get(module,url):
     except AttributeError:
         result = None
     except ValueError:
-        module.fail_json(msg="Failed to parse the ACME response: {0} {1}".format(url,content))
+        raise ACMEError("Failed to parse the ACME response: {0} {1}".format(url,content))
 
     if info['status'] >= 400:
-        module.fail_json(msg="ACME request failed: CODE: {0} RESULT:{1}".format(info['status'],result))
+        raise ACMEError("ACME request failed: CODE: {0} RESULT:{1}".format(info['status'],result))
     return result
 
 def get_cert_days(module,cert_file):
@@ -265,20 +368,38 @@ class ACMEDirectory(object):
     def __init__(self, module):
         self.module    = module
         self.directory_root = module.params['acme_directory']
+        self.nonces    = Queue()
 
         self.directory = simple_get(self.module,self.directory_root)
 
     def __getitem__(self, key): return self.directory[key]
 
     def get_nonce(self,resource=None):
+        '''
+        Return an unused Replay-Nonce of an earlier response if there is
+        one, otherwise request a fresh nonce with a HEAD request. The nonces
+        are shared by all threads sending signed requests.
+        '''
+        try:
+            return self.nonces.get_nowait()
+        except Empty:
+            pass
         url = self.directory_root
         if resource is not None:
             url = resource
-        _, info = fetch_url(self.module, url, method='HEAD')
+        _, info = acme_request(url, method='HEAD')
         if info['status'] != 200:
-            self.module.fail_json(msg="Failed to get replay-nonce, got status {0}".format(info['status']))
+            raise ACMEError("Failed to get replay-nonce, got status {0}".format(info['status']))
         return info['replay-nonce']
 
+    def save_nonce(self,info):
+        '''
+        Keep the Replay-Nonce of a response for the next signed request.
+        '''
+        nonce = info.get('replay-nonce', None)
+        if nonce is not None:
+            self.nonces.put(nonce)
+
 class ACMEAccount(object):
     '''
     ACME account object. Handles the authorized communication with the
@@ -303,7 +424,7 @@ class ACMEAccount(object):
 
         self._openssl_bin = module.get_bin_path('openssl', True)
 
-        pub_hex, pub_exp = self._parse_account_key(self.key)
+        pub_hex, pub_exp, self._private_key = self._parse_account_key(self.key)
         self.jws_header =  {
             "alg": "RS256",
             "jwk": {
@@ -326,19 +447,62 @@ class ACMEAccount(object):
     def _parse_account_key(self,key):
         '''
         Parses an RSA key file in PEM format and returns the modulus
-        and public exponent of the key
-        '''
-        openssl_keydump_cmd = [self._openssl_bin, "rsa", "-in", key, "-noout", "-text"]
-        _, out, _ = self.module.run_command(openssl_keydump_cmd,check_rc=True)
-
-        pub_hex, pub_exp = re.search(
-            r"modulus:\n\s+00:([a-f0-9\:\s]+?)\npublicExponent: ([0-9]+)",
-            out.decode('utf8'), re.MULTILINE|re.DOTALL).groups()
-        pub_exp = "{0:x}".format(int(pub_exp))
+        and public exponent of the key, and the loaded private key when
+        the cryptography library is available (None otherwise).
+        The result is cached per key file.
+        '''
+        key_stat = os.stat(key)
+        cache_key = (os.path.realpath(key), key_stat.st_mtime, key_stat.st_size)
+        if cache_key in ACCOUNT_KEY_CACHE:
+            return ACCOUNT_KEY_CACHE[cache_key]
+
+        if HAS_CRYPTOGRAPHY:
+            f = open(key, 'rb')
+            try:
+                try:
+                    private_key = serialization.load_pem_private_key(f.read(), None, default_backend())
+                except (ValueError, TypeError) as e:
+                    self.module.fail_json(msg="Failed to load account key {0}: {1}".format(key, e))
+            finally:
+                f.close()
+            numbers = private_key.public_key().public_numbers()
+            pub_hex = "{0:x}".format(numbers.n)
+            if len(pub_hex) % 2:
+                pub_hex = "0{0}".format(pub_hex)
+            pub_exp = "{0:x}".format(numbers.e)
+        else:
+            private_key = None
+            openssl_keydump_cmd = [self._openssl_bin, "rsa", "-in", key, "-noout", "-text"]
+            _, out, _ = self.module.run_command(openssl_keydump_cmd,check_rc=True)
+
+            pub_hex, pub_exp = re.search(
+                r"modulus:\n\s+00:([a-f0-9\:\s]+?)\npublicExponent: ([0-9]+)",
+                out.decode('utf8'), re.MULTILINE|re.DOTALL).groups()
+            pub_exp = "{0:x}".format(int(pub_exp))
         if len(pub_exp) % 2:
             pub_exp = "0{0}".format(pub_exp)
 
-        return pub_hex, pub_exp
+        ACCOUNT_KEY_CACHE[cache_key] = (pub_hex, pub_exp, private_key)
+        return pub_hex, pub_exp, private_key
+
+    def _sign(self,data):
+        '''
+        Returns the RS256 signature of data. Signs in-process with the
+        cryptography library and falls back to running openssl.
+        '''
+        if self._private_key is not None:
+            if hasattr(self._private_key, 'sign'):
+                return self._private_key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+            # cryptography < 1.4
+            signer = self._private_key.signer(padding.PKCS1v15(), hashes.SHA256())
+            signer.update(data)
+            return signer.finalize()
+
+        openssl_sign_cmd = [self._openssl_bin, "dgst", "-sha256", "-sign", self.key]
+        rc, out, err = self.module.run_command(openssl_sign_cmd,data=data,binary_data=True)
+        if rc != 0:
+            raise ACMEError("Failed to sign the request with openssl: {0}".format(err))
+        return out
 
     def send_signed_request(self, url, payload):
         '''
@@ -346,27 +510,32 @@ class ACMEAccount(object):
         the response as dictionary
         https://tools.ietf.org/html/draft-ietf-acme-acme-02#section-5.2
         '''
-        protected = copy.deepcopy(self.jws_header)
-        protected["nonce"] = self.directory.get_nonce()
+        for attempt in range(2):
+            protected = copy.deepcopy(self.jws_header)
+            protected["nonce"] = self.directory.get_nonce()
 
-        try:
-            payload64 = nopad_b64(self.module.jsonify(payload).encode('utf8'))
-            protected64 = nopad_b64(self.module.jsonify(protected).encode('utf8'))
-        except Exception as e:
-            self.module.fail_json(msg="Failed to encode payload / headers as JSON: {0}".format(e))
+            try:
+                payload64 = nopad_b64(self.module.jsonify(payload).encode('utf8'))
+                protected64 = nopad_b64(self.module.jsonify(protected).encode('utf8'))
+            except Exception as e:
+                raise ACMEError("Failed to encode payload / headers as JSON: {0}".format(e))
 
-        openssl_sign_cmd = [self._openssl_bin, "dgst", "-sha256", "-sign", self.key]
-        sign_payload = "{0}.{1}".format(protected64, payload64).encode('utf8')
-        _, out, _ = self.module.run_command(openssl_sign_cmd,data=sign_payload,check_rc=True, binary_data=True)
+            sign_payload = "{0}.{1}".format(protected64, payload64).encode('utf8')
 
-        data = self.module.jsonify({
-            "header": self.jws_header,
-            "protected": protected64,
-            "payload": payload64,
-            "signature": nopad_b64(out),
-        })
+            data = self.module.jsonify({
+                "header": self.jws_header,
+                "protected": protected64,
+                "payload": payload64,
+                "signature": nopad_b64(self._sign(sign_payload)),
+            })
+
+            resp, info = acme_request(url, data=data, method='POST')
+            # every response carries a fresh nonce, use it for the next request
+            self.directory.save_nonce(info)
+            if info['status'] != 400 or 'badNonce' not in str(info.get('body', '')):
+                break
+            # a rejected nonce is retried once with the nonce of the error response
 
-        resp, info = fetch_url(self.module, url, data=data, method='POST')
         result = None
         try:
             content = resp.read()
@@ -377,7 +546,7 @@ class ACMEAccount(object):
         except AttributeError:
             result = None
         except ValueError:
-            self.module.fail_json(msg="Failed to parse the ACME response: {0} {1}".format(url,content))
+            raise ACMEError("Failed to parse the ACME response: {0} {1}".format(url,content))
 
         return result,info
 
@@ -409,7 +578,7 @@ class ACMEAccount(object):
             # Account did exist
             return False
         else:
-            self.module.fail_json(msg="Error registering: {0} {1}".format(info['status'], result))
+            raise ACMEError("Error registering: {0} {1}".format(info['status'], result))
 
     def init_account(self):
         '''
@@ -496,6 +665,8 @@ class ACMEClient(object):
         self.authorizations = self.account.get_authorizations()
         self.cert_days      = -1
         self.changed        = self.account.changed
+        self.concurrency    = module.params['concurrency']
+        self.timings        = {}
 
         if not os.path.exists(self.csr):
             module.fail_json(msg="CSR %s not found" % (self.csr))
@@ -571,7 +742,7 @@ class ACMEClient(object):
 
         result, info = self.account.send_signed_request(self.directory['new-authz'], new_authz)
         if info['status'] not in [200,201]:
-            self.module.fail_json(msg="Error requesting challenges: CODE: {0} RESULT: {1}".format(info['status'], result))
+            raise ACMEError("Error requesting challenges: CODE: {0} RESULT: {1}".format(info['status'], result))
         else:
             result['uri'] = info['location']
             return result
@@ -619,10 +790,10 @@ class ACMEClient(object):
             data[type] = { 'resource': resource, 'resource_value': value }
         return data
 
-    def _validate_challenges(self,auth):
+    def _trigger_challenges(self,auth):
         '''
-        Validate the authorization provided in the auth dict. Returns True
-        when the validation was successfull and False when it was not.
+        Tell the ACME server to validate the challenge of the chosen type
+        of the authorization provided in the auth dict.
         '''
         for challenge in auth['challenges']:
             if self.challenge != challenge['type']:
@@ -638,38 +809,72 @@ class ACMEClient(object):
             }
             result, info = self.account.send_signed_request(uri, challenge_response)
             if info['status'] != 200:
-                self.module.fail_json(msg="Error validating challenge: CODE: {0} RESULT: {1}".format(info['status'], result))
-
-        status = ''
-
-        while status not in ['valid','invalid','revoked']:
-            result = simple_get(self.module,auth['uri'])
-            result['uri'] = auth['uri']
-            if self._add_or_update_auth(result):
-                self.changed = True
-            # draft-ietf-acme-acme-02
-            # "status (required, string): ...
-            # If this field is missing, then the default value is "pending"."
-            if 'status' not in result:
-                status = 'pending'
-            else:
-                status = result['status']
-            time.sleep(2)
-
-        if status == 'invalid':
-            error_details = ''
-            # multiple challenges could have failed at this point, gather error
-            # details for all of them before failing
-            for challenge in result['challenges']:
-                if challenge['status'] == 'invalid':
-                    error_details += ' CHALLENGE: {0}'.format(challenge['type'])
-                    if 'error' in challenge:
-                        error_details += ' DETAILS: {0};'.format(challenge['error']['detail'])
-                    else:
-                        error_details += ';'
-            self.module.fail_json(msg="Authorization for {0} returned invalid: {1}".format(result['identifier']['value'],error_details))
-
-        return status == 'valid'
+                raise ACMEError("Error validating challenge: CODE: {0} RESULT: {1}".format(info['status'], result))
+
+    def _get_auth(self,uri):
+        result = simple_get(self.module,uri)
+        result['uri'] = uri
+        return result
+
+    def _validate_challenges(self,auths):
+        '''
+        Trigger the challenges of all given authorizations and poll them
+        in a single loop, with a growing delay, until none is pending.
+        Fails when one of them turns out invalid.
+        '''
+        started = {}
+        for auth in auths:
+            started[auth['uri']] = time.time()
+
+        def trigger(auth):
+            start = time.time()
+            self._trigger_challenges(auth)
+            return time.time() - start
+
+        durations = run_concurrently(trigger, auths, self.concurrency)
+        for auth, duration in zip(auths, durations):
+            self._domain_timings(auth)['trigger'] = round(duration, 3)
+
+        pending = [auth['uri'] for auth in auths]
+        delay = 1
+        invalid = []
+        while pending:
+            time.sleep(delay)
+            delay = min(delay * 2, 10)
+            results = run_concurrently(self._get_auth, pending, self.concurrency)
+            pending = []
+            for result in results:
+                if self._add_or_update_auth(result):
+                    self.changed = True
+                # draft-ietf-acme-acme-02
+                # "status (required, string): ...
+                # If this field is missing, then the default value is "pending"."
+                status = result.get('status', 'pending')
+                if status not in ['valid','invalid','revoked']:
+                    pending.append(result['uri'])
+                    continue
+                self._domain_timings(result)['validation'] = round(time.time() - started[result['uri']], 3)
+                if status == 'invalid':
+                    invalid.append(result)
+
+        if invalid:
+            messages = []
+            for result in invalid:
+                error_details = ''
+                # multiple challenges could have failed at this point, gather error
+                # details for all of them before failing
+                for challenge in result['challenges']:
+                    if challenge['status'] == 'invalid':
+                        error_details += ' CHALLENGE: {0}'.format(challenge['type'])
+                        if 'error' in challenge:
+                            error_details += ' DETAILS: {0};'.format(challenge['error']['detail'])
+                        else:
+                            error_details += ';'
+                messages.append("Authorization for {0} returned invalid: {1}".format(result['identifier']['value'],error_details))
+            self.module.fail_json(msg=' '.join(messages), timings=self.timings)
+
+    def _domain_timings(self,auth):
+        return self.timings.setdefault(auth['identifier']['value'], {})
 
     def _new_cert(self):
         '''
@@ -686,7 +891,7 @@ class ACMEClient(object):
         }
         result, info = self.account.send_signed_request(self.directory['new-cert'], new_cert)
         if info['status'] not in [200,201]:
-            self.module.fail_json(msg="Error new cert: CODE: {0} RESULT: {1}".format(info['status'], result))
+            raise ACMEError("Error new cert: CODE: {0} RESULT: {1}".format(info['status'], result))
         else:
             return {'cert': result, 'uri': info['location']}
 
@@ -704,21 +909,36 @@ class ACMEClient(object):
         the challenge details for the choosen challenge type.
         '''
         data = {}
+        new_domains = []
+        pending = []
         for domain in self.domains:
             auth = self._get_domain_auth(domain)
             if auth is None:
-                new_auth = self._new_authz(domain)
-                self._add_or_update_auth(new_auth)
-                data[domain] = self._get_challenge_data(new_auth)
-                self.changed = True
+                new_domains.append(domain)
             elif (auth['status'] == 'pending') or ('status' not in auth):
                 # draft-ietf-acme-acme-02
                 # "status (required, string): ...
                 # If this field is missing, then the default value is "pending"."
-                self._validate_challenges(auth)
-                # _validate_challenges updates the global authrozation dict,
-                # so get the current version of the authorization we are working
-                # on to retrieve the challenge data
+                pending.append(auth)
+
+        def new_authz(domain):
+            start = time.time()
+            return self._new_authz(domain), time.time() - start
+
+        for domain, (new_auth, duration) in zip(new_domains,
+                run_concurrently(new_authz, new_domains, self.concurrency)):
+            self._add_or_update_auth(new_auth)
+            self.timings.setdefault(domain, {})['authz'] = round(duration, 3)
+            data[domain] = self._get_challenge_data(new_auth)
+            self.changed = True
+
+        if pending:
+            self._validate_challenges(pending)
+            # _validate_challenges updates the global authrozation dict,
+            # so get the current version of the authorizations we are working
+            # on to retrieve the challenge data
+            for auth in pending:
+                domain = auth['identifier']['value']
                 data[domain] = self._get_challenge_data(self._get_domain_auth(domain))
 
         return data
@@ -756,6 +976,7 @@ def main():
             data           = dict(required=False, no_log=True, default=None, type='dict'),
             dest           = dict(required=True, aliases=['cert'], type='str'),
             remaining_days = dict(required=False, default=10, type='int'),
+            concurrency    = dict(required=False, default=4, type='int'),
         ),
         supports_check_mode = True,
     )
@@ -770,12 +991,16 @@ def main():
             module.exit_json(changed=True,authorizations={},
                                           challenge_data={},cert_days=cert_days)
         else:
-            client = ACMEClient(module)
-            client.cert_days = cert_days
-            data = client.do_challenges()
-            client.get_certificate()
+            try:
+                client = ACMEClient(module)
+                client.cert_days = cert_days
+                data = client.do_challenges()
+                client.get_certificate()
+            except ACMEError as e:
+                module.fail_json(msg=str(e))
             module.exit_json(changed=client.changed,authorizations=client.authorizations,
-                                                  challenge_data=data,cert_days=client.cert_days)
+                                                  challenge_data=data,cert_days=client.cert_days,
+                                                  timings=client.timings)
     else:
         module.exit_json(changed=False,cert_days=cert_days)
 